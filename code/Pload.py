@@ -1,9 +1,10 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.cm as cm
+from battery import BatterySim
+from recorder import Recorder
 
 # Style settings
-plt.rcParams.update({
+STYLE = {
     'font.size': 16,
     'font.weight': 'bold',
     'axes.labelweight': 'bold',
@@ -12,50 +13,12 @@ plt.rcParams.update({
     'xtick.labelsize': 14,
     'ytick.labelsize': 14,
     'legend.fontsize': 14
-})
+}
 
 # ==========================================
 # 1. Battery Model (Thevenin)
 # ==========================================
-def get_ocv_corrected(soc):
-    # Simplified OCV curve
-    return 3.2 + 0.9 * soc + 0.3 * (soc**2)
-
-class BatterySimLoad:
-    def __init__(self, capacity_mah=4575): # Using 4575mAh as per earlier snippets
-        self.Q_coulomb = capacity_mah * 3.6
-        self.R0 = 0.05
-        self.Rp = 0.03
-        self.Cp = 2000
-        self.tau = self.Rp * self.Cp
-        self.cutoff_voltage = 3.0
-        
-        self.soc = 1.0
-        self.up = 0.0
-        
-    def step(self, power_w, dt=1.0):
-        ocv = get_ocv_corrected(self.soc)
-        
-        # Solving Quadratic for Current I: R0*I^2 - (OCV-Up)*I + P = 0
-        a = self.R0
-        b = -(ocv - self.up)
-        c = power_w
-        delta = b**2 - 4*a*c
-        
-        if delta < 0:
-            return None, None, None # Voltage Collapse
-            
-        I_load = (-b - np.sqrt(delta)) / (2*a)
-        v_term = ocv - self.up - I_load * self.R0
-        
-        if v_term < self.cutoff_voltage or self.soc <= 0:
-            return v_term, I_load, 0.0 # Empty/Cutoff
-            
-        # Update State
-        self.soc -= (I_load * dt) / self.Q_coulomb
-        self.up = self.up * np.exp(-dt/self.tau) + I_load * self.Rp * (1 - np.exp(-dt/self.tau))
-        
-        return v_term, I_load, self.soc
+# Shared 1-RC Thevenin model, see battery.py
 
 # ==========================================
 # 2. OAT Sensitivity Analysis: Load Power
@@ -64,58 +27,72 @@ class BatterySimLoad:
 # Defined Power Levels
 power_values = [0.8, 0.9, 1.0, 1.1, 1.2]
 perturbation_labels = ["-100%", "-50%", "0% (Baseline)", "+50%", "+100%"]
-labels = [f"{label} ($P={val}W$)" for label, val in zip(perturbation_labels, power_values)]
-
-# Colors: Coolwarm (Blue -> Red)
-# Blue (Low Power) -> Red (High Power)
-cmap = cm.get_cmap('coolwarm', 5)
-colors = [cmap(i) for i in range(5)]
-
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 12))
-
-for val, label, col in zip(power_values, labels, colors):
-    sim = BatterySimLoad()
-    time = []
-    voltage = []
-    soc_list = []
-    curr_t = 0
-    dt = 1.0 # 1 second resolution for high load accuracy
-    
-    while True:
-        v, i, s = sim.step(val, dt)
-        
-        if v is None or v < 3.0 or s <= 0:
-            break
-        
+
+def simulate(power_values=power_values, dt=1.0):
+    """
+    Constant-power discharge per load level on the 1 s grid (for high
+    load accuracy), sampled every minute.  Long-form result: curve k's
+    samples are where result['curve'] == k.
+    """
+    curve, time, voltage, soc_list = [], [], [], []
+    for k, val in enumerate(power_values):
         # Record every minute
-        if curr_t % 60 == 0:
-            time.append(curr_t / 60) # Minutes
-            voltage.append(v)
-            soc_list.append(s * 100)
-            
-        curr_t += dt
-    
-    # Plot Voltage
-    ax1.plot(time, voltage, color=col, linewidth=3, label=label)
-    ax1.scatter(time[-1], voltage[-1], color=col, s=100)
-    
-    # Plot SoC
-    ax2.plot(time, soc_list, color=col, linewidth=3, label=label)
-    ax2.scatter(time[-1], soc_list[-1], color=col, s=100)
-
-# Style Plot 1
-ax1.axhline(3.0, color='black', linestyle='--', linewidth=2, label='Cutoff Voltage (3.0V)')
-ax1.set_ylabel('Terminal Voltage (V)', fontsize=18)
-ax1.grid(True, linestyle='--', alpha=0.5)
-
-ax1.set_ylim(2.8, 4.5)
-
-# Style Plot 2
-ax2.set_ylabel('State of Charge (SoC %)', fontsize=18)
-ax2.set_xlabel('Runtime (Minutes)', fontsize=18)
-ax2.grid(True, linestyle='--', alpha=0.5)
-ax2.set_ylim(0, 105)
-ax2.legend(loc='lower left', fontsize=14, frameon=True)
-
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+        rec = Recorder(('v_term', 'soc'), every=round(60 / dt))
+        BatterySim().discharge(val, dt, recorder=rec)
+
+        curve.append(np.full(len(rec), k))
+        time.append(rec['t'] / 60) # Minutes
+        voltage.append(rec['v_term'])
+        soc_list.append(rec['soc'] * 100)
+
+    return {'power_w': np.array(power_values, dtype=np.float64), 'curve': np.concatenate(curve),
+            't_min': np.concatenate(time), 'voltage': np.concatenate(voltage),
+            'soc': np.concatenate(soc_list)}
+
+# ==========================================
+# 3. Plot
+# ==========================================
+def plot(result):
+    power = result['power_w']
+    labels = [f"{label} ($P={val}W$)" for label, val in zip(perturbation_labels, power)]
+
+    with plt.rc_context(STYLE):
+        # Colors: Coolwarm (Blue -> Red)
+        # Blue (Low Power) -> Red (High Power)
+        cmap = plt.get_cmap('coolwarm', len(power))
+        colors = [cmap(i) for i in range(len(power))]
+
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 12))
+
+        for k, (label, col) in enumerate(zip(labels, colors)):
+            sel = result['curve'] == k
+            time, voltage, soc_list = result['t_min'][sel], result['voltage'][sel], result['soc'][sel]
+
+            # Plot Voltage
+            ax1.plot(time, voltage, color=col, linewidth=3, label=label)
+            ax1.scatter(time[-1], voltage[-1], color=col, s=100)
+
+            # Plot SoC
+            ax2.plot(time, soc_list, color=col, linewidth=3, label=label)
+            ax2.scatter(time[-1], soc_list[-1], color=col, s=100)
+
+        # Style Plot 1
+        ax1.axhline(3.0, color='black', linestyle='--', linewidth=2, label='Cutoff Voltage (3.0V)')
+        ax1.set_ylabel('Terminal Voltage (V)', fontsize=18)
+        ax1.grid(True, linestyle='--', alpha=0.5)
+
+        ax1.set_ylim(2.8, 4.5)
+
+        # Style Plot 2
+        ax2.set_ylabel('State of Charge (SoC %)', fontsize=18)
+        ax2.set_xlabel('Runtime (Minutes)', fontsize=18)
+        ax2.grid(True, linestyle='--', alpha=0.5)
+        ax2.set_ylim(0, 105)
+        ax2.legend(loc='lower left', fontsize=14, frameon=True)
+
+        fig.tight_layout()
+    return fig
+
+if __name__ == "__main__":
+    plot(simulate())
+    plt.show()
@@ -1,65 +1,24 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from battery import BatterySim
+from recorder import Recorder
 
 # ==========================================
 # 1. 核心仿真逻辑 (保持不变)
 # ==========================================
 
-def get_ocv_corrected(soc):
-    """
-    修正后的 OCV 曲线
-    100% SoC -> 4.4V
-    0% SoC   -> 3.2V
-    拟合公式: 3.2 + 0.9*s + 0.3*s^2
-    """
-    return 3.2 + 0.9 * soc + 0.3 * (soc**2)
-
 def simulate_discharge(power_w, init_soc, capacity_mah=4575):
     """
-    模拟恒功率放电
+    模拟恒功率放电 (电池模型见 battery.py)
     """
-    # 电池参数
-    Q_coulomb = capacity_mah * 3.6
-    R0 = 0.05
-    Rp = 0.03
-    Cp = 2000
-    tau = Rp * Cp
-    cutoff_voltage = 3.0
-    
-    # 初始化
+    sim = BatterySim(capacity_mah=capacity_mah, soc=init_soc)
     dt = 1.0
-    soc = init_soc
-    up = 0.0
-    t = 0.0
-    
-    time_log = []
-    soc_log = []
     
-    while soc > 0:
-        ocv = get_ocv_corrected(soc)
-        
-        # 计算电流
-        a = R0
-        b = -(ocv - up)
-        c = power_w
-        delta = b**2 - 4*a*c
-        
-        if delta < 0: break # 电压崩溃
-        
-        I_load = (-b - np.sqrt(delta)) / (2*a)
-        v_term = ocv - up - I_load * R0
-        
-        if v_term < cutoff_voltage: break
-        
-        # 更新状态
-        soc -= (I_load * dt) / Q_coulomb
-        up = up * np.exp(-dt/tau) + I_load * Rp * (1 - np.exp(-dt/tau))
-        
-        if int(t) % 60 == 0:
-            time_log.append(t / 3600.0)
-            soc_log.append(soc * 100.0)
-            
-        t += dt
+    # 每分钟记录一次; 电压崩溃 / 截止电压 / 电量耗尽时停止
+    rec = Recorder(('soc',), every=60)
+    sim.discharge(power_w, dt, recorder=rec)
+    time_log = (rec['t'] / 3600.0).tolist()
+    soc_log = (rec['soc'] * 100.0).tolist()
         
     return time_log, soc_log
 
@@ -67,28 +26,49 @@ def simulate_discharge(power_w, init_soc, capacity_mah=4575):
 # 2. 修改后的绘图逻辑 (满足新需求)
 # ==========================================
 
-def plot_by_initial_soc_final():
-    # 定义变量
-    init_socs = [1.0, 0.75, 0.50, 0.25]
-    scenarios = [
-        {'power': 3.87, 'label': 'Heavy Usage(3.87W)', 'color': '#b52024'}, # 红
-        {'power': 2.21, 'label': 'Medium Usage(2.21W)',  'color': '#12501d'}, # 绿
-        {'power': 1.00, 'label': 'Light Usage(1.00W)',  'color': '#0271bb'}  # 蓝
-    ]
-    
+# 定义变量
+init_socs = [1.0, 0.75, 0.50, 0.25]
+scenarios = [
+    {'power': 3.87, 'label': 'Heavy Usage(3.87W)', 'color': '#b52024'}, # 红
+    {'power': 2.21, 'label': 'Medium Usage(2.21W)',  'color': '#12501d'}, # 绿
+    {'power': 1.00, 'label': 'Light Usage(1.00W)',  'color': '#0271bb'}  # 蓝
+]
+
+def simulate(init_socs=init_socs, scenarios=scenarios):
+    """
+    所有 (初始电量, 场景) 组合的放电曲线, 长表格式:
+    panel / scenario 两列索引标明每个采样点所属的曲线
+    """
+    panel, scen_idx, t_all, soc_all = [], [], [], []
+    for i, start_soc in enumerate(init_socs):
+        for k, scen in enumerate(scenarios):
+            t_data, soc_data = simulate_discharge(scen['power'], start_soc)
+            panel += [i] * len(t_data)
+            scen_idx += [k] * len(t_data)
+            t_all += t_data
+            soc_all += soc_data
+    return {'init_soc': np.array(init_socs, dtype=np.float64),
+            'power_w': np.array([s['power'] for s in scenarios], dtype=np.float64),
+            'labels': [s['label'] for s in scenarios], 'colors': [s['color'] for s in scenarios],
+            'panel': np.array(panel, dtype=np.int64), 'scenario': np.array(scen_idx, dtype=np.int64),
+            't_h': np.array(t_all, dtype=np.float64), 'soc': np.array(soc_all, dtype=np.float64)}
+
+def plot(result):
     # 创建 2x2 的子图布局
     fig, axes = plt.subplots(2, 2, figsize=(14, 10), sharey=True)
     axes = axes.flatten()
     
-    for i, start_soc in enumerate(init_socs):
+    for i, start_soc in enumerate(result['init_soc'].tolist()):
         ax = axes[i]
         
-        # 预先计算该子图下的所有曲线数据，以便确定 X 轴范围
+        # 取出该子图下的所有曲线数据，以便确定 X 轴范围
         plot_data = []
         max_time_in_subplot = 0
         
-        for scen in scenarios:
-            t_data, soc_data = simulate_discharge(scen['power'], start_soc)
+        for k, (label, color) in enumerate(zip(result['labels'], result['colors'])):
+            scen = {'label': label, 'color': color}
+            sel = (result['panel'] == i) & (result['scenario'] == k)
+            t_data, soc_data = result['t_h'][sel].tolist(), result['soc'][sel].tolist()
             plot_data.append({'scen': scen, 't': t_data, 'soc': soc_data})
             if len(t_data) > 0:
                 max_time_in_subplot = max(max_time_in_subplot, t_data[-1])
@@ -161,7 +141,11 @@ def plot_by_initial_soc_final():
         if i == 0:
             ax.legend(loc='upper right', fontsize=16, frameon=True, framealpha=1.0)
 
-    plt.tight_layout()
+    fig.tight_layout()
+    return fig
+
+def plot_by_initial_soc_final():
+    plot(simulate())
     plt.show()
 
 if __name__ == "__main__":
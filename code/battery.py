@@ -0,0 +1,259 @@
+import math
+import numpy as np
+
+# ==========================================
+# 1. Model primitives shared by every simulator
+# ==========================================
+
+# Quantities the stepping loops offer to a recorder.Recorder, in order
+CELL_CHANNELS = ('v_term', 'i_load', 'soc', 'up')
+
+# Simplified OCV curve: 3.2V (0%) -> 4.4V (100%), OCV = c0 + c1*s + c2*s^2
+OCV_COEFFS = (3.2, 0.9, 0.3)
+
+def get_ocv_corrected(soc):
+    # Works on scalars and NumPy arrays alike
+    return 3.2 + 0.9 * soc + 0.3 * (soc**2)
+
+def rc_decay(dt, tau):
+    """Exact RC decay factor exp(-dt/tau) for a zero-order-hold current."""
+    return math.exp(-dt / tau)
+
+def solve_current(ocv, up, R0, power_w):
+    """
+    Smaller root of R0*I^2 - (OCV-Up)*I + P = 0.
+    Returns None on voltage collapse (no real solution).
+    """
+    b = ocv - up
+    delta = b * b - 4.0 * R0 * power_w
+    if delta < 0:
+        return None
+    return (b - math.sqrt(delta)) / (2.0 * R0)
+
+def temperature_factors(temp_c):
+    """
+    (R0 factor, capacity factor) at temp_c relative to 25 C.
+    R0 follows an Arrhenius-like law (0C -> ~2.2x, 45C -> ~0.6x); capacity
+    drops 1%/C below 25 C and rises 0.1%/C above.  Accepts arrays.
+    """
+    T_ref = 298.15 # Kelvin
+    T_curr = np.asarray(temp_c, dtype=np.float64) + 273.15
+    r0_factor = np.exp(2500 * (1/T_curr - 1/T_ref))
+    dT = T_curr - T_ref
+    cap_factor = np.where(dT < 0, 1.0 + 0.01 * dT, 1.0 + 0.001 * dT)
+    if r0_factor.ndim == 0:
+        return float(r0_factor), float(cap_factor)
+    return r0_factor, cap_factor
+
+class ArrheniusCache:
+    """
+    temp_model factors tabulated on a uniform temperature grid, so stepping
+    kernels can refresh R0 / capacity with a linear interpolation instead of
+    an exp per update.  Temperatures outside the grid are clamped.
+    """
+
+    def __init__(self, temp_model=temperature_factors, t_min=-40.0, t_max=80.0, step=0.25):
+        self.grid = np.arange(t_min, t_max + 0.5 * step, step)
+        self.r0, self.cap = (np.asarray(f, dtype=np.float64) for f in temp_model(self.grid))
+        self.grid0 = float(self.grid[0])
+        self.inv_h = 1.0 / step
+
+    def factors(self, temp_c):
+        """(R0 factor, capacity factor) at a scalar temperature."""
+        x = (temp_c - self.grid0) * self.inv_h
+        i = min(max(int(math.floor(x)), 0), len(self.grid) - 2)
+        f = min(max(x - i, 0.0), 1.0)
+        return (float(self.r0[i] + f * (self.r0[i + 1] - self.r0[i])),
+                float(self.cap[i] + f * (self.cap[i + 1] - self.cap[i])))
+
+# ==========================================
+# 2. Single-cell Thevenin simulator
+# ==========================================
+class BatterySim:
+    """
+    1-RC Thevenin cell under a constant-power load.
+
+    ocv        : OCV(soc) callable, defaults to get_ocv_corrected
+    temp_c     : cell temperature; None keeps the 25 C reference parameters
+    temp_model : temp_c -> (R0 factor, capacity factor) hook
+    eta        : aging capacity factor (Q_rated - Q_loss) / Q_rated
+    r0_aging   : aging R0 growth factor (see aging.aged())
+    """
+
+    def __init__(self, capacity_mah=4575, R0=0.05, Rp=0.03, Cp=2000,
+                 cutoff_voltage=3.0, soc=1.0, temp_c=None,
+                 ocv=get_ocv_corrected, temp_model=temperature_factors,
+                 eta=1.0, r0_aging=1.0):
+        self.temp_c = temp_c
+        r0_factor, cap_factor = (1.0, 1.0) if temp_c is None else temp_model(temp_c)
+
+        self.capacity_mah = capacity_mah * cap_factor * eta
+        self.Q_coulomb = self.capacity_mah * 3.6
+        self.R0 = R0 * r0_factor * r0_aging
+        self.Rp = Rp
+        self.Cp = Cp
+        self.tau = self.Rp * self.Cp
+        self.cutoff_voltage = cutoff_voltage
+        self.ocv = ocv
+
+        self.soc = soc
+        self.up = 0.0
+
+        self._decay_dt = None
+        self._decay = None
+
+    def step(self, power_w, dt=1.0):
+        ocv = self.ocv(self.soc)
+
+        I_load = solve_current(ocv, self.up, self.R0, power_w)
+        if I_load is None:
+            return None, None, None # Voltage Collapse
+
+        v_term = ocv - self.up - I_load * self.R0
+
+        if v_term < self.cutoff_voltage or self.soc <= 0:
+            return v_term, I_load, 0.0 # Empty/Cutoff
+
+        # Update State
+        if dt != self._decay_dt:
+            self._decay = rc_decay(dt, self.tau)
+            self._decay_dt = dt
+        self.soc -= (I_load * dt) / self.Q_coulomb
+        self.up = self.up * self._decay + I_load * self.Rp * (1 - self._decay)
+
+        return v_term, I_load, self.soc
+
+    def discharge(self, power_w, dt=1.0, duration=math.inf, recorder=None):
+        """
+        step() at constant power until cutoff / collapse / empty or for
+        `duration` seconds, updating the cell state.  Every step offers
+        (t, v_term, i_load, soc, up) to `recorder` (a recorder.Recorder,
+        which keeps its own channels and decimates): v_term / i_load over
+        the step starting at t, soc / up after it, and flushed at the end.
+        Returns (t_elapsed, dead).
+        """
+        if recorder is not None:
+            recorder.bind(CELL_CHANNELS)
+        record = recorder.record if recorder is not None else None
+        step = self.step
+        cutoff = self.cutoff_voltage
+        t = 0.0
+        dead = False
+        while t < duration:
+            v, i, s = step(power_w, dt)
+            if v is None or v < cutoff or s <= 0:
+                dead = True
+                break
+            if record is not None:
+                record(t, v, i, s, self.up)
+            t += dt
+        if recorder is not None:
+            recorder.flush()
+        return t, dead
+
+    def integrator(self, method='adaptive', **kwargs):
+        """Integrator ('adaptive' or 'fixed') built on this cell's parameters."""
+        from integrator import AdaptiveIntegrator, FixedStepIntegrator
+        cls = {'adaptive': AdaptiveIntegrator, 'fixed': FixedStepIntegrator}[method]
+        return cls(capacity_mah=self.capacity_mah, R0=self.R0, Rp=self.Rp, Cp=self.Cp,
+                   cutoff_voltage=self.cutoff_voltage, ocv=self.ocv, **kwargs)
+
+    def time_to_empty(self, power_w, method='adaptive', **kwargs):
+        """
+        TTE (seconds) at constant power from the current state.
+        The cell state is left untouched.
+        """
+        _, _, t, _ = self.integrator(method, **kwargs).advance(self.soc, self.up, power_w)
+        return t
+
+    def run_profile(self, profile, sample_dt=None, method='adaptive', **kwargs):
+        """
+        Discharge through a loadprofile.LoadProfile segment by segment.
+        Returns (trace DataFrame, dead_time in s or None), see
+        loadprofile.simulate_profile().
+        """
+        from loadprofile import simulate_profile
+        return simulate_profile(self, profile, sample_dt, method, **kwargs)
+
+# ==========================================
+# 3. Electro-thermal cell
+# ==========================================
+class ThermalBatterySim(BatterySim):
+    """
+    BatterySim with a lumped thermal state:
+        C_th dT/dt = I*(Up + I*R0) - hA*(T - T_ambient)
+    integrated together with SoC and Up.  R0 and capacity follow the cell
+    temperature through an ArrheniusCache of temp_model.
+
+    temp_c          : initial cell temperature (defaults to ambient_c)
+    heat_capacity   : C_th, J/K
+    h_a             : convective conductance to ambient, W/K
+    thermal_block   : seconds between temperature / factor updates in run()
+    """
+
+    def __init__(self, capacity_mah=4575, R0=0.05, Rp=0.03, Cp=2000,
+                 cutoff_voltage=3.0, soc=1.0, temp_c=None, ambient_c=25.0,
+                 heat_capacity=100.0, h_a=0.15, thermal_block=30.0,
+                 ocv=get_ocv_corrected, temp_model=temperature_factors,
+                 eta=1.0, r0_aging=1.0, cache=None):
+        super().__init__(capacity_mah, R0, Rp, Cp, cutoff_voltage, soc, None, ocv,
+                         temp_model, eta, r0_aging)
+        self.R0_ref = self.R0
+        self.capacity_ref = self.capacity_mah
+        self.ambient_c = ambient_c
+        self.heat_capacity = heat_capacity
+        self.h_a = h_a
+        self.tau_th = heat_capacity / h_a
+        self.thermal_block = thermal_block
+        self.cache = cache if cache is not None else ArrheniusCache(temp_model)
+        self.set_temperature(ambient_c if temp_c is None else temp_c)
+
+    def set_temperature(self, temp_c):
+        self.temp_c = temp_c
+        r0_factor, cap_factor = self.cache.factors(temp_c)
+        self.R0 = self.R0_ref * r0_factor
+        self.capacity_mah = self.capacity_ref * cap_factor
+        self.Q_coulomb = self.capacity_mah * 3.6
+
+    def step(self, power_w, dt=1.0):
+        soc, up = self.soc, self.up
+        v_term, I_load, s = super().step(power_w, dt)
+        if v_term is not None and s > 0:
+            heat = I_load * (up + I_load * self.R0)
+            a_th = math.exp(-dt / self.tau_th)
+            self.set_temperature(self.ambient_c + (self.temp_c - self.ambient_c) * a_th
+                                 + heat / self.h_a * (1 - a_th))
+        return v_term, I_load, s
+
+    def run(self, power_w, duration=math.inf, dt=1.0):
+        """
+        Fixed-step electro-thermal discharge at constant power, updating the
+        cell state.  Returns (t_elapsed, dead); the loop runs in
+        integrator._thermal_step_kernel for the default OCV.
+        """
+        if self.ocv is not get_ocv_corrected:
+            t = 0.0
+            while t < duration:
+                v, _, s = self.step(power_w, dt)
+                if v is None or s <= 0:
+                    return t, True
+                t += dt
+            return t, False
+
+        from integrator import _thermal_step_kernel
+        self.soc, self.up, temp, t, dead, _ = _thermal_step_kernel(
+            self.soc, self.up, self.temp_c, power_w, duration, dt,
+            self.capacity_ref * 3.6, self.R0_ref, self.Rp, self.tau,
+            self.cutoff_voltage, *OCV_COEFFS, self.ambient_c, self.tau_th, self.h_a,
+            self.thermal_block, self.cache.grid0, self.cache.inv_h,
+            self.cache.r0, self.cache.cap)
+        self.set_temperature(temp)
+        return t, dead
+
+    def time_to_empty(self, power_w, dt=1.0):
+        """Electro-thermal TTE (seconds); the cell state is left untouched."""
+        state = (self.soc, self.up, self.temp_c)
+        t, _ = self.run(power_w, dt=dt)
+        self.soc, self.up = state[:2]
+        self.set_temperature(state[2])
+        return t
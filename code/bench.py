@@ -0,0 +1,272 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# 1. Timing helpers
+# ==========================================
+def best_of(fn, repeat=3, min_time=0.2):
+    """
+    Best wall time (s) of one fn() call: calls are batched until a batch
+    takes min_time (like timeit.autorange), best of `repeat` batches.
+    """
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or n >= 1 << 20:
+            break
+        n *= 2 if elapsed <= 0 else max(2, int(min_time / elapsed * 1.2))
+    best = elapsed / n
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / n)
+    return best
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               capture_output=True, text=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() + ('-dirty' if dirty.stdout.strip() else '')
+    except OSError:
+        return 'unknown'
+
+# ==========================================
+# 2. Benchmarks (each returns {metric: value}; *_per_s higher is better,
+#    *_s lower is better)
+# ==========================================
+def bench_step(quick=False):
+    """Single-cell BatterySim.step throughput on the 1 s grid."""
+    from battery import BatterySim
+    n = 20_000 if quick else 200_000
+    sim = BatterySim(capacity_mah=1e9) # never empties during the run
+
+    def run():
+        sim.soc, sim.up = 1.0, 0.0
+        step = sim.step
+        for _ in range(n):
+            step(2.21, 1.0)
+    return {'step_per_s': n / best_of(run, repeat=1 if quick else 3)}
+
+def bench_tte(quick=False):
+    """Full constant-power discharges: sa.run_simulation and TTE.simulate_discharge."""
+    from sa import run_simulation
+    from TTE import simulate_discharge
+    params = {'capacity_mah': 4575.0, 'r0': 0.05, 'p_base': 0.4, 'p_screen_coeff': 0.005}
+    out = {'run_simulation_per_s': 1.0 / best_of(lambda: run_simulation(params))}
+    t = best_of(lambda: simulate_discharge(3.87, 1.0), repeat=1 if quick else 3,
+                min_time=0.0 if quick else 0.2)
+    out['simulate_discharge_per_s'] = 1.0 / t
+    return out
+
+def bench_fleet(quick=False, sizes=(1, 10, 100, 1_000, 10_000, 100_000)):
+    """BatteryFleet.step cell-steps/s and time_to_empty discharges/s versus N."""
+    from fleet import BatteryFleet
+    if quick:
+        sizes = [n for n in sizes if n <= 10_000]
+    out = {}
+    for n in sizes:
+        power = np.linspace(1.0, 5.0, n)
+        fleet = BatteryFleet(n=n, capacity_mah=1e9)
+        steps = max(10, min(2_000, 2_000_000 // n))
+
+        def run():
+            for _ in range(steps):
+                fleet.step(power, 1.0)
+        out[f'step_cells_per_s_N{n}'] = n * steps / best_of(run, repeat=1 if quick else 3)
+        if n <= 10_000:
+            t = best_of(lambda: BatteryFleet(n=n).time_to_empty(power, dt=30.0), repeat=1,
+                        min_time=0.0 if quick else 0.2)
+            out[f'tte_per_s_N{n}'] = n / t
+    return out
+
+def scaled_csv(src, n_rows, out_path):
+    """Write src's header plus its body repeated until n_rows data rows."""
+    with open(src, 'rb') as f:
+        header = f.readline()
+        body = f.read()
+    if not body.endswith(b'\n'):
+        body += b'\n'
+    lines = body.count(b'\n')
+    reps, rest = divmod(n_rows, lines)
+    with open(out_path, 'wb') as f:
+        f.write(header)
+        for _ in range(reps):
+            f.write(body)
+        if rest:
+            f.write(b''.join(body.splitlines(keepends=True)[:rest]))
+    return out_path
+
+def bench_csv(quick=False, rows=None, src='aggregated.csv', tmp_dir=None):
+    """
+    Load time of aggregated.csv scaled to `rows` rows (body repeated):
+    full pandas.read_csv, telemetry.load_columns of three rails, the
+    one-time ColumnStore build and a warm ColumnStore open + column sum.
+    Each size also reports the extrapolated time at 1e8 rows (linear).
+    """
+    from telemetry import ColumnStore, load_columns
+    rows = rows or ([10_000, 100_000] if quick else [100_000, 1_000_000])
+    cols = ['Display_ENERGY_AVG_UWS', 'CPU_BIG_ENERGY_AVG_UWS', 'BATTERY__PERCENT']
+    out = {}
+    tmp = tempfile.mkdtemp(prefix='bench_csv_', dir=tmp_dir)
+    try:
+        for n in rows:
+            path = scaled_csv(src, int(n), os.path.join(tmp, f'rows{int(n)}.csv'))
+            tag = f'{int(n):.0e}'.replace('+0', '').replace('+', '')
+            t0 = time.perf_counter()
+            pd.read_csv(path)
+            out[f'read_csv_s_{tag}'] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            load_columns(path, cols)
+            out[f'load_columns_s_{tag}'] = time.perf_counter() - t0
+            cache = os.path.join(tmp, 'cache')
+            t0 = time.perf_counter()
+            ColumnStore(path, cache_dir=cache)
+            out[f'store_build_s_{tag}'] = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            store = ColumnStore(path, cache_dir=cache)
+            for c in cols:
+                float(np.nansum(store[c]))
+            out[f'store_open_s_{tag}'] = time.perf_counter() - t0
+            scale = 1e8 / n
+            for k in ('read_csv', 'load_columns', 'store_build'):
+                out[f'{k}_s_1e8_est_from_{tag}'] = out[f'{k}_s_{tag}'] * scale
+            os.remove(path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out
+
+def bench_fit(quick=False):
+    """
+    Fit latency of the cpu.py cluster models (powerfit.fit_clusters) and
+    the screen.py OLED regression (same features, sklearn), data loading
+    excluded.
+    """
+    from sklearn.linear_model import LinearRegression
+    from powerfit import CLUSTERS, fit_clusters, oled_features
+    from telemetry import open_columns
+    df = open_columns('aggregated.csv', [c for pair in CLUSTERS.values() for c in pair])
+    screen = open_columns('aggregated.csv', ['Display_ENERGY_AVG_UWS', 'Brightness', 'RougeMesuré',
+                                             'VertMesuré', 'BleuMesuré']).astype(np.float64)
+
+    def fit_screen():
+        X = oled_features(screen['Brightness'], screen['RougeMesuré'], screen['VertMesuré'],
+                          screen['BleuMesuré'], screen['Brightness'].max() or 1.0)
+        LinearRegression().fit(X, screen['Display_ENERGY_AVG_UWS'].to_numpy() / 1e6)
+
+    repeat = 1 if quick else 3
+    return {'cpu_fit_s': best_of(lambda: fit_clusters(df, CLUSTERS), repeat),
+            'screen_fit_s': best_of(fit_screen, repeat)}
+
+BENCHMARKS = {
+    'step':  bench_step,
+    'tte':   bench_tte,
+    'fleet': bench_fleet,
+    'csv':   bench_csv,
+    'fit':   bench_fit,
+}
+
+# ==========================================
+# 3. Runner, JSON results and comparison
+# ==========================================
+def run(names=None, quick=False, csv_rows=None, verbose=True):
+    """Run the selected benchmarks; returns the result document."""
+    doc = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'quick': quick,
+        'results': {},
+    }
+    for name in names or BENCHMARKS:
+        t0 = time.perf_counter()
+        kwargs = {'rows': csv_rows} if name == 'csv' and csv_rows else {}
+        metrics = BENCHMARKS[name](quick=quick, **kwargs)
+        doc['results'][name] = metrics
+        if verbose:
+            print(f"[{name}] {time.perf_counter() - t0:.1f}s")
+            for k, v in metrics.items():
+                print(f"  {k:40s} {v:14.6g}")
+    return doc
+
+def save(doc, out_dir='bench_results'):
+    """Write <out_dir>/<timestamp>-<revision>.json; returns the path."""
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = doc['timestamp'].replace(':', '').replace('-', '')
+    path = os.path.join(out_dir, f"{stamp}-{doc['revision']}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(doc, f, indent=1)
+    return path
+
+def latest(out_dir='bench_results', exclude=None):
+    """Most recent result file in out_dir (None if there is none)."""
+    if not os.path.isdir(out_dir):
+        return None
+    files = sorted(f for f in os.listdir(out_dir) if f.endswith('.json'))
+    files = [os.path.join(out_dir, f) for f in files]
+    files = [f for f in files if exclude is None or os.path.abspath(f) != os.path.abspath(exclude)]
+    return files[-1] if files else None
+
+def compare(new, old, tol=0.10):
+    """
+    Metric-by-metric ratio of two result documents.  A metric regresses
+    when it gets more than tol worse: rates (*_per_s) drop, times (*_s)
+    grow.  Returns a DataFrame sorted by change.
+    """
+    rows = []
+    for bench, metrics in new['results'].items():
+        for k, v in metrics.items():
+            ref = old['results'].get(bench, {}).get(k)
+            if ref is None or ref == 0:
+                continue
+            higher_better = '_per_s' in k
+            speedup = v / ref if higher_better else ref / v
+            rows.append((bench, k, ref, v, speedup, speedup < 1.0 - tol))
+    return pd.DataFrame(rows, columns=['bench', 'metric', 'old', 'new', 'speedup', 'regression']) \
+        .sort_values('speedup').reset_index(drop=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulator and fitter benchmarks")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="benchmarks to run")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes, single repeat")
+    parser.add_argument('--rows', nargs='+', type=float,
+                        help="CSV sizes in rows, e.g. 1e6 1e7 1e8 (needs the disk space)")
+    parser.add_argument('--out', default='bench_results', help="result directory")
+    parser.add_argument('--compare', nargs='?', const='latest',
+                        help="result file to compare against (default: the latest one)")
+    parser.add_argument('--tol', type=float, default=0.10, help="regression threshold")
+    args = parser.parse_args()
+
+    doc = run(args.only, args.quick, [int(r) for r in args.rows] if args.rows else None)
+    path = save(doc, args.out)
+    print(f"results written to {path}")
+    if args.compare:
+        ref = latest(args.out, exclude=path) if args.compare == 'latest' else args.compare
+        if ref is None:
+            print("nothing to compare against")
+        else:
+            with open(ref, encoding='utf-8') as f:
+                table = compare(doc, json.load(f), args.tol)
+            print(f"against {ref}:")
+            print(table.to_string(index=False, float_format=lambda x: f"{x:.4g}"))
+            if table['regression'].any():
+                print(f"{int(table['regression'].sum())} metric(s) regressed by more than "
+                      f"{args.tol:.0%}")
@@ -1,5 +1,7 @@
 import matplotlib.pyplot as plt
 import numpy as np
+from powermodel import PowerModel, direct, linear, screen_linear
+from tte_table import TTETable
 
 # ==========================================
 # 1. 手动数据输入区 (MANUAL INPUT DATA)
@@ -54,35 +56,35 @@ COEFFS = {
 # 2. 计算逻辑 (Calculation Engine)
 # ==========================================
 
+def build_power_model(coeffs):
+    """场景功耗模型: 各组件编译成一个向量化的 P_total (参数可为标量或数组)"""
+    return PowerModel([
+        screen_linear(coeffs['screen_base'], coeffs['screen_slope'], name='Screen'), # 息屏为 0
+        linear(coeffs['cpu_max_power'], 'cpu_load', name='CPU'), # 简化线性模型: Load * MaxPower
+        linear(coeffs['wifi_slope'], 'wifi_mbps', name='WiFi'),
+        direct('gpu_power_w', name='GPU'),        # Others (Manual)
+        direct('audio_power_w', name='Audio'),
+        direct('base_power_w', name='System Base'),
+    ])
+
+_MODELS = {}
+
 def calculate_scenario_power(params, coeffs):
     """根据输入参数计算各组件功耗"""
-    # 1. Screen
-    p_screen = coeffs['screen_base'] + coeffs['screen_slope'] * params['brightness']
-    if params['brightness'] == 0: p_screen = 0 # 息屏修正
-    
-    # 2. CPU (简化线性模型: Load * MaxPower)
-    p_cpu = params['cpu_load'] * coeffs['cpu_max_power']
-    
-    # 3. WiFi
-    p_wifi = params['wifi_mbps'] * coeffs['wifi_slope']
-    
-    # 4. Others (Manual)
-    p_gpu = params['gpu_power_w']
-    p_audio = params['audio_power_w']
-    p_base = params['base_power_w']
-    
-    total = p_screen + p_cpu + p_wifi + p_gpu + p_audio + p_base
-    
+    key = tuple(sorted(coeffs.items()))
+    if key not in _MODELS:
+        _MODELS[key] = build_power_model(coeffs)
+    model = _MODELS[key]
+    inputs = {k: params[k] for k in model.inputs}
+    parts = model.breakdown(**inputs)
+    total = model(**inputs)
+    if np.ndim(total) == 0:
+        total = float(total)
+        parts = {k: float(v) for k, v in parts.items()}
+
     return {
         'Total': total,
-        'Breakdown': {
-            'Screen': p_screen,
-            'CPU': p_cpu,
-            'GPU': p_gpu,
-            'WiFi': p_wifi,
-            'Audio': p_audio,
-            'System Base': p_base
-        }
+        'Breakdown': {k: parts[k] for k in ('Screen', 'CPU', 'GPU', 'WiFi', 'Audio', 'System Base')}
     }
 
 # ==========================================
@@ -94,6 +96,9 @@ def main():
     results = {}
     battery_wh = (BATTERY_CONFIG['capacity_mah'] / 1000) * BATTERY_CONFIG['voltage_nom']
     print(f"--- Battery Energy: {battery_wh:.2f} Wh ---\n")
+    
+    # 等效电路 (ECM) 的 TTE 查表，首次运行时自动生成 tte_table.npz
+    tte_table = TTETable()
 
     # 2. 遍历计算
     for name, params in SCENARIOS.items():
@@ -108,7 +113,8 @@ def main():
         for soc in [1.0, 0.75, 0.5, 0.25]:
             energy = battery_wh * soc
             time_h = energy / res['Total']
-            print(f"    - {int(soc*100)}% SOC: {time_h:.2f} h ({int(time_h*60)} min)")
+            ecm_h = tte_table.tte(res['Total'], soc, capacity_mah=BATTERY_CONFIG['capacity_mah'])
+            print(f"    - {int(soc*100)}% SOC: {time_h:.2f} h ({int(time_h*60)} min), ECM {ecm_h:.2f} h")
         print("-" * 30)
 
     # 3. 绘制饼状图
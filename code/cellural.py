@@ -2,15 +2,17 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import math
+from telemetry import ColumnStore, RunningStats
 
 # 1. Load Data
 try:
-    df = pd.read_csv('aggregated.csv')
+    store = ColumnStore('aggregated.csv')
+    columns = store.columns
     
     # Identify the correct column for Cellular Power
     # Based on the snippet, it might be 'CELLULAR_ENERGY_AVG_UWS'
     target_col = None
-    for col in df.columns:
+    for col in columns:
         if 'CELLULAR' in col.upper() and 'ENERGY' in col.upper():
             target_col = col
             break
@@ -21,9 +23,13 @@ try:
         # 2. Process Data
         # Convert uWs to W (Assuming 1s interval or simply treating as mean power in uW)
         # 1 uW = 1e-6 W
-        # If the column contains non-numeric data (e.g. errors), coerce them
-        y_data = pd.to_numeric(df[target_col], errors='coerce')
-        y_data = y_data.dropna()
+        # Memory-map the single column from the columnar cache (non-numeric
+        # entries are NaN) and accumulate mean/variance block by block
+        rail = store[target_col]
+        stats = RunningStats([target_col])
+        for k in range(0, len(rail), 500_000):
+            stats.update(rail[k:k + 500_000, None] / 1e3)
+        y_data = pd.Series(rail, name=target_col).dropna()
         
         # Convert to Watts
         y_data_w = y_data /1e3
@@ -31,8 +37,8 @@ try:
         x_data = y_data.index # Data ID
         
         # 3. Calculate Stats
-        variance = y_data_w.var()
-        mean_val = y_data_w.mean()
+        variance = stats.var()[0]
+        mean_val = stats.mean[0]
         
         # 4. Plot
         plt.figure(figsize=(12, 8))
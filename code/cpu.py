@@ -1,19 +1,11 @@
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.metrics import r2_score
+from powerfit import cluster_power, fit_clusters
+from telemetry import open_columns, read_header
 
 def model_cpu_gpu_power_clean():
-    # 1. 读取数据
-    try:
-        df = pd.read_csv('aggregated.csv')
-    except FileNotFoundError:
-        print("错误: 找不到文件 'aggregated.csv'")
-        return
-
-    # 2. 定义聚类 (3个CPU + 1个GPU)
+    # 1. 定义聚类 (3个CPU + 1个GPU)
     clusters = {
         'Little Core': {'pwr': 'CPU_LITTLE_ENERGY_AVG_UWS', 'freq': 'CPU_LITTLE_FREQ_KHz'},
         'Mid Core':    {'pwr': 'CPU_MID_ENERGY_AVG_UWS',    'freq': 'CPU_MID_FREQ_KHz'},
@@ -21,6 +13,18 @@ def model_cpu_gpu_power_clean():
         'GPU':         {'pwr': 'GPU_ENERGY_AVG_UWS',        'freq': 'GPU0_FREQ'}
     }
 
+    # 2. 读取数据 (首次运行转换为列式缓存，之后只映射需要的列，float32，'err' 记为 NaN)
+    try:
+        names = read_header('aggregated.csv')
+    except FileNotFoundError:
+        print("错误: 找不到文件 'aggregated.csv'")
+        return
+    wanted = [c for cols in clusters.values() for c in cols.values() if c in names]
+    df = open_columns('aggregated.csv', wanted)
+
+    # 一次性批量拟合所有聚类的三次模型 (系数表可直接供仿真使用)
+    table = fit_clusters(df, {k: (c['pwr'], c['freq']) for k, c in clusters.items()})
+
     # 3. 设置绘图布局 (2x2)
     fig, axes = plt.subplots(2, 2, figsize=(15, 10))
     axes_flat = axes.flatten()
@@ -40,12 +44,10 @@ def model_cpu_gpu_power_clean():
             ax.set_title(name)
             continue
 
-        pwr_raw = pd.to_numeric(df[cols['pwr']], errors='coerce')
-        freq_raw = pd.to_numeric(df[cols['freq']], errors='coerce')
-        data = pd.DataFrame({'pwr': pwr_raw, 'freq': freq_raw}).dropna()
+        data = pd.DataFrame({'pwr': df[cols['pwr']], 'freq': df[cols['freq']]}).dropna()
         
-        y = data['pwr'].values / 1e6   # W
-        x = data['freq'].values / 1000.0 # MHz
+        y = data['pwr'].values.astype(np.float64) / 1e6   # W
+        x = data['freq'].values.astype(np.float64) / 1000.0 # MHz
         
         mask = x > 0
         x_active = x[mask].reshape(-1, 1)
@@ -55,19 +57,13 @@ def model_cpu_gpu_power_clean():
             ax.text(0.5, 0.5, 'Insufficient Data', ha='center')
             continue
 
-        # --- 建模 ---
-        poly = PolynomialFeatures(degree=3, include_bias=False)
-        x_poly = poly.fit_transform(x_active)
-        model = LinearRegression()
-        model.fit(x_poly, y_active)
-        
         # --- 绘图 ---
         # 1. Measured Data (原始散点)
         ax.scatter(x_active, y_active, alpha=0.15, color='#555555', s=25, label='Measured Data')
         
         # 2. Fitted Curve (拟合曲线)
         x_range = np.linspace(x_active.min(), x_active.max(), 100).reshape(-1, 1)
-        y_range = model.predict(poly.transform(x_range))
+        y_range = cluster_power(table, name, x_range)
         ax.plot(x_range, y_range, 'r-', lw=3, label='Fitted Curve')
         
         # --- 装饰 ---
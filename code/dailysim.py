@@ -1,13 +1,13 @@
-import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from datetime import datetime, timedelta
+from battery import BatterySim
+from loadprofile import LoadProfile
 
 # ==========================================
 # 0. Global Style Settings (Large & Bold)
 # ==========================================
-plt.rcParams.update({
+STYLE = {
     'font.size': 16,
     'font.weight': 'bold',
     'axes.labelweight': 'bold',
@@ -16,41 +16,13 @@ plt.rcParams.update({
     'xtick.labelsize': 14,
     'ytick.labelsize': 14,
     'legend.fontsize': 14
-})
+}
 
 # ==========================================
 # 1. Simulation Setup
 # ==========================================
 
-# Battery Simulation Model
-def get_ocv_corrected(soc):
-    return 3.2 + 0.9 * soc + 0.3 * (soc**2)
-
-class BatterySim:
-    def __init__(self, capacity_mah=4575):
-        self.Q_coulomb = capacity_mah * 3.6
-        self.R0 = 0.05
-        self.Rp = 0.03
-        self.Cp = 2000
-        self.tau = self.Rp * self.Cp
-        self.cutoff_voltage = 3.0
-        self.soc = 1.0
-        self.up = 0.0
-        
-    def step(self, power_w, dt=1.0):
-        ocv = get_ocv_corrected(self.soc)
-        a = self.R0
-        b = -(ocv - self.up)
-        c = power_w
-        delta = b**2 - 4*a*c
-        if delta < 0: return None, None, None
-        I_load = (-b - np.sqrt(delta)) / (2*a)
-        v_term = ocv - self.up - I_load * self.R0
-        if v_term < self.cutoff_voltage or self.soc <= 0:
-            return v_term, I_load, 0.0
-        self.soc -= (I_load * dt) / self.Q_coulomb
-        self.up = self.up * np.exp(-dt/self.tau) + I_load * self.Rp * (1 - np.exp(-dt/self.tau))
-        return v_term, I_load, self.soc
+# Battery Simulation Model: battery.BatterySim
 
 # Schedule
 P_HIGH, P_MED, P_LOW = 3.87, 2.21, 1.00
@@ -60,82 +32,92 @@ schedule = [
     (2.0, P_HIGH, "High"), (2.0, P_MED, "Medium"), (1.5, P_LOW, "Low")
 ]
 
-sim = BatterySim()
 start_time = datetime(2024, 1, 1, 9, 0, 0)
-time_points, soc_points, voltage_points = [], [], []
-current_time = start_time
-dt = 1.0; is_dead = False; dead_time = None
-
-for duration_h, power, label in schedule:
-    if is_dead: break
-    steps = int(duration_h * 3600)
-    for _ in range(steps):
-        v, i, s = sim.step(power, dt)
-        if v is None or s <= 0:
-            is_dead = True; dead_time = current_time; break
-        if current_time.second == 0:
-            time_points.append(current_time)
-            soc_points.append(s * 100)
-            voltage_points.append(v)
-        current_time += timedelta(seconds=dt)
+def clock(t_s):
+    return start_time + timedelta(seconds=float(t_s))
+
+def simulate(schedule=schedule):
+    """
+    Constant segments are integrated in bulk, time is float seconds from
+    start; the trace is sampled once a minute for plotting.
+    """
+    profile = LoadProfile.from_schedule(schedule)
+    sim = BatterySim()
+    trace, dead_s = sim.run_profile(profile, sample_dt=60.0)
+    return {'t_s': trace['t_s'].to_numpy(), 'soc': trace['soc'].to_numpy(),
+            'v_term': trace['v_term'].to_numpy(), 'dead_s': dead_s,
+            'seg_t0': profile.edges[:-1], 'seg_duration_s': profile.durations,
+            'seg_power_w': profile.powers, 'seg_label': list(profile.labels)}
 
 # ==========================================
 # 2. Plotting: Modified (No Power Curve, Distinct Background)
 # ==========================================
 
-fig, ax1 = plt.subplots(figsize=(16, 10))
-
-# 1. SoC (Left Axis)
-p1, = ax1.plot(time_points, soc_points, "grey", linewidth=3, label="SoC (%)")
-ax1.set_xlabel("Time of Day")
-ax1.set_ylabel("SoC (%)")
-ax1.set_ylim(0, 105)
-ax1.tick_params(axis='y', colors=p1.get_color())
-ax1.yaxis.label.set_color(p1.get_color())
-
-# 2. Voltage (Right Axis)
-ax2 = ax1.twinx()
-p2, = ax2.plot(time_points, voltage_points, "k-", linewidth=2.5, label="Voltage (V)")
-ax2.set_ylabel("Voltage (V)")
-ax2.set_ylim(2.5, 4.5)
-ax2.tick_params(axis='y', colors=p2.get_color())
-ax2.yaxis.label.set_color(p2.get_color())
-
-# 3. Background Phases (More distinct: alpha=0.5)
-# Using slightly more saturated colors to make them pop more
-phase_colors = {
-    P_HIGH: '#D98880', # Stronger Red
-    P_MED: '#7FB3D5',  # Stronger Orange
-    P_LOW: '#8FBC8F'   # Stronger Blue/Purple
-}
-curr = start_time
-for duration_h, power, label in schedule:
-    end = curr + timedelta(hours=duration_h)
-    if is_dead and end > dead_time: end = dead_time
-    
-    # Increased alpha to 0.4 for visibility
-    ax1.axvspan(curr, end, color=phase_colors[power], alpha=0.4)
-    
-    #Label
-    mid = curr + (end - curr)/2
-    if duration_h >= 1.0 and (not is_dead or mid < dead_time):
-        ax1.text(mid, 50, label, ha='center', va='center', fontsize=16, rotation=0, color='black', fontweight='bold')
-    
-    curr = end
-    if is_dead and curr >= dead_time: break
-
-# Dead Time Marker
-if is_dead:
-    ax1.axvline(dead_time, color='red', linestyle='--', linewidth=3)
-    ax1.text(dead_time, 16, f' DRAINED\n {dead_time.strftime("%H:%M")}', color='red', fontweight='bold', fontsize=18, ha='left')
-
-# Legend
-lines = [p1, p2]
-ax1.legend(lines, [l.get_label() for l in lines], loc='upper right')
-
-# Formatting
-ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
-
-plt.tight_layout()
-plt.savefig('daily_simulation_no_power_curve.png')
-plt.show()
\ No newline at end of file
+def plot(result):
+    time_points = [clock(t) for t in result['t_s']]
+    soc_points = (result['soc'] * 100).tolist()
+    voltage_points = result['v_term'].tolist()
+    dead_s = result['dead_s']
+    is_dead = dead_s is not None
+    dead_time = clock(dead_s) if is_dead else None
+
+    with plt.rc_context(STYLE):
+        fig, ax1 = plt.subplots(figsize=(16, 10))
+
+        # 1. SoC (Left Axis)
+        p1, = ax1.plot(time_points, soc_points, "grey", linewidth=3, label="SoC (%)")
+        ax1.set_xlabel("Time of Day")
+        ax1.set_ylabel("SoC (%)")
+        ax1.set_ylim(0, 105)
+        ax1.tick_params(axis='y', colors=p1.get_color())
+        ax1.yaxis.label.set_color(p1.get_color())
+
+        # 2. Voltage (Right Axis)
+        ax2 = ax1.twinx()
+        p2, = ax2.plot(time_points, voltage_points, "k-", linewidth=2.5, label="Voltage (V)")
+        ax2.set_ylabel("Voltage (V)")
+        ax2.set_ylim(2.5, 4.5)
+        ax2.tick_params(axis='y', colors=p2.get_color())
+        ax2.yaxis.label.set_color(p2.get_color())
+
+        # 3. Background Phases (More distinct: alpha=0.5)
+        # Using slightly more saturated colors to make them pop more
+        phase_colors = {
+            P_HIGH: '#D98880', # Stronger Red
+            P_MED: '#7FB3D5',  # Stronger Orange
+            P_LOW: '#8FBC8F'   # Stronger Blue/Purple
+        }
+        segments = zip(result['seg_t0'].tolist(), result['seg_duration_s'].tolist(),
+                       result['seg_power_w'].tolist(), result['seg_label'])
+        for t0, duration_s, power, label in segments:
+            t1 = t0 + duration_s
+            if is_dead and t1 > dead_s: t1 = dead_s
+
+            # Increased alpha to 0.4 for visibility
+            ax1.axvspan(clock(t0), clock(t1), color=phase_colors[power], alpha=0.4)
+
+            #Label
+            mid = 0.5 * (t0 + t1)
+            if duration_s >= 3600 and (not is_dead or mid < dead_s):
+                ax1.text(clock(mid), 50, label, ha='center', va='center', fontsize=16, rotation=0, color='black', fontweight='bold')
+
+            if is_dead and t1 >= dead_s: break
+
+        # Dead Time Marker
+        if is_dead:
+            ax1.axvline(dead_time, color='red', linestyle='--', linewidth=3)
+            ax1.text(dead_time, 16, f' DRAINED\n {dead_time.strftime("%H:%M")}', color='red', fontweight='bold', fontsize=18, ha='left')
+
+        # Legend
+        lines = [p1, p2]
+        ax1.legend(lines, [l.get_label() for l in lines], loc='upper right')
+
+        # Formatting
+        ax1.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M'))
+
+        fig.tight_layout()
+    return fig
+
+if __name__ == "__main__":
+    plot(simulate()).savefig('daily_simulation_no_power_curve.png')
+    plt.show()
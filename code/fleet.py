@@ -0,0 +1,231 @@
+import numpy as np
+
+from battery import CELL_CHANNELS, get_ocv_corrected, temperature_factors
+
+# ==========================================
+# 1. Battery Model (Thevenin), vectorized over N cells
+# ==========================================
+
+class BatteryFleet:
+    """
+    N independent cells advanced together with the same constant-power
+    quadratic solve as BatterySim.step().
+
+    Every parameter may be a scalar or an array of length N; all of them are
+    broadcast to float64 arrays of shape (N,).  Cells that hit voltage
+    collapse (delta < 0), the cutoff voltage or SoC <= 0 are frozen and their
+    death time is recorded in `death_time` (seconds, NaN while alive).
+    `ocv`, `temp_c`, `temp_model`, `eta` and `r0_aging` behave as in
+    battery.BatterySim.
+    """
+
+    def __init__(self, n=None, capacity_mah=4575, R0=0.05, Rp=0.03, Cp=2000,
+                 cutoff_voltage=3.0, soc=1.0, temp_c=None,
+                 ocv=get_ocv_corrected, temp_model=temperature_factors,
+                 eta=1.0, r0_aging=1.0):
+        params = [capacity_mah, R0, Rp, Cp, cutoff_voltage, soc, eta, r0_aging]
+        if temp_c is not None:
+            params.append(temp_c)
+        if n is None:
+            n = max(np.size(p) for p in params)
+        self.n = int(n)
+
+        def col(x):
+            return np.array(np.broadcast_to(np.asarray(x, dtype=np.float64), (self.n,)))
+
+        r0_factor, cap_factor = (1.0, 1.0) if temp_c is None else temp_model(temp_c)
+        self.temp_c = None if temp_c is None else col(temp_c)
+
+        self.capacity_mah = col(capacity_mah) * cap_factor * col(eta)
+        self.Q_coulomb = self.capacity_mah * 3.6
+        self.R0 = col(R0) * r0_factor * col(r0_aging)
+        self.Rp = col(Rp)
+        self.Cp = col(Cp)
+        self.tau = self.Rp * self.Cp
+        self.cutoff_voltage = col(cutoff_voltage)
+        self.ocv = ocv
+
+        self.soc = col(soc)
+        self.up = np.zeros(self.n)
+        self.t = 0.0
+
+        self.alive = np.ones(self.n, dtype=bool)
+        self.collapsed = np.zeros(self.n, dtype=bool)
+        self.death_time = np.full(self.n, np.nan)
+        self.death_voltage = np.full(self.n, np.nan)
+
+        # RC decay factor exp(-dt/tau) only depends on dt, cache it
+        self._decay_dt = None
+        self._decay = None
+
+    def _rc_decay(self, dt):
+        if dt != self._decay_dt:
+            self._decay = np.exp(-dt / self.tau)
+            self._decay_dt = dt
+        return self._decay
+
+    # ---- RC state hooks (nrc.NRCFleet keeps one row per branch) ----
+    def _rc_advance(self, up, I_load, dt):
+        """RC state after dt at a constant I_load (exact zero-order hold)."""
+        decay = self._rc_decay(dt)
+        return up * decay + I_load * self.Rp * (1 - decay)
+
+    def _polarization(self, up):
+        """Total polarization voltage of an RC state."""
+        return up
+
+    def step(self, power_w, dt=1.0):
+        """
+        Advance every alive cell by dt seconds at power_w (scalar or (N,)).
+        Returns (v_term, I_load, soc).  A cell that dies in this step still
+        reports the v_term / I_load it died at (NaN / NaN on collapse) with
+        soc 0; cells dead before the step give NaN / 0 / 0.
+        """
+        was_alive = self.alive.copy()
+        ocv = self.ocv(self.soc)
+
+        # Solving Quadratic for Current I: R0*I^2 - (OCV-Up)*I + P = 0
+        b = ocv - self._polarization(self.up)
+        delta = b * b - 4.0 * self.R0 * power_w
+
+        collapse = self.alive & (delta < 0)
+        sqrt_delta = np.sqrt(np.where(delta < 0, 0.0, delta))
+        I_load = (b - sqrt_delta) / (2.0 * self.R0)
+        v_term = b - I_load * self.R0
+
+        cutoff = self.alive & ~collapse & ((v_term < self.cutoff_voltage) | (self.soc <= 0))
+        died = collapse | cutoff
+        if died.any():
+            self.collapsed |= collapse
+            self.death_time[died] = self.t
+            self.death_voltage[died] = np.where(collapse, -np.inf, v_term)[died]
+            self.alive &= ~died
+
+        # Update State (alive cells only)
+        I_live = np.where(self.alive, I_load, 0.0)
+        self.soc -= (I_live * dt) / self.Q_coulomb
+        self.up = np.where(self.alive, self._rc_advance(self.up, I_live, dt), self.up)
+        self.t += dt
+
+        v_term = np.where(collapse | ~was_alive, np.nan, v_term)
+        I_load = np.where(collapse, np.nan, np.where(was_alive, I_load, 0.0))
+        return v_term, I_load, np.where(self.alive, self.soc, 0.0)
+
+    def run(self, power_w, dt=1.0, t_max=7 * 24 * 3600.0, recorder=None):
+        """
+        Step until every cell is dead or t_max is reached.  A
+        recorder.Recorder(n_cells=N) is offered (t, v_term, i_load, soc,
+        up) after every step and flushed at the end, as in
+        BatterySim.discharge().
+        Returns the time-to-empty of each cell in seconds (NaN if still alive).
+        """
+        if recorder is not None:
+            recorder.bind(CELL_CHANNELS)
+        while self.alive.any() and self.t < t_max:
+            t = self.t
+            v, i, soc = self.step(power_w, dt)
+            if recorder is not None:
+                recorder.record(t, v, i, soc, self._polarization(self.up))
+        if recorder is not None:
+            recorder.flush()
+        return self.death_time.copy()
+
+    def _discriminant(self, soc, up, power_w):
+        """(b, delta) of R0*I^2 - b*I + P = 0 at (soc, up); delta < 0 is collapse."""
+        b = self.ocv(soc) - self._polarization(up)
+        return b, b * b - 4.0 * self.R0 * power_w
+
+    def _terminal(self, soc, up, power_w):
+        """(I_load, v_term) at (soc, up); v_term is -inf on voltage collapse."""
+        b, delta = self._discriminant(soc, up, power_w)
+        I_load = (b - np.sqrt(np.maximum(delta, 0.0))) / (2.0 * self.R0)
+        v_term = np.where(delta < 0, -np.inf, b - I_load * self.R0)
+        return I_load, v_term
+
+    def time_to_empty(self, power_w, dt=30.0, t_max=7 * 24 * 3600.0):
+        """
+        Large-step counterpart of run() for constant loads.
+
+        Each step is a Heun predictor/corrector with the exact RC update;
+        when a cell crosses the cutoff voltage (or SoC = 0) inside a step its
+        death time and terminal voltage (`death_voltage`, -inf on collapse)
+        are placed by linear interpolation: of v_term for the cutoff, of the
+        discriminant b^2 - 4*R0*P for a collapse.  At dt=30 s the TTE stays within
+        ~1 s of the 1 s loop (0.5-8 W, R0 up to 0.3 ohm) for 30x fewer steps.
+        Returns the time-to-empty of each cell in seconds (NaN if still alive).
+        """
+        power_w = np.broadcast_to(np.asarray(power_w, dtype=np.float64), (self.n,))
+        advance = self._rc_advance
+        k_soc = dt / self.Q_coulomb
+
+        I0, v0 = self._terminal(self.soc, self.up, power_w)
+        died = self.alive & ((v0 < self.cutoff_voltage) | (self.soc <= 0))
+        self.collapsed |= died & np.isneginf(v0)
+        self.death_time[died] = self.t
+        self.death_voltage[died] = v0[died]
+        self.alive &= ~died
+
+        while self.alive.any() and self.t < t_max:
+            # Predictor
+            I1, _ = self._terminal(self.soc - I0 * k_soc, advance(self.up, I0, dt), power_w)
+            I_avg = 0.5 * (I0 + I1)
+            # Corrector
+            soc1 = self.soc - I_avg * k_soc
+            up1 = advance(self.up, I_avg, dt)
+            I1, v1 = self._terminal(soc1, up1, power_w)
+
+            died = self.alive & ((v1 < self.cutoff_voltage) | (soc1 <= 0))
+            if died.any():
+                v_end = v1
+                frac_g = np.full(self.n, np.inf)
+                collapse = died & np.isneginf(v1)
+                if collapse.any():
+                    # v1 = -inf does not tell when: the collapse is where delta
+                    # crosses zero, with v_term = b/2 there.  Stand in for v1 with
+                    # the end voltage of the line from v0 through that point, so
+                    # a cutoff reached on the way down is still interpolated.
+                    b0, g0 = self._discriminant(self.soc, self.up, power_w)
+                    b1, g1 = self._discriminant(soc1, up1, power_w)
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        frac_g = np.where(collapse, np.clip(g0 / (g0 - g1), 0.0, 1.0), np.inf)
+                        v_c = 0.5 * (b0 + frac_g * (b1 - b0))
+                        v_end = np.where(collapse, v0 + (v_c - v0) / frac_g, v1)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    frac_v = (v0 - self.cutoff_voltage) / (v0 - v_end)
+                    frac_soc = self.soc / (self.soc - soc1)
+                frac_v = np.where(v_end < self.cutoff_voltage,
+                                  np.where(np.isfinite(frac_v), frac_v, 0.5), 1.0)
+                frac_soc = np.where(soc1 <= 0, frac_soc, 1.0)
+                frac = np.clip(np.minimum(np.minimum(frac_v, frac_soc), frac_g), 0.0, 1.0)
+                collapsed = died & (frac_g <= np.minimum(frac_v, frac_soc))
+                self.collapsed |= collapsed
+                self.death_time[died] = self.t + frac[died] * dt
+                with np.errstate(invalid='ignore'):
+                    v_death = np.where(collapsed, -np.inf, v0 + frac * (v_end - v0))
+                self.death_voltage[died] = v_death[died]
+                self.alive &= ~died
+
+            self.soc = np.where(self.alive, soc1, self.soc)
+            self.up = np.where(self.alive, up1, self.up)
+            I0 = I1
+            v0 = v1
+            self.t += dt
+        return self.death_time.copy()
+
+def fleet_tte(power_w, dt=1.0, **params):
+    """TTE (hours) for N configurations in one vectorized discharge."""
+    params.setdefault('n', max([np.size(power_w)] + [np.size(v) for v in params.values()]))
+    return BatteryFleet(**params).run(power_w, dt) / 3600.0
+
+if __name__ == "__main__":
+    import time
+
+    n = 10_000
+    rng = np.random.default_rng(0)
+    t0 = time.perf_counter()
+    tte = fleet_tte(rng.uniform(2.0, 5.0, n), dt=1.0,
+                    capacity_mah=rng.uniform(4000, 5000, n),
+                    R0=rng.uniform(0.04, 0.15, n))
+    elapsed = time.perf_counter() - t0
+    print(f"{n} cells in {elapsed:.1f}s, TTE P5/P50/P95 = "
+          f"{np.percentile(tte, [5, 50, 95]).round(2)} h")
@@ -0,0 +1,184 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+
+from fleet import BatteryFleet
+
+# ==========================================
+# 1. Parameter space and batched TTE kernel
+# ==========================================
+
+# Uniform ranges around the sa.py baseline (+/-20%), temperature 0-45 C
+PARAM_BOUNDS = {
+    'capacity_mah':   (3660.0, 5490.0),
+    'r0':             (0.04, 0.06),
+    'rp':             (0.024, 0.036),
+    'cp':             (1600.0, 2400.0),
+    'p_base':         (0.32, 0.48),
+    'p_screen_coeff': (0.004, 0.006),
+    'temp_c':         (0.0, 45.0),
+}
+PARAM_NAMES = list(PARAM_BOUNDS)
+
+def scale(U, bounds=PARAM_BOUNDS):
+    """Map unit-cube samples U (N, d) onto the parameter ranges."""
+    lo = np.array([b[0] for b in bounds.values()])
+    hi = np.array([b[1] for b in bounds.values()])
+    return lo + U * (hi - lo)
+
+def evaluate_tte(X, dt=30.0):
+    """
+    TTE (hours) for every row of X (N, d), columns in PARAM_NAMES order.
+    Same load as sa.run_simulation: p_base + p_screen_coeff*150 + 1 W CPU.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    p = dict(zip(PARAM_NAMES, X.T))
+    p_load = p['p_base'] + p['p_screen_coeff'] * 150 + 1.0
+    fleet = BatteryFleet(capacity_mah=p['capacity_mah'], R0=p['r0'], Rp=p['rp'],
+                         Cp=p['cp'], temp_c=p['temp_c'])
+    return fleet.time_to_empty(p_load, dt=dt) / 3600.0
+
+def print_progress(label, done, total, elapsed):
+    print(f"[{label}] {done}/{total} batches ({100 * done / total:.0f}%), {elapsed:.1f}s", flush=True)
+
+def run_batches(designs, evaluate=evaluate_tte, workers=1, budget_s=None,
+                progress=print_progress, label='sa'):
+    """
+    Evaluate a list of design matrices, serially or over a process pool.
+
+    No new batch is started once `budget_s` seconds of wall clock have
+    elapsed; skipped batches come back as None so callers can work with the
+    completed prefix.  `progress(label, done, total, elapsed)` is called after
+    every batch (pass None to silence).
+    """
+    total = len(designs)
+    results = [None] * total
+    t0 = time.perf_counter()
+
+    def over_budget():
+        return budget_s is not None and time.perf_counter() - t0 > budget_s
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for k, X in enumerate(designs):
+            if over_budget():
+                break
+            results[k] = evaluate(X)
+            if progress:
+                progress(label, k + 1, total, time.perf_counter() - t0)
+        return results
+
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        next_k = 0
+        while next_k < total or pending:
+            while next_k < total and len(pending) < 2 * workers and not over_budget():
+                pending[pool.submit(evaluate, designs[next_k])] = next_k
+                next_k += 1
+            if over_budget():
+                next_k = total # stop submitting, drain in-flight batches
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                results[pending.pop(fut)] = fut.result()
+                done += 1
+                if progress:
+                    progress(label, done, total, time.perf_counter() - t0)
+    return results
+
+def completed(results, label='sa'):
+    """The batches run_batches() finished; raises if the budget cut all of them."""
+    done = [r for r in results if r is not None]
+    if not done:
+        raise RuntimeError(f"{label}: no batch finished within budget_s; raise the budget "
+                           f"or use smaller batches")
+    return done
+
+# ==========================================
+# 2. Morris elementary-effects screening
+# ==========================================
+def morris(r=100, levels=4, seed=0, batch_trajectories=500, **run_kwargs):
+    """
+    Morris screening with r one-at-a-time trajectories on a `levels` grid.
+    Returns a DataFrame with mu_star, mu and sigma of the elementary effects
+    (TTE hours per full parameter range).
+    """
+    rng = np.random.default_rng(seed)
+    d = len(PARAM_NAMES)
+    delta = levels / (2.0 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+
+    # Trajectories: (r, d+1, d) points, factor order[t, j] moved at step j+1
+    U = np.empty((r, d + 1, d))
+    order = np.argsort(rng.random((r, d)), axis=1)
+    U[:, 0] = rng.choice(grid, size=(r, d))
+    sign = np.where(rng.random((r, d)) < 0.5, 1.0, -1.0)
+    start = U[:, 0]
+    sign = np.where(start + delta > 1, -1.0, np.where(start - delta < 0, 1.0, sign))
+    for j in range(d):
+        U[:, j + 1] = U[:, j]
+        f = order[:, j]
+        U[np.arange(r), j + 1, f] += sign[np.arange(r), f] * delta
+
+    designs = [scale(U[k:k + batch_trajectories].reshape(-1, d))
+               for k in range(0, r, batch_trajectories)]
+    results = run_batches(designs, label='morris', **run_kwargs)
+    Y = np.concatenate(completed(results, 'morris')).reshape(-1, d + 1)
+    n = len(Y)
+
+    dY = np.diff(Y, axis=1) # (n, d), step j changes factor order[:, j]
+    EE = np.empty((n, d))
+    EE[np.arange(n)[:, None], order[:n]] = dY / (sign[np.arange(n)[:, None], order[:n]] * delta)
+
+    return pd.DataFrame({
+        'mu_star': np.abs(EE).mean(axis=0),
+        'mu': EE.mean(axis=0),
+        'sigma': EE.std(axis=0, ddof=1),
+    }, index=PARAM_NAMES).sort_values('mu_star', ascending=False).assign(trajectories=n)
+
+# ==========================================
+# 3. Sobol indices (Saltelli sampling)
+# ==========================================
+def sobol(n=4096, seed=0, batch_size=1000, **run_kwargs):
+    """
+    First-order (Saltelli 2010) and total (Jansen) Sobol indices from
+    n*(d+2) TTE evaluations.  Each batch holds the A, B and AB_i rows of
+    `batch_size` base samples, so a budget cut still yields valid estimates
+    from the completed base samples.
+    """
+    rng = np.random.default_rng(seed)
+    d = len(PARAM_NAMES)
+    A = rng.random((n, d))
+    B = rng.random((n, d))
+
+    designs = []
+    for k in range(0, n, batch_size):
+        a, b = A[k:k + batch_size], B[k:k + batch_size]
+        blocks = [a, b]
+        for i in range(d):
+            ab = a.copy()
+            ab[:, i] = b[:, i]
+            blocks.append(ab)
+        designs.append(scale(np.vstack(blocks)))
+
+    results = run_batches(designs, label='sobol', **run_kwargs)
+    Y = np.hstack([y.reshape(d + 2, -1) for y in completed(results, 'sobol')])
+    f_A, f_B, f_AB = Y[0], Y[1], Y[2:]
+    var = np.var(np.concatenate([f_A, f_B]), ddof=1)
+
+    S1 = np.mean(f_B * (f_AB - f_A), axis=1) / var
+    ST = 0.5 * np.mean((f_A - f_AB) ** 2, axis=1) / var
+    return pd.DataFrame({'S1': S1, 'ST': ST}, index=PARAM_NAMES) \
+        .sort_values('ST', ascending=False).assign(samples=Y.shape[1])
+
+if __name__ == "__main__":
+    workers = os.cpu_count()
+    print(morris(r=200, workers=workers).round(4))
+    print(sobol(n=8192, workers=workers, budget_s=300).round(4))
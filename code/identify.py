@@ -0,0 +1,259 @@
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import least_squares
+
+from battery import BatterySim, OCV_COEFFS
+from telemetry import ColumnStore, UW_TO_W
+
+# ==========================================
+# 1. Discharge sessions from the telemetry log
+# ==========================================
+# The log has no terminal-voltage or time column: the battery voltage is
+# estimated as (sum of the rail powers) / (discharge current), and the sample
+# interval by coulomb counting against the BATTERY__PERCENT drop.
+CURRENT_COL = 'BATTERY_DISCHARGE_RATE_UAS'
+PERCENT_COL = 'BATTERY__PERCENT'
+RAIL_SUFFIX = '_ENERGY_AVG_UWS'
+
+def rail_columns(columns):
+    """Averaged energy rails (duplicates included, e.g. Memory2_ENERGY_AVG_UWS)."""
+    return [c for c in columns if c.split('.')[0].endswith(RAIL_SUFFIX)]
+
+def load_sessions(path='aggregated.csv', min_rows=20, store=None):
+    """
+    Split the log into discharge sessions at every BATTERY__PERCENT increase
+    (the phone was charged in between).  Each session is a DataFrame with
+    power_w, current_a, soc (0-1) and v_est = power_w / current_a.
+    Sessions shorter than min_rows are dropped.
+    """
+    store = store or ColumnStore(path)
+    power = np.zeros(store.n_rows)
+    for c in rail_columns(store.columns):
+        power += np.nan_to_num(store.watts(c))
+    current = np.asarray(store[CURRENT_COL], dtype=np.float64) * UW_TO_W
+    soc = np.asarray(store[PERCENT_COL], dtype=np.float64) / 100.0
+
+    cuts = np.flatnonzero(np.diff(soc) > 0) + 1
+    sessions = []
+    for a, b in zip(np.r_[0, cuts], np.r_[cuts, store.n_rows]):
+        ok = np.isfinite(soc[a:b]) & (current[a:b] > 0) & (power[a:b] > 0)
+        if ok.sum() < min_rows:
+            continue
+        df = pd.DataFrame({'power_w': power[a:b], 'current_a': current[a:b],
+                           'soc': soc[a:b]})[ok].reset_index(drop=True)
+        df['v_est'] = df['power_w'] / df['current_a']
+        sessions.append(df)
+    return sessions
+
+def estimate_dt(sessions, capacity_mah=4575):
+    """
+    Sample interval (s) by coulomb counting over all sessions:
+    sum of SoC drops * Q / sum of current samples.
+    """
+    charge = sum((s['soc'].iloc[0] - s['soc'].iloc[-1]) * capacity_mah * 3.6 for s in sessions)
+    current = sum(s['current_a'].iloc[:-1].sum() for s in sessions)
+    return charge / current
+
+# ==========================================
+# 2. Vectorized simulate-and-compare objective
+# ==========================================
+PARAM_NAMES = ('R0', 'Rp', 'Cp', 'c0', 'c1', 'c2')
+DEFAULT_PARAMS = (0.05, 0.03, 2000.0) + tuple(OCV_COEFFS)
+N_LOG = 3 # R0, Rp and Cp are fitted in log space (positive, span decades)
+
+class PolyOCV:
+    """OCV = c0 + c1*s + c2*s^2; coefficients may be (N,) arrays for a fleet."""
+
+    def __init__(self, c0, c1, c2):
+        self.c0, self.c1, self.c2 = c0, c1, c2
+
+    def __call__(self, soc):
+        return self.c0 + self.c1 * soc + self.c2 * soc**2
+
+def battery_kwargs(params, cutoff_voltage=-np.inf):
+    """
+    BatterySim / BatteryFleet keyword arguments for a fitted parameter vector.
+
+    The fitted voltages are on the v_est scale (rail sum / current, ~3.2 V:
+    the rails undercount the battery power), so BatterySim's 3.0 V cutoff
+    would end sessions early.  By default the cutoff is -inf, as in the fit
+    itself: the cell dies only on voltage collapse or at SoC 0.  Pass a
+    cutoff on the v_est scale to override.
+    """
+    p = dict(zip(PARAM_NAMES, np.asarray(params, dtype=np.float64).tolist()))
+    return {'R0': p['R0'], 'Rp': p['Rp'], 'Cp': p['Cp'], 'cutoff_voltage': cutoff_voltage,
+            'ocv': PolyOCV(p['c0'], p['c1'], p['c2'])}
+
+def replay(power_w, soc0, dt, capacity_mah, R0, Rp, Cp, c0, c1, c2):
+    """
+    BatteryFleet.step() without the cutoff/death bookkeeping, broadcast
+    over (K parameter sets) x (S sessions): power_w is (T, S), soc0 (S,),
+    the parameters (K,).  The logged power is held over each dt (exact RC
+    update).  Returns (v_term, soc) as (T, K, S) arrays, soc taken at the
+    start of every step.
+    """
+    R0, Rp, Cp, c0, c1, c2 = (np.asarray(p, dtype=np.float64)[:, None]
+                              for p in (R0, Rp, Cp, c0, c1, c2))
+    n_t, S = power_w.shape
+    decay = np.exp(-dt / (Rp * Cp))
+    k_up = Rp * (1 - decay)
+    k_soc = dt / (capacity_mah * 3.6)
+    r4 = 4.0 * R0
+    inv_2r0 = 0.5 / R0
+
+    shape = (len(R0), S)
+    soc = np.array(np.broadcast_to(soc0, shape), dtype=np.float64)
+    up = np.zeros(shape)
+    v_term = np.empty((n_t,) + shape)
+    socs = np.empty((n_t,) + shape)
+    delta = np.empty((n_t,) + shape)
+    for t in range(n_t):
+        socs[t] = soc
+        b = c0 + soc * (c1 + c2 * soc) - up
+        np.subtract(b * b, r4 * power_w[t], out=delta[t])
+        i_load = (b - np.sqrt(np.maximum(delta[t], 0.0))) * inv_2r0
+        np.subtract(b, i_load * R0, out=v_term[t])
+        soc -= i_load * k_soc
+        up *= decay
+        up += i_load * k_up
+    collapsed = np.logical_or.accumulate(delta < 0, axis=0)
+    v_term[collapsed] = np.nan
+    return v_term, socs
+
+class DischargeFit:
+    """
+    Least-squares fit of (R0, Rp, Cp, OCV coefficients) to logged sessions.
+
+    The model replays every session's measured power with the constant-power
+    Thevenin cell, starting from the logged SoC; residuals are the terminal
+    voltage against v_est (weighted by 1/sigma_v) and the SoC against the
+    logged percent (1/sigma_soc).  Sessions are padded to a common length
+    and masked, so K parameter sets x S sessions replay together in one
+    broadcast pass of replay(): the objective is one pass, and the
+    forward-difference Jacobian (K = 1 + 6 points) is one more.
+
+    A weak Gaussian prior (log-sigma `prior_sigma`) pulls R0/Rp/Cp towards
+    DEFAULT_PARAMS: at ~100 s sampling the RC split is poorly observed.
+    """
+
+    def __init__(self, sessions, dt=None, capacity_mah=4575, sigma_v=0.05, sigma_soc=0.01,
+                 prior_sigma=1.0, rel_step=1e-6):
+        self.sessions = sessions
+        self.capacity_mah = capacity_mah
+        self.dt = estimate_dt(sessions, capacity_mah) if dt is None else dt
+        self.sigma_v = sigma_v
+        self.sigma_soc = sigma_soc
+        self.prior_sigma = prior_sigma
+        self.rel_step = rel_step
+
+        n_t = max(len(s) for s in sessions)
+        self.n_sessions = len(sessions)
+        self.power = np.zeros((n_t, self.n_sessions))
+        self.v_meas = np.zeros_like(self.power)
+        self.soc_meas = np.zeros_like(self.power)
+        self.mask = np.zeros(self.power.shape, dtype=bool)
+        for k, s in enumerate(sessions):
+            n = len(s)
+            self.power[:n, k] = s['power_w']
+            self.v_meas[:n, k] = s['v_est']
+            self.soc_meas[:n, k] = s['soc']
+            self.mask[:n, k] = True
+        self.soc0 = self.soc_meas[0]
+        self.x_prior = self.to_x(DEFAULT_PARAMS)
+        self.n_evals = 0 # parameter sets simulated
+
+    @staticmethod
+    def to_x(params):
+        x = np.array(params, dtype=np.float64)
+        x[..., :N_LOG] = np.log(x[..., :N_LOG])
+        return x
+
+    @staticmethod
+    def from_x(x):
+        params = np.array(x, dtype=np.float64)
+        params[..., :N_LOG] = np.exp(params[..., :N_LOG])
+        return params
+
+    def simulate(self, params):
+        """
+        Replay all sessions for K parameter sets (K, 6) at once.
+        Returns (v_term, soc), each (T, K, S); v_term is NaN from a voltage
+        collapse on.
+        """
+        params = np.atleast_2d(params)
+        v_term, soc = replay(self.power, self.soc0, self.dt, self.capacity_mah, *params.T)
+        self.n_evals += len(params)
+        return v_term, soc
+
+    def residuals(self, X):
+        """Weighted residual vectors for K points X (K, 6) in fit coordinates."""
+        X = np.atleast_2d(X)
+        v_term, soc = self.simulate(self.from_x(X))
+        # Collapse is penalised as a 0 V terminal voltage
+        r_v = (np.nan_to_num(v_term, nan=0.0) - self.v_meas[:, None]) / self.sigma_v
+        r_soc = (soc - self.soc_meas[:, None]) / self.sigma_soc
+        m = self.mask
+        r_prior = (X[:, :N_LOG] - self.x_prior[:N_LOG]) / self.prior_sigma
+        return np.hstack([r_v.transpose(1, 0, 2)[:, m], r_soc.transpose(1, 0, 2)[:, m], r_prior])
+
+    def jacobian(self, x):
+        """Forward differences, all 1 + 6 points in one replay pass."""
+        h = self.rel_step * np.maximum(np.abs(x), 1.0)
+        X = np.vstack([x, x + np.diag(h)])
+        R = self.residuals(X)
+        return ((R[1:] - R[0]) / h[:, None]).T
+
+    def fit(self, params0=DEFAULT_PARAMS, **kwargs):
+        """
+        scipy.optimize.least_squares with the batched Jacobian.
+        Returns the fitted parameters as a Series; the scipy result is kept
+        in `result`.
+        """
+        kwargs.setdefault('x_scale', 'jac')
+        self.result = least_squares(lambda x: self.residuals(x)[0], self.to_x(params0),
+                                    jac=self.jacobian, **kwargs)
+        return pd.Series(self.from_x(self.result.x), index=PARAM_NAMES)
+
+    def rmse(self, params):
+        """Voltage RMSE (mV) and SoC RMSE (%) over all logged samples."""
+        v_term, soc = self.simulate(params)
+        m = self.mask
+        return {'v_mV': float(1e3 * np.sqrt(np.nanmean((v_term[:, 0][m] - self.v_meas[m])**2))),
+                'soc_pct': float(100 * np.sqrt(np.mean((soc[:, 0][m] - self.soc_meas[m])**2)))}
+
+# ==========================================
+# 3. Reference: scipy over the scalar BatterySim loop
+# ==========================================
+def loop_residuals(x, fit):
+    """Same residuals as DischargeFit, one BatterySim.step at a time."""
+    kw = battery_kwargs(fit.from_x(x))
+    r_v, r_soc = [], []
+    for s in fit.sessions:
+        sim = BatterySim(capacity_mah=fit.capacity_mah, soc=s['soc'].iloc[0], **kw)
+        for p, v, soc in zip(s['power_w'].tolist(), s['v_est'].tolist(), s['soc'].tolist()):
+            r_soc.append((sim.soc - soc) / fit.sigma_soc)
+            v_term, _, _ = sim.step(p, fit.dt)
+            r_v.append(((0.0 if v_term is None else v_term) - v) / fit.sigma_v)
+    r_prior = (x[:N_LOG] - fit.x_prior[:N_LOG]) / fit.prior_sigma
+    return np.concatenate([r_v, r_soc, r_prior])
+
+if __name__ == "__main__":
+    sessions = load_sessions('aggregated.csv')
+    fit = DischargeFit(sessions)
+    print(f"{len(sessions)} sessions, {fit.mask.sum()} samples, dt ~ {fit.dt:.1f} s (coulomb counting)")
+    print(f"defaults: {fit.rmse(DEFAULT_PARAMS)}")
+
+    t0 = time.perf_counter()
+    params = fit.fit()
+    elapsed = time.perf_counter() - t0
+    print(f"batched fit: {elapsed:.2f}s, {fit.result.nfev} evaluations, {fit.result.njev} Jacobians")
+    print(params.round(4).to_string())
+    print(f"fitted: {fit.rmse(params.to_numpy())}")
+
+    t0 = time.perf_counter()
+    ref = least_squares(loop_residuals, fit.to_x(DEFAULT_PARAMS), args=(fit,), x_scale='jac')
+    elapsed_ref = time.perf_counter() - t0
+    print(f"scipy over the BatterySim loop: {elapsed_ref:.2f}s ({ref.nfev} evaluations), "
+          f"max |dparam/param| vs batched {np.max(np.abs(fit.from_x(ref.x) / params.to_numpy() - 1)):.1e}")
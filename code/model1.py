@@ -1,5 +1,9 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from battery import BatterySim
+from loadprofile import LoadProfile
+from ocv import OCVTable
+from recorder import Recorder
 
 def simulate_battery_model():
     # ==========================================
@@ -7,7 +11,6 @@ def simulate_battery_model():
     # ==========================================
     # 电池容量
     Q_capacity_mAh = 4000
-    Q_total = Q_capacity_mAh * 3.6  # 转换为库伦 (Coulombs)
 
     # 等效电路参数 (假设为常数，实际可设为SOC的函数)
     R0 = 0.08    # 欧姆内阻 (Ohm)
@@ -18,8 +21,13 @@ def simulate_battery_model():
     def get_ocv(soc):
         # 模拟锂电池: 3.0V(0%) -> 4.2V(100%)，中间有平坦区
         # 这是一个经验公式，模拟S型曲线
+        # 注意防止 SOC 越界
+        soc = np.clip(soc, 0.01, 0.99)
         return 3.2 + 0.8 * soc + 0.2 * np.log(soc + 0.01) - 0.1 * np.log(1.01 - soc)
 
+    # 预先制成均匀网格查找表 (2001 点, 误差 < 0.02 mV)，每步不再调用 np.clip / np.log
+    ocv = OCVTable.from_function(get_ocv, n=2001)
+
     # ==========================================
     # 2. 仿真设置 (Simulation Setup)
     # ==========================================
@@ -28,75 +36,49 @@ def simulate_battery_model():
     total_steps = int(duration_minutes * 60 / dt)
     time = np.arange(0, total_steps * dt, dt)
 
-    # 初始化状态变量数组
-    soc = np.zeros(total_steps)
-    Up = np.zeros(total_steps)       # 极化电压 (Polarization Voltage)
-    Vt = np.zeros(total_steps)       # 端电压 (Terminal Voltage)
-    I_load = np.zeros(total_steps)   # 电流 (Current)
-    P_load = np.zeros(total_steps)   # 功率负载 (Power Profile)
+    # 记录器: 预分配 total_steps 行 (soc / Up / Vt / I / P 每步一行)
+    rec = Recorder(('v_term', 'i_load', 'soc', 'up', 'p_load'), capacity=total_steps)
 
     # 设定初始状态
-    soc[0] = 0.95   # 初始电量 95%
-    Up[0] = 0.0     # 初始极化电压为 0
+    soc0 = 0.95   # 初始电量 95%
+    up0 = 0.0     # 初始极化电压为 0
 
     # ==========================================
     # 3. 定义负载模式 (Load Profile)
     # ==========================================
     # 模拟真实场景：待机 -> 游戏(重负载) -> 视频(中负载) -> 待机
-    for t_idx, t in enumerate(time):
-        if 600 <= t < 1800:         # 10min - 30min: 玩游戏 (Heavy Load)
-            P_load[t_idx] = 8.0     # 8 Watts
-        elif 2400 <= t < 3000:      # 40min - 50min: 看视频 (Medium Load)
-            P_load[t_idx] = 4.0     # 4 Watts
-        else:                       # 待机 (Idle)
-            P_load[t_idx] = 0.5     # 0.5 Watts
+    profile = LoadProfile.from_schedule([
+        (600,  0.5, "Idle"),    # 0 - 10min: 待机 (Idle), 0.5 Watts
+        (1200, 8.0, "Game"),    # 10min - 30min: 玩游戏 (Heavy Load), 8 Watts
+        (600,  0.5, "Idle"),
+        (600,  4.0, "Video"),   # 40min - 50min: 看视频 (Medium Load), 4 Watts
+        (600,  0.5, "Idle"),
+    ], unit=1.0)
+    P_load = profile.power(time)
 
     # ==========================================
     # 4. 数值积分主循环 (Main Loop)
     # ==========================================
-    # 使用欧拉法 (Forward Euler) 解微分方程
-    for k in range(total_steps - 1):
-        # A. 获取当前状态下的 OCV
-        # 注意防止 SOC 越界
-        current_soc = max(0.01, min(0.99, soc[k]))
-        U_oc = get_ocv(current_soc)
-
-        # B. 解代数方程求电流 I(t)
-        # 恒功率约束: P = I * Vt = I * (U_oc - Up - I*R0)
-        # 整理得: R0*I^2 - (U_oc - Up)*I + P = 0
-        
-        # 系数
-        a = R0
-        b = -(U_oc - Up[k])
-        c = P_load[k]
-
-        # 判别式
-        delta = b**2 - 4*a*c
-        
-        if delta < 0:
-            print(f"Warning: Power too high at step {k}, voltage collapse!")
-            curr_I = (U_oc - Up[k]) / (2*R0) # 甚至无法维持电压，取最大可能电流
-        else:
-            # 取较小的根 (物理上电流较小的那个解)
-            curr_I = (-b - np.sqrt(delta)) / (2*a)
-        
-        I_load[k] = curr_I
+    # 共用 battery.BatterySim: 恒功率二次方程求电流，
+    # Up 使用精确的 RC 离散化 (零阶保持)，dt 接近 tau 时依然稳定
+    sim = BatterySim(capacity_mah=Q_capacity_mAh, R0=R0, Rp=Rp, Cp=Cp,
+                     soc=soc0, ocv=ocv)
+    sim.up = up0
 
-        # C. 计算端电压 Vt
-        Vt[k] = U_oc - Up[k] - curr_I * R0
+    for k in range(total_steps - 1):
+        soc_k, up_k = sim.soc, sim.up
+        curr_V, curr_I, _ = sim.step(P_load[k], dt)
 
-        # D. 更新状态变量 (微分方程离散化)
-        # dSOC/dt = -I / Q_total
-        dSOC = -curr_I / Q_total
-        soc[k+1] = soc[k] + dSOC * dt
+        if curr_V is None:
+            print(f"Warning: Power too high at step {k}, voltage collapse!")
+            break
 
-        # dUp/dt = I/Cp - Up/(Rp*Cp)
-        dUp = (curr_I / Cp) - (Up[k] / (Rp * Cp))
-        Up[k+1] = Up[k] + dUp * dt
+        rec.record(time[k], curr_V, curr_I, soc_k, up_k, P_load[k])
+    else:
+        # 最后一个点: 终态 + 沿用上一步的电压/电流
+        rec.record(time[-1], curr_V, curr_I, sim.soc, sim.up, P_load[-1])
 
-    # 填充最后一个点的辅助数据
-    I_load[-1] = I_load[-2]
-    Vt[-1] = Vt[-2]
+    time, P_load, Vt, soc = rec['t'], rec['p_load'], rec['v_term'], rec['soc']
 
     # ==========================================
     # 5. 可视化 (Visualization)
@@ -114,7 +96,7 @@ def simulate_battery_model():
     # 图2: 电压响应 (核心物理现象)
     ax2.plot(time/60, Vt, 'b-', linewidth=1.5, label='Terminal Voltage $U_t$')
     # 为了对比，画出 OCV
-    ocv_curve = [get_ocv(s) for s in soc]
+    ocv_curve = ocv(soc)
     ax2.plot(time/60, ocv_curve, 'g--', linewidth=1.5, alpha=0.6, label='Open Circuit Voltage $U_{OC}$')
     ax2.set_ylabel('Voltage (V)', fontsize=12)
     ax2.legend(loc='lower left')
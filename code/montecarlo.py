@@ -0,0 +1,125 @@
+import os
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from battery import BatterySim
+from global_sa import completed, run_batches
+from loadprofile import LoadProfile
+
+# ==========================================
+# 1. Markov usage model
+# ==========================================
+STATES = ('light', 'medium', 'heavy')
+
+# Next-state probabilities when a usage period ends (rows: current state)
+TRANSITIONS = np.array([
+    [0.0, 0.7, 0.3],
+    [0.6, 0.0, 0.4],
+    [0.5, 0.5, 0.0],
+])
+MEAN_DWELL_H = np.array([1.5, 1.0, 0.75]) # mean period length per state
+START_PROBS = np.array([0.5, 0.3, 0.2])
+
+def load_state_power(path='consumption.csv', states=STATES):
+    """Total power (W) of each usage scenario in consumption.csv."""
+    df = pd.read_csv(path, index_col=0)
+    return df.loc[list(states), 'total'].to_numpy(dtype=np.float64)
+
+class UsageChain:
+    """
+    Semi-Markov usage: a period in state k draws a gamma-distributed length
+    (mean MEAN_DWELL_H[k], shape dwell_shape), then jumps with TRANSITIONS.
+    """
+
+    def __init__(self, power_w, transitions=TRANSITIONS, mean_dwell_h=MEAN_DWELL_H,
+                 start_probs=START_PROBS, dwell_shape=2.0, states=STATES):
+        self.power_w = np.asarray(power_w, dtype=np.float64)
+        self.transitions = np.asarray(transitions, dtype=np.float64)
+        self.mean_dwell_s = np.asarray(mean_dwell_h, dtype=np.float64) * 3600.0
+        self.start_probs = np.asarray(start_probs, dtype=np.float64)
+        self.dwell_shape = dwell_shape
+        self.states = tuple(states)
+        self._cum = np.cumsum(self.transitions, axis=1)
+
+    def sample(self, rng, t_max):
+        """One random usage sequence covering [0, t_max) s, as a LoadProfile."""
+        state = rng.choice(len(self.states), p=self.start_probs)
+        seq, durations = [], []
+        t = 0.0
+        while t < t_max:
+            d = rng.gamma(self.dwell_shape, self.mean_dwell_s[state] / self.dwell_shape)
+            seq.append(state)
+            durations.append(d)
+            t += d
+            state = min(int(np.searchsorted(self._cum[state], rng.random(), side='right')),
+                        len(self.states) - 1)
+        return LoadProfile(durations, self.power_w[seq], [self.states[k] for k in seq])
+
+# ==========================================
+# 2. Batched, seeded simulation
+# ==========================================
+def simulate_batch(task, chain, t_max_h=72.0, battery=None):
+    """
+    TTE (hours) of task = (SeedSequence, n_days) random days.  Each batch
+    owns its RNG stream, so results do not depend on the worker count.
+    Cells still alive at t_max_h come back as NaN.
+    """
+    seed_seq, n_days = task
+    rng = np.random.default_rng(seed_seq)
+    sim = BatterySim(**(battery or {}))
+    integ = sim.integrator('adaptive')
+    t_max = t_max_h * 3600.0
+
+    tte = np.full(n_days, np.nan)
+    for d in range(n_days):
+        profile = chain.sample(rng, t_max)
+        soc, up, t = sim.soc, sim.up, 0.0
+        for _, duration, p, _ in profile.segments():
+            soc, up, elapsed, dead = integ.advance(soc, up, p, duration)
+            if dead:
+                tte[d] = (t + elapsed) / 3600.0
+                break
+            t += duration
+    return tte
+
+def summarize(tte):
+    """
+    P5/P50/P95, mean and std of a TTE sample (hours), over the days that
+    reached empty; NaN when none did.
+    """
+    alive = np.isnan(tte)
+    empty = tte[~alive]
+    p5, p50, p95 = np.percentile(empty, [5, 50, 95]) if len(empty) else (np.nan,) * 3
+    return pd.DataFrame({
+        'days': [len(tte)], 'P5_h': [p5], 'P50_h': [p50], 'P95_h': [p95],
+        'mean_h': [empty.mean() if len(empty) else np.nan],
+        'std_h': [empty.std(ddof=1) if len(empty) > 1 else np.nan],
+        'not_empty': [int(alive.sum())],
+    })
+
+def monte_carlo(n_days=20_000, seed=0, batch_days=500, chain=None, t_max_h=72.0,
+                battery=None, workers=None, **run_kwargs):
+    """
+    TTE distribution over n_days stochastic usage days, split into batches
+    that run over a process pool (global_sa.run_batches).  Batch k draws
+    from the k-th child of SeedSequence(seed).
+    Returns (summary DataFrame, TTE array in hours).
+    """
+    if chain is None:
+        chain = UsageChain(load_state_power())
+    sizes = [min(batch_days, n_days - k) for k in range(0, n_days, batch_days)]
+    tasks = list(zip(np.random.SeedSequence(seed).spawn(len(sizes)), sizes))
+    evaluate = partial(simulate_batch, chain=chain, t_max_h=t_max_h, battery=battery)
+    results = run_batches(tasks, evaluate, workers=workers, label='montecarlo', **run_kwargs)
+    tte = np.concatenate(completed(results, 'montecarlo'))
+    return summarize(tte), tte
+
+if __name__ == "__main__":
+    import time
+
+    t0 = time.perf_counter()
+    summary, tte = monte_carlo(n_days=20_000, workers=os.cpu_count(), progress=None)
+    print(summary.round(3).to_string(index=False))
+    print(f"{len(tte)} days in {time.perf_counter() - t0:.1f}s")
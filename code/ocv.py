@@ -0,0 +1,200 @@
+import bisect
+import math
+
+import numpy as np
+
+from battery import OCV_COEFFS
+
+# ==========================================
+# 1. Analytic inverse of the polynomial OCV
+# ==========================================
+def soc_from_ocv_poly(v, coeffs=OCV_COEFFS):
+    """
+    SoC at which c0 + c1*s + c2*s^2 equals v (the increasing root), clamped
+    to [0, 1].  Scalars stay Python floats; arrays are vectorized.
+    """
+    c0, c1, c2 = coeffs
+    if isinstance(v, (float, int)):
+        if c2 == 0:
+            s = (v - c0) / c1
+        else:
+            s = (-c1 + math.sqrt(max(c1 * c1 + 4.0 * c2 * (v - c0), 0.0))) / (2.0 * c2)
+        return min(max(s, 0.0), 1.0)
+    v = np.asarray(v, dtype=np.float64)
+    if c2 == 0:
+        s = (v - c0) / c1
+    else:
+        s = (-c1 + np.sqrt(np.maximum(c1 * c1 + 4.0 * c2 * (v - c0), 0.0))) / (2.0 * c2)
+    return np.clip(s, 0.0, 1.0)
+
+# ==========================================
+# 2. Tabulated OCV with hysteresis
+# ==========================================
+class OCVTable:
+    """
+    OCV(SoC) from measured curves, evaluated through a uniform SoC grid.
+
+    The discharge curve (and optionally the charge curve) is resampled once
+    onto n equally spaced SoC points; a lookup is then one multiply for the
+    cell index plus a linear interpolation, with no search.  Scalar calls
+    run in plain float arithmetic on Python lists (no NumPy dispatch, well
+    under a microsecond per step inside BatterySim / the integrators);
+    arrays take a vectorized path.  Outside the grid the end segments are
+    extended linearly.
+
+    Hysteresis uses one state h in [-1, 1]:
+        OCV = mid(soc) + h * half_gap(soc)
+    with h = -1 on the discharge curve (the default, so ocv(soc) is a
+    drop-in `ocv` for the discharge simulators) and h = +1 on the charge
+    curve.  hysteresis_step() moves h with the current.
+
+    inverse() returns the SoC of a rest voltage on a branch, solved exactly
+    on the piecewise-linear table (binary search plus one division).
+    """
+
+    def __init__(self, soc, v_discharge, v_charge=None, n=1001, kind='linear', gamma=50.0):
+        soc = np.asarray(soc, dtype=np.float64)
+        order = np.argsort(soc)
+        soc = soc[order]
+        if len(soc) < 2 or np.any(np.diff(soc) <= 0):
+            raise ValueError("OCV table needs at least two distinct SoC points")
+        self.grid = np.linspace(soc[0], soc[-1], int(n))
+        v_dis = self._resample(soc, np.asarray(v_discharge, dtype=np.float64)[order], kind)
+        v_chg = v_dis if v_charge is None else \
+            self._resample(soc, np.asarray(v_charge, dtype=np.float64)[order], kind)
+        self.gamma = gamma
+        self.mid = 0.5 * (v_chg + v_dis)
+        self.half_gap = 0.5 * (v_chg - v_dis)
+        self.has_hysteresis = v_charge is not None
+        self.branches = {-1.0: v_dis, 1.0: v_chg}
+
+        self.s0 = float(self.grid[0])
+        self.inv_h = (len(self.grid) - 1) / float(self.grid[-1] - self.grid[0])
+        self.last = len(self.grid) - 2
+        # Per-branch values and segment slopes as lists for the scalar path
+        self._v = {h: v.tolist() for h, v in self.branches.items()}
+        self._dv = {h: np.diff(v).tolist() for h, v in self.branches.items()}
+        self._mid, self._dmid = self.mid.tolist(), np.diff(self.mid).tolist()
+        self._gap, self._dgap = self.half_gap.tolist(), np.diff(self.half_gap).tolist()
+        self._vd, self._dvd = self._v[-1.0], self._dv[-1.0]
+        self._inv = {} # branch -> table values, checked increasing
+
+    def _resample(self, soc, v, kind):
+        if kind == 'linear':
+            return np.interp(self.grid, soc, v)
+        if kind == 'pchip':
+            from scipy.interpolate import PchipInterpolator
+            return PchipInterpolator(soc, v)(self.grid)
+        raise ValueError(f"unknown kind {kind!r}")
+
+    @classmethod
+    def from_function(cls, ocv, ocv_charge=None, n=1001, soc_range=(0.0, 1.0), **kwargs):
+        """Tabulate an OCV(soc) callable (and optionally a charge-branch callable)."""
+        soc = np.linspace(soc_range[0], soc_range[1], int(n))
+        v_chg = None if ocv_charge is None else ocv_charge(soc)
+        return cls(soc, ocv(soc), v_chg, n=n, **kwargs)
+
+    # ---- forward ----
+    def __call__(self, soc, h=-1.0):
+        if isinstance(soc, (float, int)) and isinstance(h, (float, int)):
+            x = (float(soc) - self.s0) * self.inv_h
+            i = int(x) if x > 0.0 else 0
+            if i > self.last:
+                i = self.last
+            f = x - i
+            if h == -1.0:
+                return self._vd[i] + f * self._dvd[i]
+            v = self._v.get(h)
+            if v is not None:
+                return v[i] + f * self._dv[h][i]
+            return (self._mid[i] + f * self._dmid[i]) + h * (self._gap[i] + f * self._dgap[i])
+        x = (np.asarray(soc, dtype=np.float64) - self.s0) * self.inv_h
+        i = np.clip(x.astype(np.int64), 0, self.last)
+        f = x - i
+        if isinstance(h, (float, int)) and h in self.branches:
+            v = self.branches[h]
+            return v[i] + f * (v[i + 1] - v[i])
+        mid = self.mid[i] + f * (self.mid[i + 1] - self.mid[i])
+        gap = self.half_gap[i] + f * (self.half_gap[i + 1] - self.half_gap[i])
+        return mid + np.asarray(h, dtype=np.float64) * gap
+
+    def hysteresis_step(self, h, current_a, dt, q_coulomb):
+        """
+        One zero-order-hold step of dh/dt = -gamma*|I|/Q * (h + sign(I)),
+        I > 0 discharging: h decays exactly toward -1 (discharge) or +1
+        (charge) as charge flows, and holds at rest.
+        """
+        if isinstance(h, (float, int)) and isinstance(current_a, (float, int)):
+            if current_a == 0:
+                return h
+            a = math.exp(-abs(self.gamma * current_a * dt / q_coulomb))
+            return a * h - (1.0 - a) * (1.0 if current_a > 0 else -1.0)
+        current_a = np.asarray(current_a, dtype=np.float64)
+        a = np.exp(-np.abs(self.gamma * current_a * dt / q_coulomb))
+        return a * h - (1.0 - a) * np.sign(current_a)
+
+    # ---- inverse ----
+    def inverse(self, v, branch=-1.0):
+        """
+        SoC whose OCV on `branch` (-1 discharge, +1 charge) is v, e.g. to
+        initialize from a rest voltage.  Voltages outside the branch range
+        clamp to its SoC ends.  Requires an increasing curve.
+        """
+        table = self.branches[branch]
+        if branch not in self._inv:
+            if np.any(np.diff(table) <= 0):
+                raise ValueError("OCV must increase with SoC to be inverted")
+            self._inv[branch] = table.tolist()
+        vals = self._inv[branch]
+        if isinstance(v, (float, int)):
+            if v <= vals[0]:
+                return float(self.grid[0])
+            if v >= vals[-1]:
+                return float(self.grid[-1])
+            i = bisect.bisect_right(vals, v) - 1
+            return self.s0 + (i + (v - vals[i]) / (vals[i + 1] - vals[i])) / self.inv_h
+        v = np.asarray(v, dtype=np.float64)
+        i = np.clip(np.searchsorted(table, v, side='right') - 1, 0, self.last)
+        x = i + (v - table[i]) / (table[i + 1] - table[i])
+        return np.clip(self.s0 + x / self.inv_h, self.grid[0], self.grid[-1])
+
+if __name__ == "__main__":
+    import time
+    from battery import get_ocv_corrected
+
+    def model1_ocv(soc):
+        soc = np.clip(soc, 0.01, 0.99)
+        return 3.2 + 0.8 * soc + 0.2 * np.log(soc + 0.01) - 0.1 * np.log(1.01 - soc)
+
+    def per_call(fn, arg, n=200_000):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn(arg)
+        return (time.perf_counter() - t0) / n
+
+    table = OCVTable.from_function(model1_ocv, n=2001)
+    s = np.random.default_rng(0).random(1_000_000)
+    err = np.abs(table(s) - model1_ocv(s)).max()
+    print(f"model1 OCV: np.clip/np.log {per_call(model1_ocv, 0.6314) * 1e6:.2f} us/call, "
+          f"table {per_call(table, 0.6314) * 1e6:.2f} us/call, max |dV| {err * 1e3:.3f} mV")
+    t0 = time.perf_counter()
+    table(s)
+    print(f"1e6 SoC values: table {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+    # A measured-style curve: 21 points with a 20 mV charge/discharge gap
+    pts = np.linspace(0, 1, 21)
+    v_dis = get_ocv_corrected(pts) - 0.03 * np.exp(-pts * 8)
+    hyst = OCVTable(pts, v_dis, v_dis + 0.02, kind='pchip')
+    q = 4575 * 3.6
+    h = 1.0 # fresh off the charger
+    for _ in range(300): # 300 s at 1 A discharge
+        h = hyst.hysteresis_step(h, 1.0, 1.0, q)
+    print(f"hysteresis: OCV(0.5) charge {hyst(0.5, 1.0):.4f} V, discharge {hyst(0.5):.4f} V, "
+          f"after 300 s at 1 A h = {h:.3f} -> {hyst(0.5, h):.4f} V")
+
+    v = hyst(s)
+    print(f"inverse round trip: max |dSoC| {np.abs(hyst.inverse(v) - s).max():.1e}, "
+          f"scalar {per_call(hyst.inverse, 3.71) * 1e6:.2f} us/call")
+    v = get_ocv_corrected(s)
+    print(f"polynomial OCV analytic inverse: max |dSoC| {np.abs(soc_from_ocv_poly(v) - s).max():.1e}, "
+          f"scalar {per_call(soc_from_ocv_poly, 3.81) * 1e6:.2f} us/call")
@@ -0,0 +1,285 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from telemetry import ColumnStore, RegressionStats, open_columns
+
+# Cluster -> (power rail in uW, frequency in kHz)
+CLUSTERS = {
+    'Little Core': ('CPU_LITTLE_ENERGY_AVG_UWS', 'CPU_LITTLE_FREQ_KHz'),
+    'Mid Core':    ('CPU_MID_ENERGY_AVG_UWS',    'CPU_MID_FREQ_KHz'),
+    'Big Core':    ('CPU_BIG_ENERGY_AVG_UWS',    'CPU_BIG_FREQ_KHz'),
+    'GPU':         ('GPU_ENERGY_AVG_UWS',        'GPU0_FREQ'),
+}
+
+# ==========================================
+# 1. Feature maps of the component power models
+# ==========================================
+def cubic_features(freq_mhz):
+    """CPU/GPU cluster model P = c0 + c1*f + c2*f^2 + c3*f^3 (f in MHz)."""
+    f = np.asarray(freq_mhz, dtype=np.float64).reshape(-1)
+    return np.column_stack([f, f ** 2, f ** 3])
+
+def oled_features(brightness, red, green, blue, brightness_max=100.0):
+    """OLED model P = P_static + B*(kR*R + kG*G + kB*B), B normalized to 0-1."""
+    B = np.asarray(brightness, dtype=np.float64).reshape(-1) / brightness_max
+    return np.column_stack([B * np.asarray(red, dtype=np.float64).reshape(-1),
+                            B * np.asarray(green, dtype=np.float64).reshape(-1),
+                            B * np.asarray(blue, dtype=np.float64).reshape(-1)])
+
+# Fixed feature scales keep the RLS covariance well conditioned (f^3 ~ 1e10)
+CUBIC_SCALE = (1e3, 1e6, 1e9)
+OLED_SCALE = (255.0, 255.0, 255.0)
+
+# ==========================================
+# 2. Recursive least squares
+# ==========================================
+class RLSFitter(RegressionStats):
+    """
+    Recursive least squares with optional exponential forgetting.
+
+    Each sample updates the coefficients and the inverse-covariance matrix
+    in O(k^2) (Sherman-Morrison), so the current model is available after
+    every update without a refit.  The weighted X^T X / X^T y statistics of
+    RegressionStats are kept alongside for r2().
+
+    forgetting : weight of past samples per update (1.0 = ordinary LS)
+    delta      : initial covariance scale; large values mean a weak prior
+    x_scale    : fixed per-feature divisors applied before fitting; coef()
+                 is always reported in the original feature units
+    """
+
+    def __init__(self, n_features, fit_intercept=True, forgetting=1.0,
+                 delta=1e8, x_scale=None):
+        super().__init__(n_features, fit_intercept)
+        k = len(self.Xty)
+        self.forgetting = forgetting
+        self.x_scale = np.ones(n_features) if x_scale is None \
+            else np.asarray(x_scale, dtype=np.float64)
+        self._s = np.concatenate([[1.0], self.x_scale]) if fit_intercept else self.x_scale
+        self.theta = np.zeros(k) # coefficients on the scaled features
+        self.P = np.eye(k) * delta
+
+    def _design(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        X = X.reshape(len(X), -1) / self.x_scale
+        if self.fit_intercept:
+            X = np.column_stack([np.ones(len(X)), X])
+        return X
+
+    def update(self, X, y):
+        """Feed one sample (1-D x, scalar y) or a block of rows."""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64)).ravel()
+        Xd = self._design(X)
+        keep = ~(np.isnan(Xd).any(axis=1) | np.isnan(y))
+        Xd, y = Xd[keep], y[keep]
+
+        lam = self.forgetting
+        theta, P = self.theta, self.P
+        for x, yi in zip(Xd, y):
+            Px = P @ x
+            g = Px / (lam + x @ Px)
+            theta = theta + g * (yi - x @ theta)
+            P = (P - np.outer(g, Px)) / lam
+            if lam != 1.0:
+                self.XtX = lam * self.XtX + np.outer(x, x)
+                self.Xty = lam * self.Xty + yi * x
+                self.yty = lam * self.yty + yi * yi
+                self.sum_y = lam * self.sum_y + yi
+                self.n = lam * self.n + 1
+        self.theta = theta
+        self.P = 0.5 * (P + P.T)
+
+        if lam == 1.0:
+            self.XtX += Xd.T @ Xd
+            self.Xty += Xd.T @ y
+            self.yty += y @ y
+            self.sum_y += y.sum()
+            self.n += len(y)
+        return self
+
+    def coef(self):
+        """Current coefficients in original feature units ([intercept, ...])."""
+        return self.theta / self._s
+
+    def r2(self):
+        """R^2 of the current coefficients on the (weighted) samples seen so far."""
+        return super().r2(self.theta)
+
+    def predict(self, X):
+        return self._design(X) @ self.theta
+
+class OnlinePowerModel:
+    """
+    A feature map plus an RLSFitter: update(*raw, y) / predict(*raw) take the
+    same raw signals as `features` (e.g. frequency in MHz, or brightness and
+    R/G/B), y in W.
+    """
+
+    def __init__(self, features, n_features, x_scale=None, **rls_kwargs):
+        self.features = features
+        self.rls = RLSFitter(n_features, x_scale=x_scale, **rls_kwargs)
+
+    def update(self, *args):
+        *raw, y = args
+        self.rls.update(self.features(*raw), y)
+        return self
+
+    def predict(self, *raw):
+        return self.rls.predict(self.features(*raw))
+
+    @property
+    def coef(self):
+        return self.rls.coef()
+
+    @property
+    def r2(self):
+        return self.rls.r2()
+
+    @property
+    def n(self):
+        return self.rls.n
+
+def cpu_model(**rls_kwargs):
+    """Online cubic frequency->power model for one CPU/GPU cluster."""
+    return OnlinePowerModel(cubic_features, 3, x_scale=CUBIC_SCALE, **rls_kwargs)
+
+def oled_model(brightness_max=100.0, **rls_kwargs):
+    """Online OLED model; coef = [P_static, kR, kG, kB]."""
+    return OnlinePowerModel(
+        lambda b, r, g, bl: oled_features(b, r, g, bl, brightness_max), 3,
+        x_scale=OLED_SCALE, **rls_kwargs)
+
+# ==========================================
+# 3. Batched multi-cluster cubic fit
+# ==========================================
+COEF_COLUMNS = ['c0', 'c1', 'c2', 'c3']
+
+def fit_clusters(df, clusters=CLUSTERS, degree=3):
+    """
+    Least-squares P = sum_k c_k f^k (W, f in MHz) for every cluster at once.
+
+    All clusters share one (n, clusters, degree+1) design tensor; rows with
+    NaN or f <= 0 get zero weight, and the normal equations are solved in a
+    single batched np.linalg.solve.  Powers of f are scaled by 1000^k while
+    solving to keep the systems well conditioned.
+
+    Returns a DataFrame indexed by cluster with c0..c{degree}, n, r2, f_min
+    and f_max (MHz); clusters whose columns are missing come back as NaN,
+    and so do the coefficients of clusters with fewer than degree+1
+    distinct active frequencies (their n is still reported).
+    """
+    names = list(clusters)
+    present = [all(c in df.columns for c in clusters[k]) for k in names]
+    k_terms = degree + 1
+    table = pd.DataFrame(np.nan, index=pd.Index(names, name='cluster'),
+                         columns=[f'c{j}' for j in range(k_terms)] + ['n', 'r2', 'f_min', 'f_max'])
+    if not any(present):
+        return table
+    fitted = [k for k, ok in zip(names, present) if ok]
+
+    Y = np.column_stack([df[clusters[k][0]].to_numpy(np.float64) for k in fitted]) / 1e6
+    F = np.column_stack([df[clusters[k][1]].to_numpy(np.float64) for k in fitted]) / 1000.0
+    w = (~(np.isnan(Y) | np.isnan(F)) & (F > 0)).astype(np.float64)
+    Y = np.where(w > 0, Y, 0.0)
+    Fs = np.where(w > 0, F, 0.0) / 1000.0
+
+    n = w.sum(axis=0)
+    table.loc[fitted, 'n'] = n
+    with np.errstate(all='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning) # all-NaN columns of empty clusters
+        table.loc[fitted, 'f_min'] = np.nanmin(np.where(w > 0, F, np.nan), axis=0)
+        table.loc[fitted, 'f_max'] = np.nanmax(np.where(w > 0, F, np.nan), axis=0)
+
+    # Clusters without enough distinct frequencies would make G singular
+    ok = np.array([len(np.unique(F[w[:, j] > 0, j])) >= k_terms for j in range(len(fitted))])
+    if not ok.any():
+        return table
+    Y, Fs, w, n = Y[:, ok], Fs[:, ok], w[:, ok], n[ok]
+    solved = [k for k, good in zip(fitted, ok) if good]
+
+    V = Fs[:, :, None] ** np.arange(k_terms) * w[:, :, None] # (n, c, k)
+    G = np.einsum('nck,ncl->ckl', V, V)
+    b = np.einsum('nck,nc->ck', V, Y)
+    theta = np.linalg.solve(G, b[:, :, None])[:, :, 0]
+
+    yty = (Y * Y).sum(axis=0)
+    sse = yty - 2 * (theta * b).sum(axis=1) + np.einsum('ck,ckl,cl->c', theta, G, theta)
+    sst = yty - Y.sum(axis=0) ** 2 / n
+
+    table.loc[solved, table.columns[:k_terms]] = theta / 1000.0 ** np.arange(k_terms)
+    table.loc[solved, 'r2'] = 1.0 - sse / sst
+    return table
+
+def fit_logs(paths, clusters=CLUSTERS, **kwargs):
+    """fit_clusters() over many logs, via the columnar cache; indexed (log, cluster)."""
+    tables = {}
+    for path in paths:
+        store = ColumnStore(path, **kwargs)
+        cols = [c for pair in clusters.values() for c in pair if c in store.columns]
+        tables[path] = fit_clusters(store.frame(cols), clusters)
+    return pd.concat(tables, names=['log'])
+
+def cluster_power(table, cluster, freq_mhz):
+    """Power (W) of `cluster` at freq_mhz from a fit_clusters() table row."""
+    c = table.loc[cluster, [k for k in table.columns if k[0] == 'c' and k[1:].isdigit()]]
+    return np.polyval(c.to_numpy(np.float64)[::-1], freq_mhz)
+
+OLED_COLUMNS = ('Display_ENERGY_AVG_UWS', 'Brightness', 'RougeMesuré', 'VertMesuré', 'BleuMesuré')
+
+def fit_oled(df, columns=OLED_COLUMNS, brightness_max=None):
+    """
+    Least-squares OLED model (as in screen.py) on a log frame.  Brightness
+    is normalized by brightness_max (default: its maximum in the log).
+    Returns {'p_static', 'k_r', 'k_g', 'k_b', 'brightness_max', 'r2', 'n'}.
+    """
+    data = df[list(columns)].to_numpy(np.float64)
+    pwr, b, r, g, bl = data[~np.isnan(data).any(axis=1)].T
+    if brightness_max is None:
+        brightness_max = b.max() or 1.0
+    y = pwr / 1e6
+    X = np.column_stack([np.ones(len(y)), oled_features(b, r, g, bl, brightness_max)])
+    theta = np.linalg.lstsq(X, y, rcond=None)[0]
+    resid = y - X @ theta
+    return {'p_static': float(theta[0]), 'k_r': float(theta[1]), 'k_g': float(theta[2]),
+            'k_b': float(theta[3]), 'brightness_max': float(brightness_max), 'n': len(y),
+            'r2': float(1.0 - resid @ resid / np.sum((y - y.mean()) ** 2))}
+
+if __name__ == "__main__":
+    import time
+
+    clusters = CLUSTERS
+    df = open_columns('aggregated.csv', [c for cols in clusters.values() for c in cols])
+
+    # Samples arrive one at a time; the model is usable after each of them
+    for name, (pwr, freq) in clusters.items():
+        y = df[pwr].to_numpy(np.float64) / 1e6
+        x = df[freq].to_numpy(np.float64) / 1000.0
+        ok = ~(np.isnan(x) | np.isnan(y)) & (x > 0)
+        model = cpu_model()
+        t0 = time.perf_counter()
+        for xi, yi in zip(x[ok], y[ok]):
+            model.update(xi, yi)
+        per_sample = (time.perf_counter() - t0) / ok.sum()
+
+        # Batch reference (np.polyfit rescales the Vandermonde columns)
+        y_ref = np.polyval(np.polyfit(x[ok], y[ok], 3), x[ok])
+        ref_r2 = 1 - np.sum((y[ok] - y_ref) ** 2) / np.sum((y[ok] - y[ok].mean()) ** 2)
+        print(f"{name:12s} n={model.n:4d}  R2 online {model.r2:.4f} / batch {ref_r2:.4f}  "
+              f"max |dP| {np.abs(model.predict(x[ok]) - y_ref).max():.1e} W  "
+              f"{per_sample * 1e6:.0f} us/sample")
+
+    scr = open_columns('aggregated.csv', ['Display_ENERGY_AVG_UWS', 'Brightness',
+                                          'RougeMesuré', 'VertMesuré', 'BleuMesuré'])
+    oled = oled_model()
+    for row in scr.to_numpy(np.float64):
+        oled.update(row[1], row[2], row[3], row[4], row[0] / 1e6)
+    print(f"OLED         n={oled.n:4d}  R2 online {oled.r2:.4f}  "
+          f"coef [P_static, kR, kG, kB] = {np.array2string(oled.coef, precision=6)}")
+
+    t0 = time.perf_counter()
+    table = fit_clusters(df)
+    print(f"\nBatched cubic fit ({(time.perf_counter() - t0) * 1e3:.1f} ms):")
+    print(table.to_string(float_format=lambda v: f"{v:.6g}"))
@@ -0,0 +1,267 @@
+import re
+
+import numpy as np
+
+from radio import RRC_POWER_W, RRC_STATES, WIFI_P_HIGH_W, WIFI_P_LOW_W, WIFI_UP_PPS, beta_cr
+
+GPS_P_ON_W = 0.150 # GPS receiver while tracking a fix
+GPS_P_OFF_W = 0.0
+
+# ==========================================
+# 1. Component registry
+# ==========================================
+# kind -> factory(**params) -> Component.  PowerModel.from_spec() builds
+# models from [(kind, params), ...] lists through this table.
+COMPONENTS = {}
+
+def register(kind):
+    def deco(factory):
+        COMPONENTS[kind] = factory
+        return factory
+    return deco
+
+def _lit(x):
+    """Float literal that round-trips exactly when inlined into source."""
+    return repr(float(x))
+
+class Component:
+    """
+    One term of P_total: a NumPy expression (source text) over named usage
+    inputs, with its fitted constants inlined as literals.  defaults gives
+    the value of an input that a caller leaves out.
+    """
+
+    def __init__(self, name, expr, inputs=(), defaults=None):
+        self.name = name
+        self.expr = expr
+        self.inputs = tuple(inputs)
+        self.defaults = dict(defaults or {})
+        for x in self.inputs:
+            if not x.isidentifier():
+                raise ValueError(f"input name {x!r} is not an identifier")
+
+    def __repr__(self):
+        return f"Component({self.name!r}: {self.expr})"
+
+@register('constant')
+def constant(value, name='System Base'):
+    """Fixed power (W)."""
+    return Component(name, _lit(value))
+
+@register('direct')
+def direct(input, name=None):
+    """A power (W) supplied directly as an input (measured or estimated)."""
+    return Component(name or input, input, (input,))
+
+@register('linear')
+def linear(slope, input, offset=0.0, name=None):
+    """offset + slope * input."""
+    expr = f"{_lit(slope)} * {input}"
+    if offset:
+        expr = f"{_lit(offset)} + {expr}"
+    return Component(name or input, expr, (input,))
+
+@register('screen_linear')
+def screen_linear(base, slope, brightness='brightness', name='Screen'):
+    """calc.py screen: base + slope * brightness, 0 W when the screen is off."""
+    return Component(name, f"np.where({brightness} > 0, {_lit(base)} + {_lit(slope)} * {brightness}, 0.0)",
+                     (brightness,))
+
+@register('cpu_poly')
+def cpu_poly(coeffs, freq='freq_mhz', name='CPU'):
+    """
+    Cluster model sum_k c_k f^k (f in MHz, coeffs c0..cn as in
+    powerfit.fit_clusters), evaluated in Horner form; 0 W while the
+    cluster is off (f <= 0).
+    """
+    coeffs = [float(c) for c in coeffs]
+    horner = _lit(coeffs[-1])
+    for c in reversed(coeffs[:-1]):
+        horner = f"({horner} * {freq} + {_lit(c)})"
+    return Component(name, f"np.where({freq} > 0, {horner}, 0.0)", (freq,), {freq: 0.0})
+
+@register('oled')
+def oled(p_static, k_r, k_g, k_b, brightness_max=100.0, inputs=('brightness', 'red', 'green', 'blue'),
+         name='Screen'):
+    """
+    OLED model P_static + B/B_max * (kR*R + kG*G + kB*B) (powerfit.fit_oled);
+    inputs are (brightness, red, green, blue) input names.
+    """
+    b, r, g, bl = inputs
+    return Component(name, f"{_lit(p_static)} + {b} * ({_lit(k_r / brightness_max)} * {r} + "
+                           f"{_lit(k_g / brightness_max)} * {g} + {_lit(k_b / brightness_max)} * {bl})",
+                     inputs)
+
+@register('wifi')
+def wifi(channel_mbps=54.0, p_high=WIFI_P_HIGH_W, p_low=WIFI_P_LOW_W, threshold=WIFI_UP_PPS,
+         rate='wifi_pps', name='WiFi'):
+    """
+    Wi-Fi state model at a steady packet rate (pkt/s): high state
+    p_high + beta*rate at or above threshold, else p_low.  For traces use
+    radio.wifi_power(), which applies the up/down hysteresis in time.
+    """
+    beta = float(beta_cr(channel_mbps))
+    return Component(name, f"np.where({rate} >= {_lit(threshold)}, "
+                           f"{_lit(p_high)} + {_lit(beta)} * {rate}, {_lit(p_low)})",
+                     (rate,), {rate: 0.0})
+
+@register('rrc')
+def rrc(power_w=RRC_POWER_W, state='rrc_state', name='Cellular'):
+    """
+    Cellular power by RRC state code (index into radio.RRC_STATES:
+    0 IDLE, 1 FACH, 2 DCH).  radio.rrc_replay() gives the state sequence
+    and tail energy of a transfer trace.
+    """
+    p = [power_w[s] for s in RRC_STATES]
+    return Component(name, f"np.where({state} >= 2, {_lit(p[2])}, "
+                           f"np.where({state} >= 1, {_lit(p[1])}, {_lit(p[0])}))",
+                     (state,), {state: 0})
+
+@register('gps')
+def gps(p_on=GPS_P_ON_W, p_off=GPS_P_OFF_W, duty='gps_duty', name='GPS'):
+    """GPS duty cycle: p_off + duty * (p_on - p_off), duty in 0-1."""
+    expr = f"{_lit(p_on - p_off)} * {duty}"
+    if p_off:
+        expr = f"{_lit(p_off)} + {expr}"
+    return Component(name, expr, (duty,), {duty: 0.0})
+
+# ==========================================
+# 2. Compiled model
+# ==========================================
+class PowerModel:
+    """
+    A set of components compiled into one NumPy expression
+
+        P_total(**inputs) = expr_1 + expr_2 + ...
+
+    generated as the source of a single function (keyword-only arguments,
+    components' defaults filled in), so a call over arrays of any
+    broadcastable shape is one pass of vectorized NumPy with no per-sample
+    or per-component Python dispatch.  breakdown() compiles the same terms
+    into a dict of per-component arrays.
+    """
+
+    def __init__(self, components):
+        self.components = list(components)
+        names = [c.name for c in self.components]
+        if len(set(names)) != len(names):
+            raise ValueError(f"duplicate component names in {names}")
+        self.inputs = tuple(dict.fromkeys(x for c in self.components for x in c.inputs))
+        self.defaults = {}
+        for c in self.components:
+            self.defaults.update(c.defaults)
+        self.source = self._source('P_total', ' + '.join(f"({c.expr})" for c in self.components)
+                                   or '0.0')
+        self.breakdown_source = self._source(
+            'P_breakdown', '{' + ', '.join(f"{c.name!r}: {c.expr}" for c in self.components) + '}')
+        self._total = self._compile('P_total', self.source)
+        self._breakdown = self._compile('P_breakdown', self.breakdown_source)
+
+    @classmethod
+    def from_spec(cls, spec):
+        """Build from [(kind, {params}), ...] via the COMPONENTS registry."""
+        return cls(COMPONENTS[kind](**params) for kind, params in spec)
+
+    def _source(self, fname, body):
+        args = [x if x not in self.defaults else f"{x}={self.defaults[x]!r}" for x in self.inputs]
+        sig = f"*, {', '.join(args)}" if args else ''
+        return f"def {fname}({sig}):\n    return {body}\n"
+
+    @staticmethod
+    def _compile(fname, source):
+        namespace = {'np': np}
+        exec(compile(source, f'<PowerModel.{fname}>', 'exec'), namespace)
+        return namespace[fname]
+
+    def __call__(self, **inputs):
+        """P_total (W) over scalars or broadcastable arrays of the inputs."""
+        return self._total(**{k: np.asarray(v) for k, v in inputs.items()})
+
+    def breakdown(self, **inputs):
+        """{component name: power (W)}."""
+        return self._breakdown(**{k: np.asarray(v) for k, v in inputs.items()})
+
+    def evaluate(self, data):
+        """P_total over a mapping or DataFrame, taking the columns named like inputs."""
+        return self._total(**{x: np.asarray(data[x]) for x in self.inputs if x in data})
+
+    def __repr__(self):
+        return f"PowerModel({[c.name for c in self.components]}, inputs={list(self.inputs)})"
+
+# ==========================================
+# 3. Models from the fitted coefficients
+# ==========================================
+def cluster_input(cluster):
+    """Input name of a cluster's frequency (MHz): 'Big Core' -> 'big_core_mhz'."""
+    return re.sub(r'\W+', '_', cluster.strip().lower()) + '_mhz'
+
+def fitted_model(path='aggregated.csv', base_w=0.15, wifi_kwargs=None, rrc_kwargs=None,
+                 gps_kwargs=None):
+    """
+    Full-device model with the CPU/GPU cluster polynomials and the OLED
+    coefficients fitted on the log at `path` (powerfit.fit_clusters /
+    fit_oled, as cpu.py and screen.py do), plus Wi-Fi, RRC cellular, GPS
+    and a constant base.
+    """
+    from powerfit import CLUSTERS, OLED_COLUMNS, fit_clusters, fit_oled
+    from telemetry import open_columns, read_header
+
+    names = read_header(path)
+    clusters = {k: pair for k, pair in CLUSTERS.items() if all(c in names for c in pair)}
+    cols = [c for pair in clusters.values() for c in pair]
+    table = fit_clusters(open_columns(path, cols), clusters)
+    components = [cpu_poly(table.loc[k, ['c0', 'c1', 'c2', 'c3']].to_numpy(), cluster_input(k), k)
+                  for k in table.index if not table.loc[k, ['c0', 'c1', 'c2', 'c3']].isna().any()]
+    fit = fit_oled(open_columns(path, list(OLED_COLUMNS)))
+    components += [
+        oled(fit['p_static'], fit['k_r'], fit['k_g'], fit['k_b'], fit['brightness_max']),
+        wifi(**(wifi_kwargs or {})),
+        rrc(**(rrc_kwargs or {})),
+        gps(**(gps_kwargs or {})),
+        constant(base_w),
+    ]
+    return PowerModel(components)
+
+if __name__ == "__main__":
+    import time
+
+    model = fitted_model()
+    print(model)
+    print(model.source)
+
+    # Five million random usage samples in one call
+    rng = np.random.default_rng(0)
+    n = 5_000_000
+    inputs = {
+        'little_core_mhz': rng.uniform(0, 2000, n), 'mid_core_mhz': rng.uniform(0, 2400, n),
+        'big_core_mhz': rng.uniform(0, 2900, n), 'gpu_mhz': rng.uniform(0, 900, n),
+        'brightness': rng.uniform(0, 100, n), 'red': rng.uniform(0, 255, n),
+        'green': rng.uniform(0, 255, n), 'blue': rng.uniform(0, 255, n),
+        'wifi_pps': rng.exponential(20, n), 'rrc_state': rng.integers(0, 3, n),
+        'gps_duty': rng.random(n),
+    }
+    t0 = time.perf_counter()
+    p = model(**inputs)
+    elapsed = time.perf_counter() - t0
+    print(f"{n} samples in {elapsed:.2f}s ({n / elapsed / 1e6:.1f} M samples/s), "
+          f"mean {p.mean():.3f} W")
+
+    # Against evaluating the components one at a time per sample
+    from powerfit import CLUSTERS, cluster_power, fit_clusters
+    from telemetry import open_columns
+    m = 20_000
+    table = fit_clusters(open_columns('aggregated.csv', [c for pair in CLUSTERS.values() for c in pair]))
+    t0 = time.perf_counter()
+    ref = np.empty(m)
+    for k in range(m):
+        row = {x: v[k] for x, v in inputs.items()}
+        total = sum(cluster_power(table, c, row[cluster_input(c)]) if row[cluster_input(c)] > 0 else 0.0
+                    for c in table.index)
+        total += model.breakdown(**{x: row[x] for x in model.inputs})['Screen']
+        total += (WIFI_P_HIGH_W + float(beta_cr(54.0)) * row['wifi_pps']
+                  if row['wifi_pps'] >= WIFI_UP_PPS else WIFI_P_LOW_W)
+        total += RRC_POWER_W[RRC_STATES[row['rrc_state']]] + GPS_P_ON_W * row['gps_duty'] + 0.15
+        ref[k] = total
+    per_sample = (time.perf_counter() - t0) / m
+    print(f"per-sample loop: {per_sample * 1e6:.0f} us/sample "
+          f"(x{per_sample / (elapsed / n):.0f}), max |dP| {np.abs(ref - p[:m]).max():.1e} W")
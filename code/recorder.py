@@ -0,0 +1,268 @@
+import numpy as np
+import pandas as pd
+
+from battery import CELL_CHANNELS
+
+# ==========================================
+# 1. Decimating, preallocated trace recorder
+# ==========================================
+
+class Recorder:
+    """
+    Array-backed trace buffer for the stepping loops (BatterySim.discharge,
+    BatteryFleet.run, or any hand-written loop calling record()).
+
+    Rows (t, *channels) are written into arrays preallocated for
+    `capacity` rows; for a fleet (n_cells=N) every channel row is an (N,)
+    vector.  Decimation:
+
+      mode='every'    : keep every k-th call (k=`every`)
+      mode='envelope' : one row per window of `every` calls with the last
+                        value plus <ch>_min / <ch>_max over the window
+      mode='change'   : keep a call when any channel moved by more than
+                        `tol` (scalar or per channel) since the last kept
+                        row, or `max_gap` seconds have passed
+
+    record(t, *values) takes the values in `channels` order; an engine
+    that offers more quantities calls bind(its channel names) first and
+    passes all of them, the recorder keeps only its own channels.
+
+    When the buffer is full, overflow='wrap' overwrites the oldest rows
+    (a ring buffer holding the most recent span), overflow='thin' drops
+    every other row and doubles the decimation, so the whole run is kept
+    at a resolution that adapts to its length (capacity must be even).
+    Memory is bounded by capacity either way.
+
+    flush() writes the partial last envelope window; the engines call it
+    when their loop ends.
+    """
+
+    def __init__(self, channels=CELL_CHANNELS, capacity=10_000, every=1, mode='every',
+                 tol=1e-3, max_gap=np.inf, n_cells=None, overflow='wrap', dtype=np.float64):
+        if mode not in ('every', 'envelope', 'change'):
+            raise ValueError(f"unknown mode {mode!r}")
+        if overflow not in ('wrap', 'thin'):
+            raise ValueError(f"unknown overflow {overflow!r}")
+        if overflow == 'thin' and (capacity < 2 or capacity % 2):
+            raise ValueError(f"overflow='thin' needs an even capacity, got {capacity}")
+        self.channels = tuple(channels)
+        self.capacity = int(capacity)
+        self.every = int(every)
+        self.mode = mode
+        self.tol = np.broadcast_to(np.asarray(tol, dtype=np.float64), (len(self.channels),)).tolist()
+        self.max_gap = max_gap
+        self.n_cells = n_cells
+        self.overflow = overflow
+
+        row = () if n_cells is None else (int(n_cells),)
+        self._t = np.empty(self.capacity)
+        self._bufs = [np.empty((self.capacity,) + row, dtype=dtype) for _ in self.channels]
+        if mode == 'envelope':
+            self._lo = [np.empty((self.capacity,) + row, dtype=dtype) for _ in self.channels]
+            self._hi = [np.empty((self.capacity,) + row, dtype=dtype) for _ in self.channels]
+        self.bind(self.channels)
+        self.clear()
+        self.record = {'every': self._record_every, 'envelope': self._record_envelope,
+                       'change': self._record_change}[mode]
+
+    def bind(self, source):
+        """Declare the order of the values passed to record()."""
+        source = tuple(source)
+        missing = [c for c in self.channels if c not in source]
+        if missing:
+            raise ValueError(f"channels {missing} are not offered by {source}")
+        self._pick = [source.index(c) for c in self.channels]
+        return self
+
+    def clear(self):
+        self.n_written = 0  # rows written since the start (including overwritten ones)
+        self.n_calls = 0
+        self._last = None   # last kept values (change mode)
+        self._t_last = -np.inf
+        self._win = None    # running window (envelope mode)
+
+    # ---- writing ----
+    def _slot(self):
+        """Row index for the next write, making room first if needed."""
+        if self.n_written >= self.capacity:
+            if self.overflow == 'wrap':
+                return self.n_written % self.capacity
+            self._thin()
+        return self.n_written
+
+    def _thin(self):
+        """Keep every other row (pairs merged for envelopes), double the decimation."""
+        half = self.capacity // 2
+        if self.mode == 'envelope':
+            for lo in self._lo:
+                lo[:half] = np.fmin(lo[0:2 * half:2], lo[1:2 * half:2])
+            for hi in self._hi:
+                hi[:half] = np.fmax(hi[0:2 * half:2], hi[1:2 * half:2])
+            for buf in self._bufs:
+                buf[:half] = buf[1:2 * half:2]
+        else:
+            for buf in self._bufs:
+                buf[:half] = buf[0:2 * half:2]
+        self._t[:half] = self._t[0:2 * half:2]
+        self.n_written = half
+        self.every *= 2
+        self.max_gap *= 2
+
+    def _write(self, t, values):
+        i = self._slot()
+        self._t[i] = t
+        for buf, j in zip(self._bufs, self._pick):
+            buf[i] = values[j]
+        self.n_written += 1
+        return i
+
+    def _write_picked(self, t, values):
+        i = self._slot()
+        self._t[i] = t
+        for buf, v in zip(self._bufs, values):
+            buf[i] = v
+        self.n_written += 1
+        return i
+
+    def _record_every(self, t, *values, force=False):
+        k = self.n_calls
+        self.n_calls = k + 1
+        if k % self.every and not force:
+            return False
+        self._write(t, values)
+        return True
+
+    def _record_change(self, t, *values, force=False):
+        self.n_calls += 1
+        values = [values[j] for j in self._pick]
+        last = self._last
+        if not force and last is not None and t - self._t_last < self.max_gap:
+            if self.n_cells is None:
+                moved = any(abs(v - l) > tol for v, l, tol in zip(values, last, self.tol))
+            else:
+                moved = any(np.any(np.abs(np.asarray(v) - l) > tol)
+                            for v, l, tol in zip(values, last, self.tol))
+            if not moved:
+                return False
+        self._write_picked(t, values)
+        self._last = [np.array(v, dtype=np.float64) if self.n_cells else v for v in values]
+        self._t_last = t
+        return True
+
+    def _record_envelope(self, t, *values, force=False):
+        self.n_calls += 1
+        values = [values[j] for j in self._pick]
+        win = self._win
+        if win is None:
+            # Thin when a window opens, not when it closes, so the new window
+            # already spans the doubled decimation and rows stay evenly spaced
+            if self.n_written >= self.capacity and self.overflow == 'thin':
+                self._thin()
+            if self.n_cells is None:
+                win = self._win = [t, 0, list(values), list(values), values]
+            else:
+                win = self._win = [t, 0, [np.array(v, dtype=np.float64) for v in values],
+                                   [np.array(v, dtype=np.float64) for v in values], values]
+        elif self.n_cells is None:
+            win[2] = [min(l, v) for l, v in zip(win[2], values)]
+            win[3] = [max(h, v) for h, v in zip(win[3], values)]
+            win[4] = values
+        else:
+            for l, h, v in zip(win[2], win[3], values):
+                np.fmin(l, v, out=l)
+                np.fmax(h, v, out=h)
+            win[4] = [np.array(v, dtype=np.float64) for v in values]
+        win[1] += 1
+        if win[1] < self.every and not force:
+            return False
+        self._close_window()
+        return True
+
+    def _close_window(self):
+        win = self._win
+        i = self._write_picked(win[0], win[4])
+        for lo, hi, l, h in zip(self._lo, self._hi, win[2], win[3]):
+            lo[i] = l
+            hi[i] = h
+        self._win = None
+
+    def flush(self):
+        """Write the pending (partial) envelope window, if any."""
+        if self._win is not None:
+            self._close_window()
+        return self
+
+    # ---- reading ----
+    def __len__(self):
+        return min(self.n_written, self.capacity)
+
+    @property
+    def nbytes(self):
+        bufs = self._bufs + (self._lo + self._hi if self.mode == 'envelope' else [])
+        return self._t.nbytes + sum(b.nbytes for b in bufs)
+
+    def _ordered(self, buf):
+        n = len(self)
+        if self.n_written <= self.capacity:
+            return buf[:n].copy()
+        pos = self.n_written % self.capacity
+        return np.concatenate([buf[pos:], buf[:pos]])
+
+    def arrays(self):
+        """Recorded rows in time order: {'t': ..., channel: ..., [channel_min/_max]}."""
+        out = {'t': self._ordered(self._t)}
+        for k, name in enumerate(self.channels):
+            out[name] = self._ordered(self._bufs[k])
+            if self.mode == 'envelope':
+                out[name + '_min'] = self._ordered(self._lo[k])
+                out[name + '_max'] = self._ordered(self._hi[k])
+        return out
+
+    def frame(self):
+        """Single-cell recording as a DataFrame indexed by t."""
+        if self.n_cells is not None:
+            raise ValueError("frame() is for single-cell recordings; use arrays()")
+        return pd.DataFrame(self.arrays()).set_index('t')
+
+    def __getitem__(self, name):
+        return self.arrays()[name]
+
+if __name__ == "__main__":
+    import time
+    from battery import BatterySim
+    from fleet import BatteryFleet
+
+    # Lists + `if t % 60 == 0` (the old script loops) against the recorder
+    t0 = time.perf_counter()
+    sim = BatterySim()
+    t, times, volts, socs = 0, [], [], []
+    while True:
+        v, i, s = sim.step(2.21, 1.0)
+        if v is None or v < 3.0 or s <= 0:
+            break
+        if t % 60 == 0:
+            times.append(t)
+            volts.append(v)
+            socs.append(s)
+        t += 1
+    t_lists = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    rec = Recorder(every=60)
+    t_end, dead = BatterySim().discharge(2.21, recorder=rec)
+    t_rec = time.perf_counter() - t0
+    print(f"single cell: lists {t_lists * 1e3:.0f} ms, recorder {t_rec * 1e3:.0f} ms, "
+          f"{len(rec)} rows, identical: {np.array_equal(rec['v_term'], volts)}")
+
+    # A week of 1 s steps kept in a fixed 2000-row buffer
+    rec = Recorder(capacity=2000, mode='envelope', every=60, overflow='thin')
+    sim = BatterySim(capacity_mah=60_000)
+    t_end, dead = sim.discharge(0.9, duration=7 * 86400.0, recorder=rec)
+    print(f"week-long run: {t_end / 86400:.2f} days, {len(rec)} rows of {rec.every} steps, "
+          f"{rec.nbytes / 1e3:.0f} kB")
+
+    rec = Recorder(('v_term', 'soc'), capacity=500, mode='change', tol=(0.01, 0.01),
+                   n_cells=1000, overflow='thin')
+    fleet = BatteryFleet(n=1000, R0=np.linspace(0.04, 0.2, 1000))
+    fleet.run(np.linspace(1.0, 5.0, 1000), dt=1.0, recorder=rec)
+    print(f"fleet of 1000: {len(rec)} rows, {rec.nbytes / 1e6:.1f} MB")
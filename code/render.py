@@ -0,0 +1,144 @@
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from results import HERE, ResultStore, source_digest
+
+# ==========================================
+# 1. Figure registry
+# ==========================================
+# figure name -> (script module, output file).  Each script exposes
+# simulate() -> result dict and plot(result) -> matplotlib Figure.
+FIGURES = {
+    'tornado': ('sa', 'tornado.png'),
+    'tte':     ('TTE', 'TTE.png'),
+    'pload':   ('Pload', 'Pload.png'),
+    'temp':    ('T_sa', 'Temp.png'),
+    'r0':      ('r0_sa', 'R0.png'),
+    'daily':   ('dailysim', 'daily_simulation_no_power_curve.png'),
+}
+PIC_DIR = os.path.join(os.path.dirname(HERE), 'pic')
+MANIFEST = '.render_manifest.json'
+
+def _init_worker():
+    """Headless matplotlib in every worker process."""
+    os.environ['MPLBACKEND'] = 'Agg'
+    import matplotlib
+    matplotlib.use('Agg')
+
+# ==========================================
+# 2. Pipeline stages (run inside workers)
+# ==========================================
+def simulate_figure(name, key, store_root):
+    """Run the script's simulate() and store its result under `name`."""
+    module = importlib.import_module(FIGURES[name][0])
+    t0 = time.perf_counter()
+    result = module.simulate()
+    digest = ResultStore(store_root).put(name, result, key=key)
+    return name, digest, time.perf_counter() - t0
+
+def render_figure(name, out_path, store_root, dpi):
+    """Plot the stored result of `name` to out_path with the Agg backend."""
+    import matplotlib.pyplot as plt
+    module = importlib.import_module(FIGURES[name][0])
+    t0 = time.perf_counter()
+    fig = module.plot(ResultStore(store_root).get(name))
+    fig.savefig(out_path, dpi=dpi)
+    plt.close(fig)
+    return name, time.perf_counter() - t0
+
+def plot_digest(module_name, dpi):
+    """Fingerprint of a script's plot() source (and style) plus the output settings."""
+    module = importlib.import_module(module_name)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(inspect.getsource(module.plot).encode())
+    h.update(repr(getattr(module, 'STYLE', None)).encode())
+    h.update(f"dpi={dpi}".encode())
+    return h.hexdigest()
+
+# ==========================================
+# 3. Incremental build
+# ==========================================
+def build(names=None, out_dir=PIC_DIR, store=None, workers=None, dpi=None, force=False,
+          verbose=True):
+    """
+    Bring the figures in out_dir up to date.
+
+    1. A figure's simulation reruns only if the source digest of its
+       script (and the local modules it imports) differs from the key
+       stored with the result.
+    2. A figure is redrawn only if its result digest, plot() source or
+       dpi differ from the last render recorded in out_dir/MANIFEST, or
+       the image is missing.
+
+    Both stages run over a process pool with the Agg backend.  Returns
+    {name: 'simulated+rendered' | 'rendered' | 'up to date'}.
+    """
+    names = list(names or FIGURES)
+    store = store or ResultStore()
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    keys = {n: source_digest(FIGURES[n][0]) for n in names}
+    stale = [n for n in names
+             if force or (store.info(n) or {}).get('key') != keys[n]]
+    status = {n: 'up to date' for n in names}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(simulate_figure, n, keys[n], store.root) for n in stale]
+        for fut in futures:
+            n, _, elapsed = fut.result()
+            status[n] = 'simulated'
+            if verbose:
+                print(f"[simulate] {n}: {elapsed:.1f}s", flush=True)
+
+        jobs = {}
+        for n in names:
+            out_path = os.path.join(out_dir, FIGURES[n][1])
+            render_key = f"{store.info(n)['digest']}:{plot_digest(FIGURES[n][0], dpi)}"
+            if not force and manifest.get(n) == render_key and os.path.exists(out_path):
+                continue
+            jobs[n] = (render_key, pool.submit(render_figure, n, out_path, store.root, dpi))
+        for n, (render_key, fut) in jobs.items():
+            _, elapsed = fut.result()
+            manifest[n] = render_key
+            status[n] = 'simulated+rendered' if status[n] == 'simulated' else 'rendered'
+            if verbose:
+                print(f"[render] {n} -> {FIGURES[n][1]}: {elapsed:.1f}s", flush=True)
+
+    # A re-simulation that reproduced the same result leaves the image as is
+    for n in names:
+        if status[n] == 'simulated':
+            status[n] = 'simulated (figure unchanged)'
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    return status
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render the pic/ figures headless, incrementally")
+    parser.add_argument('names', nargs='*', help=f"figures out of {', '.join(FIGURES)} (default: all)")
+    parser.add_argument('--out', default=PIC_DIR, help="output directory")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dpi', type=float, default=None)
+    parser.add_argument('--force', action='store_true', help="re-simulate and redraw everything")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(FIGURES)
+    if unknown:
+        parser.error(f"unknown figure(s): {', '.join(sorted(unknown))}")
+
+    t0 = time.perf_counter()
+    status = build(args.names or None, args.out, workers=args.workers, dpi=args.dpi,
+                   force=args.force)
+    for n, s in status.items():
+        print(f"  {n:8s} {s}")
+    print(f"done in {time.perf_counter() - t0:.1f}s")
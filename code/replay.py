@@ -0,0 +1,223 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from battery import BatterySim
+from identify import CURRENT_COL, PERCENT_COL, rail_columns
+from telemetry import UW_TO_W, iter_chunks, read_header
+
+# ==========================================
+# 1. Streaming rail power
+# ==========================================
+def rail_power(chunk, rails):
+    """Total power (W) per row: vectorized sum of the rails, missing values as 0."""
+    X = chunk[rails].to_numpy(dtype=np.float64)
+    return np.nansum(X, axis=1) * UW_TO_W
+
+def iter_rows(path, rails=None, extra=(PERCENT_COL,), chunksize=100_000):
+    """
+    Stream (power_w, *extra columns) arrays chunk by chunk.  Only the rail
+    and extra columns are parsed, so memory is bounded by chunksize.
+    """
+    rails = list(rails or rail_columns(read_header(path)))
+    for chunk in iter_chunks(path, rails + list(extra), chunksize):
+        yield (rail_power(chunk, rails),) + tuple(chunk[c].to_numpy(dtype=np.float64)
+                                                 for c in extra)
+
+def estimate_interval(path, capacity_mah=4575, chunksize=100_000):
+    """
+    Sample interval (s) by coulomb counting in one streamed pass, as in
+    identify.estimate_dt(): summed BATTERY__PERCENT drops * Q over the
+    summed discharge current of the rows they follow.  Row pairs where the
+    percent rises (charging) are left out.  Raises ValueError when the log
+    has no discharge drops to count.
+    """
+    charge = current = 0.0
+    last_pct = last_i = np.nan
+    for chunk in iter_chunks(path, [PERCENT_COL, CURRENT_COL], chunksize):
+        pct = chunk[PERCENT_COL].to_numpy(dtype=np.float64)
+        i_load = chunk[CURRENT_COL].to_numpy(dtype=np.float64) * UW_TO_W
+        drop = np.concatenate([[last_pct], pct[:-1]]) - pct
+        i_prev = np.concatenate([[last_i], i_load[:-1]])
+        ok = np.isfinite(drop) & (drop >= 0) & np.isfinite(i_prev)
+        charge += drop[ok].sum() / 100.0 * capacity_mah * 3.6
+        current += i_prev[ok].sum()
+        last_pct, last_i = pct[-1], i_load[-1]
+    if not charge > 0 or not current > 0:
+        raise ValueError(f"{path}: no {PERCENT_COL} drops to estimate the sample interval "
+                         f"from; pass dt")
+    return charge / current
+
+# ==========================================
+# 2. Trace-driven replay
+# ==========================================
+def iter_replay(path='aggregated.csv', dt=None, step=1.0, method='fixed', battery=None,
+                rails=None, chunksize=100_000, resync=True):
+    """
+    Drive the ECM with the summed rail power of a telemetry log, row by
+    row, streaming the file in chunks.
+
+    Each row's power is held for the sample interval dt (estimated by
+    estimate_interval() if None) and integrated with method='fixed' at the
+    largest step <= `step` that divides dt, or taken in bulk with
+    method='adaptive'.  The model starts from the logged SoC and, with
+    resync, restarts from it whenever BATTERY__PERCENT rises (the phone
+    was charged; charging is not modelled).
+
+    Yields one DataFrame per chunk (attrs['dt'] = dt) with one row per log
+    row: power_w, soc_meas and soc_pred (%, the prediction at the start of
+    the row), error (pred - meas, percentage points), session and dead
+    (the model hit cutoff earlier in the session).  Leading rows before
+    the first finite percent are not simulated (soc_pred NaN, session -1).
+    """
+    battery = battery or {}
+    sim = BatterySim(**battery)
+    if dt is None:
+        dt = estimate_interval(path, sim.capacity_mah, chunksize)
+    if method == 'fixed':
+        h = dt / max(1, math.ceil(dt / step - 1e-9))
+        integ = sim.integrator('fixed', dt=h)
+        duration = dt - 0.5 * h # exactly dt / h steps despite float round-off
+    else:
+        integ = sim.integrator(method)
+        duration = dt
+
+    soc = up = None
+    dead = False
+    session = -1
+    last = np.nan
+    for power, pct in iter_rows(path, rails, chunksize=chunksize):
+        n = len(power)
+        pred = np.empty(n)
+        sessions = np.empty(n, dtype=np.int64)
+        dead_rows = np.empty(n, dtype=bool)
+        for k, (p, meas) in enumerate(zip(power.tolist(), pct.tolist())):
+            if soc is None and meas != meas: # no SoC to start from yet
+                pred[k], sessions[k], dead_rows[k] = np.nan, -1, False
+                continue
+            if soc is None or (resync and meas > last):
+                session += 1
+                soc, up, dead = meas / 100.0, 0.0, False
+            pred[k] = soc * 100.0
+            sessions[k] = session
+            dead_rows[k] = dead
+            if not dead:
+                soc, up, _, dead = integ.advance(soc, up, p, duration)
+            if meas == meas: # skip NaN percents
+                last = meas
+        frame = pd.DataFrame({'power_w': power, 'soc_meas': pct, 'soc_pred': pred,
+                              'error': pred - pct, 'session': sessions, 'dead': dead_rows})
+        frame.attrs['dt'] = dt
+        yield frame
+
+def replay(path='aggregated.csv', dt=None, step=1.0, method='fixed', battery=None,
+           rails=None, chunksize=100_000, resync=True, trace=False):
+    """
+    Replay a telemetry log through the ECM (see iter_replay()).
+
+    By default returns the summarize() table, accumulated by SessionStats
+    as the chunks go by, so memory stays O(sessions) however long the log.
+    trace=True returns the full per-row trace instead (O(rows); for plots
+    and short logs).  attrs['dt'] holds the sample interval either way.
+    """
+    if dt is None:
+        dt = estimate_interval(path, BatterySim(**(battery or {})).capacity_mah, chunksize)
+    chunks = iter_replay(path, dt=dt, step=step, method=method, battery=battery,
+                         rails=rails, chunksize=chunksize, resync=resync)
+    if trace:
+        out = pd.concat(chunks, ignore_index=True)
+    else:
+        stats = SessionStats()
+        for frame in chunks:
+            stats.update(frame)
+        out = stats.table()
+    out.attrs['dt'] = dt
+    return out
+
+# ==========================================
+# 3. Error statistics
+# ==========================================
+class SessionStats:
+    """
+    Running per-session error sums of a replay trace, fed chunk by chunk.
+
+    Sessions are contiguous in the trace, so each chunk reduces to one row
+    per session with np.add.reduceat and is merged into the session it
+    continues; table() turns the sums into bias / MAE / RMSE.
+    """
+    # rows, meas_start, meas_end, pred_end, n (finite errors), sum e, sum |e|, sum e^2, max |e|, dead_rows
+    ADD = [0, 4, 5, 6, 7, 9]
+
+    def __init__(self):
+        self.acc = {}
+
+    def update(self, frame):
+        s = frame['session'].to_numpy()
+        keep = s >= 0
+        if not keep.any():
+            return self
+        s = s[keep]
+        meas = frame['soc_meas'].to_numpy(dtype=np.float64)[keep]
+        pred = frame['soc_pred'].to_numpy(dtype=np.float64)[keep]
+        e = frame['error'].to_numpy(dtype=np.float64)[keep]
+        dead = frame['dead'].to_numpy(dtype=np.float64)[keep]
+        ids, first, rows = np.unique(s, return_index=True, return_counts=True)
+        last = first + rows - 1
+        ok = np.isfinite(e)
+        e0 = np.where(ok, e, 0.0)
+        part = np.column_stack([
+            rows, meas[first], meas[last], pred[last],
+            np.add.reduceat(ok.astype(np.float64), first), np.add.reduceat(e0, first),
+            np.add.reduceat(np.abs(e0), first), np.add.reduceat(e0 * e0, first),
+            np.maximum.reduceat(np.where(ok, np.abs(e), -np.inf), first),
+            np.add.reduceat(dead, first),
+        ])
+        for sid, row in zip(ids.tolist(), part):
+            old = self.acc.get(sid)
+            if old is not None: # session continues from the previous chunk
+                row[self.ADD] += old[self.ADD]
+                row[1] = old[1]
+                row[8] = max(row[8], old[8])
+            self.acc[sid] = row
+        return self
+
+    def table(self):
+        """Predicted vs measured BATTERY__PERCENT per session and overall."""
+        ids = sorted(self.acc)
+        acc = np.array([self.acc[k] for k in ids]).reshape(-1, 10)
+        total = np.full(10, np.nan)
+        total[self.ADD] = acc[:, self.ADD].sum(axis=0)
+        total[8] = acc[:, 8].max(initial=-np.inf)
+        acc = np.vstack([acc, total])
+        n = acc[:, 4]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table = pd.DataFrame({
+                'rows': acc[:, 0], 'meas_start': acc[:, 1], 'meas_end': acc[:, 2],
+                'pred_end': acc[:, 3], 'bias': acc[:, 5] / n, 'mae': acc[:, 6] / n,
+                'rmse': np.sqrt(acc[:, 7] / n),
+                'max_abs': np.where(np.isfinite(acc[:, 8]), acc[:, 8], np.nan),
+                'dead_rows': acc[:, 9],
+            }, index=pd.Index(ids + ['all'], name='session'))
+        return table
+
+def summarize(trace):
+    """Predicted vs measured BATTERY__PERCENT per session and overall."""
+    return SessionStats().update(trace).table()
+
+if __name__ == "__main__":
+    import time
+    from identify import DischargeFit, battery_kwargs, load_sessions
+
+    t0 = time.perf_counter()
+    trace = replay('aggregated.csv', chunksize=250, trace=True)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(trace)} rows replayed in {elapsed:.2f}s (dt ~ {trace.attrs['dt']:.1f} s, "
+          f"1 s integrator steps, 250-row chunks)")
+    print("default ECM:")
+    print(summarize(trace).round(2).to_string())
+
+    params = DischargeFit(load_sessions('aggregated.csv')).fit()
+    fitted = replay('aggregated.csv', battery=battery_kwargs(params), chunksize=250)
+    print("ECM identified from the same log (identify.py), streamed stats:")
+    print(fitted.round(2).to_string())
@@ -0,0 +1,108 @@
+import ast
+import hashlib
+import json
+import os
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# ==========================================
+# 1. Source fingerprints
+# ==========================================
+def local_imports(path, root=HERE):
+    """Modules of this directory imported by the file at `path`."""
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), filename=path)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(a.name.split('.')[0] for a in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split('.')[0])
+    return sorted(n for n in names if os.path.exists(os.path.join(root, n + '.py')))
+
+def source_digest(module, root=HERE):
+    """
+    BLAKE2b digest of `module`.py and every local module it imports
+    (transitively), so a simulation result goes stale when any code it
+    ran has been edited.
+    """
+    seen, todo = set(), [module]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        todo.extend(local_imports(os.path.join(root, name + '.py'), root))
+    h = hashlib.blake2b(digest_size=16)
+    for name in sorted(seen):
+        with open(os.path.join(root, name + '.py'), 'rb') as f:
+            h.update(name.encode() + b'\0' + f.read())
+    return h.hexdigest()
+
+# ==========================================
+# 2. Result store
+# ==========================================
+class ResultStore:
+    """
+    Simulation results on disk, one entry per name:
+    <root>/<name>.npz holds the array fields, <name>.json the rest
+    (scalars, strings, lists) plus the entry's content digest and the
+    `key` it was computed for (e.g. a source_digest()).
+
+    A result is a flat dict; ragged curves are stored long-form (values
+    concatenated, with an index array telling the curves apart).
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(HERE, '.results')
+        os.makedirs(self.root, exist_ok=True)
+
+    def _paths(self, name):
+        return os.path.join(self.root, name + '.npz'), os.path.join(self.root, name + '.json')
+
+    def put(self, name, result, key=None):
+        """Store a result dict; returns its content digest."""
+        arrays = {k: np.asarray(v) for k, v in result.items() if isinstance(v, np.ndarray)}
+        meta = {k: v for k, v in result.items() if k not in arrays}
+        h = hashlib.blake2b(digest_size=16)
+        for k in sorted(arrays):
+            a = np.ascontiguousarray(arrays[k])
+            h.update(f"{k}:{a.dtype.str}:{a.shape}".encode())
+            h.update(a.tobytes())
+        h.update(json.dumps(meta, sort_keys=True, default=str).encode())
+        digest = h.hexdigest()
+
+        npz_path, json_path = self._paths(name)
+        np.savez(npz_path + '.tmp.npz', **arrays)
+        os.replace(npz_path + '.tmp.npz', npz_path)
+        with open(json_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'digest': digest, 'key': key, 'meta': meta}, f, indent=1,
+                      ensure_ascii=False, default=str)
+        os.replace(json_path + '.tmp', json_path)
+        return digest
+
+    def info(self, name):
+        """{'digest', 'key', 'meta'} of an entry, or None if it is missing."""
+        npz_path, json_path = self._paths(name)
+        if not (os.path.exists(npz_path) and os.path.exists(json_path)):
+            return None
+        with open(json_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def get(self, name):
+        """The stored result dict (arrays and metadata merged)."""
+        info = self.info(name)
+        if info is None:
+            raise KeyError(name)
+        with np.load(self._paths(name)[0]) as npz:
+            result = {k: npz[k] for k in npz.files}
+        result.update(info['meta'])
+        return result
+
+    def __contains__(self, name):
+        return self.info(name) is not None
+
+    def names(self):
+        return sorted(f[:-5] for f in os.listdir(self.root) if f.endswith('.json'))
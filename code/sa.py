@@ -1,5 +1,6 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from integrator import AdaptiveIntegrator
 
 # ==========================================
 # 1. 基础仿真模型 (适配灵敏度分析)
@@ -10,47 +11,14 @@ def run_simulation(params):
     运行单次仿真，返回 TTE (小时)
     params: 包含所有物理参数的字典
     """
-    # 提取参数
-    capacity_coulomb = params['capacity_mah'] * 3.6
-    r0 = params['r0']
-    rp = 0.03
-    cp = 2000
-    tau = rp * cp
-    
     # 负载功率 (假设一个恒定的混合负载用于基准测试)
     # 例如：屏幕 + CPU + 底噪
     p_load = params['p_base'] + params['p_screen_coeff'] * 150 + 1.0 # 150亮度 + 1W CPU
     
-    cutoff = 3.0
-    dt = 1.0
-    soc = 1.0
-    up = 0.0
-    t = 0.0
-    
-    # 简单的 OCV 曲线
-    def get_ocv(s):
-        return 3.2 + 0.9*s + 0.3*s**2
-    
-    while soc > 0:
-        ocv = get_ocv(soc)
-        
-        # 计算电流
-        a = r0
-        b = -(ocv - up)
-        c = p_load
-        delta = b**2 - 4*a*c
-        
-        if delta < 0: break # 电压崩溃
-        
-        i_load = (-b - np.sqrt(delta)) / (2*a)
-        v_term = ocv - up - i_load * r0
-        
-        if v_term < cutoff: break
-        
-        # 更新
-        soc -= (i_load * dt) / capacity_coulomb
-        up = up * np.exp(-dt/tau) + i_load * rp * (1 - np.exp(-dt/tau))
-        t += dt
+    # 恒功率负载下用自适应步长积分，TTE 与 1s 定步长结果相差 < 2s
+    integ = AdaptiveIntegrator(capacity_mah=params['capacity_mah'], R0=params['r0'],
+                               Rp=0.03, Cp=2000, cutoff_voltage=3.0)
+    t = integ.time_to_empty(p_load, init_soc=1.0)
         
     return t / 3600.0 # 返回小时
 
@@ -58,7 +26,7 @@ def run_simulation(params):
 # 2. 灵敏度分析主逻辑
 # ==========================================
 
-def sensitivity_analysis():
+def simulate():
     # 1. 定义基准参数 (Baseline)
     baseline_params = {
         'capacity_mah': 4575.0,
@@ -112,12 +80,20 @@ def sensitivity_analysis():
             'high': delta_high
         })
         
-    # ==========================================
-    # 3. 绘制龙卷风图 (Tornado Plot)
-    # ==========================================
-    labels = [r['label'] for r in results]
-    lows = [r['low'] for r in results]
-    highs = [r['high'] for r in results]
+    return {'labels': [r['label'] for r in results],
+            'low': np.array([r['low'] for r in results]),
+            'high': np.array([r['high'] for r in results]),
+            'base_tte': base_tte}
+
+# ==========================================
+# 3. 绘制龙卷风图 (Tornado Plot)
+# ==========================================
+
+def plot(result):
+    labels = result['labels']
+    lows = result['low'].tolist()
+    highs = result['high'].tolist()
+    base_tte = result['base_tte']
     
     y_pos = np.arange(len(labels))
     
@@ -142,7 +118,11 @@ def sensitivity_analysis():
         ax.text(l - 0.5 if l < 0 else l + 0.5, i, f'{l:.1f}%', va='center', ha='right' if l < 0 else 'left', color='#1f77b4', fontweight='bold')
         ax.text(h + 0.5 if h > 0 else h - 0.5, i, f'{h:.1f}%', va='center', ha='left' if h > 0 else 'right', color='#d62728', fontweight='bold')
         
-    plt.tight_layout()
+    fig.tight_layout()
+    return fig
+
+def sensitivity_analysis():
+    plot(simulate())
     plt.show()
 
 if __name__ == "__main__":
@@ -1,12 +1,13 @@
-import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
 import matplotlib.pyplot as plt
+from telemetry import open_columns
 
 def evaluate_oled_model_r2():
     # 1. Load Data
-    df = pd.read_csv('aggregated.csv')
+    df = open_columns('aggregated.csv', ['Display_ENERGY_AVG_UWS', 'Brightness',
+                                         'RougeMesuré', 'VertMesuré', 'BleuMesuré']).astype(np.float64)
     
     # 2. Preprocessing
     # Target: Display Power in Watts (assuming UWS is micro-watt-seconds per second? No, it's Energy AVG UWS. 
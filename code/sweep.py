@@ -0,0 +1,301 @@
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+from calc import BATTERY_CONFIG, COEFFS, SCENARIOS, build_power_model
+from tte_table import TTETable
+
+# ==========================================
+# 1. Sweep axes
+# ==========================================
+# Product-team grid: 256 x 100 x 50 x 50 = 64M scenarios
+DEFAULT_AXES = {
+    'brightness':  np.linspace(0, 255, 256),
+    'cpu_load':    np.linspace(0.0, 1.0, 100),
+    'gpu_power_w': np.linspace(0.0, 2.5, 50),
+    'wifi_mbps':   np.linspace(0.0, 10.0, 50),
+}
+DEFAULT_SOC = (1.0, 0.75, 0.5, 0.25)
+
+def lhs_strata(n, d, rng):
+    """
+    Latin-hypercube design as int32 strata, one permutation of 0..n-1 per
+    dimension ((n, d), 4 bytes per value); the point is (strata + U) / n.
+    """
+    strata = np.empty((n, d), dtype=np.int32)
+    for j in range(d):
+        strata[:, j] = rng.permutation(n).astype(np.int32)
+    return strata
+
+# ==========================================
+# 2. TTE along the power axis
+# ==========================================
+class PowerTTE:
+    """
+    TTETable lookups at fixed SoC levels, R0, temperature and capacity,
+    reduced to one curve per SoC over the table's power nodes.  The table
+    is multilinear in log P, so interpolating the node energies linearly in
+    log P reproduces TTETable.query exactly while costing one np.interp per
+    SoC level instead of 16 corner gathers per point.  Powers outside the
+    nodes raise ValueError: give the table a power axis that covers them.
+    """
+
+    def __init__(self, table, soc=DEFAULT_SOC, R0=0.05, temp_c=25.0,
+                 capacity_mah=BATTERY_CONFIG['capacity_mah']):
+        self.soc = np.atleast_1d(np.asarray(soc, dtype=np.float64))
+        self.nodes = table.axes['power_w']
+        self.log_nodes = np.log(self.nodes)
+        tte_h, _ = table.query(self.nodes[None, :], self.soc[:, None], R0, temp_c, capacity_mah)
+        self.energy_wh = tte_h * self.nodes # (n_soc, n_nodes)
+
+    def __call__(self, power_w):
+        """TTE (h), shape power_w.shape + (n_soc,)."""
+        p = np.asarray(power_w, dtype=np.float64)
+        outside = ~((p >= self.nodes[0]) & (p <= self.nodes[-1]))
+        if outside.any():
+            bad = p[outside]
+            raise ValueError(f"powers {bad.min():.3g}-{bad.max():.3g} W are outside the TTE table's "
+                             f"power axis ({self.nodes[0]:.3g}-{self.nodes[-1]:.3g} W); pass a "
+                             f"TTETable whose axes['power_w'] covers them")
+        lp = np.log(p)
+        out = np.empty(p.shape + (len(self.soc),))
+        for k, e in enumerate(self.energy_wh):
+            out[..., k] = np.interp(lp, self.log_nodes, e) / p
+        return out
+
+# ==========================================
+# 3. Streamed compressed output
+# ==========================================
+class NpzStream:
+    """
+    A compressed .npz written without holding the large members in memory:
+    stream() members are appended chunk by chunk to raw temporary files and
+    deflated into the archive (header + bytes, the .npy layout) on close().
+    np.load() reads the result as usual.  The temporary directory is made
+    by the first stream() and removed by close() or discard().
+    """
+
+    def __init__(self, path, compresslevel=None):
+        self.path = path
+        self.compresslevel = compresslevel
+        self._tmp = None
+        self._small = {}
+        self._streams = {}
+
+    def add(self, name, array):
+        self._small[name] = np.asarray(array)
+
+    def stream(self, name, shape, dtype=np.float32):
+        if self._tmp is None:
+            self._tmp = tempfile.mkdtemp(prefix='sweep_',
+                                         dir=os.path.dirname(os.path.abspath(self.path)))
+        raw = os.path.join(self._tmp, name + '.raw')
+        self._streams[name] = (raw, tuple(shape), np.dtype(dtype))
+        open(raw, 'wb').close()
+        return name
+
+    def write(self, name, chunk):
+        raw, _, dtype = self._streams[name]
+        with open(raw, 'ab') as f:
+            np.ascontiguousarray(chunk, dtype=dtype).tofile(f)
+
+    def close(self):
+        tmp_path = self.path + '.tmp'
+        try:
+            with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True,
+                                 compresslevel=self.compresslevel) as zf:
+                for name, array in self._small.items():
+                    with zf.open(name + '.npy', 'w') as f:
+                        npy_format.write_array(f, array, allow_pickle=False)
+                for name, (raw, shape, dtype) in self._streams.items():
+                    expected = int(np.prod(shape)) * dtype.itemsize
+                    if os.path.getsize(raw) != expected:
+                        raise ValueError(f"{name}: wrote {os.path.getsize(raw)} bytes, "
+                                         f"expected {expected}")
+                    with zf.open(name + '.npy', 'w', force_zip64=True) as f, open(raw, 'rb') as src:
+                        npy_format.write_array_header_1_0(
+                            f, {'descr': npy_format.dtype_to_descr(dtype), 'fortran_order': False,
+                                'shape': shape})
+                        shutil.copyfileobj(src, f, 16 << 20)
+            os.replace(tmp_path, self.path)
+        finally:
+            self.discard()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def discard(self):
+        """Drop the streamed data without writing the archive."""
+        if self._tmp is not None:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            self._tmp = None
+
+# ==========================================
+# 4. Sweep engine
+# ==========================================
+def sweep(axes=None, out='sweep.npz', mode='grid', n=None, seed=0, soc=DEFAULT_SOC,
+          base='Video Streaming', fixed=None, coeffs=COEFFS, R0=0.05, temp_c=25.0,
+          capacity_mah=BATTERY_CONFIG['capacity_mah'], chunk=1_000_000, table=None,
+          compresslevel=None, verbose=True):
+    """
+    Total power and ECM TTE over a grid of calc.py scenario inputs.
+
+    mode='grid' : axes {input: values}, every combination (C order); the
+                  archive holds power_w and tte_h_<k> (TTE from soc[k]) with
+                  the grid's shape, and axis_<input> for each axis.
+    mode='lhs'  : axes {input: (lo, hi)}, n Latin-hypercube points; the
+                  archive holds x_<input>, power_w and tte_h_<k>, all (n,).
+
+    Each SoC level is its own member so that readers such as heatmap()
+    only inflate the level they use.
+
+    Inputs not swept come from SCENARIOS[base], overridden by `fixed`.
+    Points are evaluated chunk rows at a time with the compiled power model
+    (calc.build_power_model) and PowerTTE, and results stream into the
+    compressed archive `out` as float32, so memory stays O(chunk) apart
+    from the LHS design (4 bytes per point and input).  Returns out.
+    """
+    axes = dict(DEFAULT_AXES if axes is None else axes)
+    model = build_power_model(coeffs)
+    unknown = set(axes) - set(model.inputs)
+    if unknown:
+        raise ValueError(f"unknown sweep inputs {sorted(unknown)}; model inputs are {model.inputs}")
+    const = {k: v for k, v in SCENARIOS[base].items() if k in model.inputs and k not in axes}
+    const.update(fixed or {})
+    names = list(axes)
+    if mode == 'grid':
+        values = [np.asarray(axes[k], dtype=np.float64) for k in names]
+        shape = tuple(len(v) for v in values)
+    elif mode == 'lhs':
+        if n is None:
+            raise ValueError("mode='lhs' needs n")
+        shape = (int(n),)
+    else:
+        raise ValueError(f"unknown mode {mode!r}")
+    total = int(np.prod(shape))
+    tte = PowerTTE(table or TTETable(verbose=verbose), soc, R0, temp_c, capacity_mah)
+
+    writer = NpzStream(out, compresslevel)
+    writer.add('inputs', np.array(names))
+    writer.add('soc', tte.soc)
+    writer.add('mode', np.array(mode))
+    for k, v in const.items():
+        writer.add(f'fixed_{k}', np.asarray(v, dtype=np.float64))
+    if mode == 'grid':
+        for k, v in zip(names, values):
+            writer.add(f'axis_{k}', v)
+    else:
+        lo = np.array([axes[k][0] for k in names], dtype=np.float64)
+        span = np.array([axes[k][1] for k in names], dtype=np.float64) - lo
+        rng = np.random.default_rng(seed)
+        strata = lhs_strata(total, len(names), rng)
+        for k in names:
+            writer.add(f'range_{k}', np.asarray(axes[k], dtype=np.float64))
+            writer.stream(f'x_{k}', shape)
+    writer.stream('power_w', shape)
+    for j in range(len(tte.soc)):
+        writer.stream(f'tte_h_{j}', shape)
+
+    t0 = time.perf_counter()
+    try:
+        next_report = 0.1
+        for start in range(0, total, chunk):
+            stop = min(start + chunk, total)
+            if mode == 'grid':
+                idx = np.unravel_index(np.arange(start, stop), shape)
+                inputs = {k: v[i] for k, v, i in zip(names, values, idx)}
+            else:
+                u = (strata[start:stop] + rng.random((stop - start, len(names)))) / total
+                x = lo + u * span
+                inputs = {k: x[:, j] for j, k in enumerate(names)}
+                for k in names:
+                    writer.write(f'x_{k}', inputs[k])
+            power = np.broadcast_to(model(**inputs, **const), (stop - start,))
+            writer.write('power_w', power)
+            for j, col in enumerate(tte(power).T):
+                writer.write(f'tte_h_{j}', col)
+            if verbose and stop / total >= next_report:
+                print(f"  {stop:,}/{total:,} points, {time.perf_counter() - t0:.1f}s", flush=True)
+                next_report = np.floor(stop / total * 10 + 1) / 10
+        writer.close()
+    except BaseException:
+        writer.discard()
+        raise
+    if verbose:
+        print(f"{total:,} points in {time.perf_counter() - t0:.1f}s -> {out} "
+              f"({os.path.getsize(out) / 1e6:.1f} MB)")
+    return out
+
+def heatmap(path, x, y, soc=1.0, reduce=np.mean):
+    """
+    TTE (h) map over two axes of a grid sweep, the other axes reduced with
+    `reduce` (e.g. np.mean, np.min).  Returns (x values, y values, Z[y, x]).
+    """
+    with np.load(path) as data:
+        if str(data['mode']) != 'grid':
+            raise ValueError("heatmap() needs a grid sweep")
+        names = data['inputs'].tolist()
+        k = int(np.argmin(np.abs(data['soc'] - soc)))
+        Z = data[f'tte_h_{k}']
+        xv, yv = data[f'axis_{x}'], data[f'axis_{y}']
+    other = tuple(i for i, name in enumerate(names) if name not in (x, y))
+    Z = reduce(Z, axis=other) if other else Z
+    if names.index(x) < names.index(y):
+        Z = Z.T
+    return xv, yv, Z
+
+def plot_heatmap(path, x, y, soc=1.0, reduce=np.mean):
+    import matplotlib.pyplot as plt
+    xv, yv, Z = heatmap(path, x, y, soc, reduce)
+    fig, ax = plt.subplots(figsize=(9, 6))
+    mesh = ax.pcolormesh(xv, yv, Z, shading='auto', cmap='viridis')
+    fig.colorbar(mesh, ax=ax, label='TTE (h)')
+    ax.set_xlabel(x, fontsize=14, fontweight='bold')
+    ax.set_ylabel(y, fontsize=14, fontweight='bold')
+    ax.set_title(f"TTE from {int(round(soc * 100))}% SoC ({reduce.__name__} over other inputs)")
+    fig.tight_layout()
+    return fig
+
+def parse_axis(spec):
+    """'name=lo:hi:n' (grid) or 'name=lo:hi' (LHS range)."""
+    name, _, rng = spec.partition('=')
+    parts = [float(v) for v in rng.split(':')]
+    if len(parts) == 3:
+        return name, np.linspace(parts[0], parts[1], int(parts[2]))
+    if len(parts) == 2:
+        return name, tuple(parts)
+    raise ValueError(f"bad axis spec {spec!r}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Power / TTE sweep over calc.py scenario inputs")
+    parser.add_argument('axes', nargs='*',
+                        help="name=lo:hi:n (grid) or name=lo:hi (--lhs); default: "
+                             + ' x '.join(f"{k}[{len(v)}]" for k, v in DEFAULT_AXES.items()))
+    parser.add_argument('--lhs', type=int, metavar='N', help="Latin-hypercube sample of N points")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--soc', type=float, nargs='+', default=list(DEFAULT_SOC))
+    parser.add_argument('--base', default='Video Streaming', choices=list(SCENARIOS),
+                        help="scenario giving the inputs that are not swept")
+    parser.add_argument('--chunk', type=int, default=1_000_000)
+    parser.add_argument('--out', default='sweep.npz')
+    parser.add_argument('--plot', nargs=2, metavar=('X', 'Y'), help="TTE heatmap of two grid axes")
+    args = parser.parse_args()
+
+    try:
+        axes = dict(parse_axis(s) for s in args.axes) or None
+    except ValueError as e:
+        parser.error(str(e))
+    if args.lhs and axes is None:
+        axes = {k: (v[0], v[-1]) for k, v in DEFAULT_AXES.items()}
+    path = sweep(axes, args.out, 'lhs' if args.lhs else 'grid', args.lhs, args.seed, args.soc,
+                 args.base, chunk=args.chunk)
+    if args.plot:
+        import matplotlib.pyplot as plt
+        plot_heatmap(path, *args.plot, soc=args.soc[0])
+        plt.show()
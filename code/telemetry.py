@@ -0,0 +1,347 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# ==========================================
+# 1. Column handling for Power-Rails CSVs
+# ==========================================
+UW_TO_W = 1e-6
+# Non-numeric tokens seen in the logs (e.g. CPU_MID_FREQ_KHz == 'err')
+NA_VALUES = ['err', 'nan', 'NaN', '']
+
+def dedupe_name(name, ordinal):
+    """
+    Unique name for the `ordinal`-th (1-based) column called `name`.
+    Rails keep their <RAIL>_ENERGY_... shape: the second Memory_ENERGY_AVG_UWS
+    becomes Memory2_ENERGY_AVG_UWS; other columns get a _2 suffix.
+    """
+    if ordinal == 1:
+        return name
+    if '_ENERGY' in name:
+        rail, rest = name.split('_ENERGY', 1)
+        return f"{rail}{ordinal}_ENERGY{rest}"
+    return f"{name}_{ordinal}"
+
+def read_header(path):
+    """
+    Column names of `path` made unique.  Repeated headers and pandas-style
+    'name.k' copies of a column that is also present (aggregated.csv ships
+    Memory_ENERGY_AVG_UWS.1, CELLULAR_ENERGY_AVG_UWS.1, ...) both get the
+    dedupe_name() of their occurrence: Memory2_ENERGY_AVG_UWS.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        raw = next(csv.reader(f))
+    present = set(raw)
+    seen = {}
+    names = []
+    for name in raw:
+        base, dot, k = name.rpartition('.')
+        if not (dot and k.isdigit() and base in present):
+            base = name
+        seen[base] = seen.get(base, 0) + 1
+        names.append(dedupe_name(base, seen[base]))
+    return names
+
+def resolve_columns(names, columns):
+    """
+    Map requested columns onto deduplicated header names.  Pandas-style
+    mangled names ('CELLULAR_ENERGY_AVG_UWS.1') are accepted as aliases.
+    """
+    out = []
+    for col in columns:
+        if col in names:
+            out.append(col)
+            continue
+        base, dot, k = col.rpartition('.')
+        if dot and k.isdigit() and dedupe_name(base, int(k) + 1) in names:
+            out.append(dedupe_name(base, int(k) + 1))
+            continue
+        raise KeyError(f"column {col!r} not found")
+    return out
+
+# ==========================================
+# 2. Chunked reader
+# ==========================================
+def iter_chunks(path, columns=None, chunksize=500_000, dtype=np.float32):
+    """
+    Stream `path` as DataFrames of at most `chunksize` rows, reading only
+    `columns` (all if None) as `dtype`.  Tokens in NA_VALUES become NaN; if
+    some other non-numeric token shows up the reader restarts at the current
+    row and coerces column by column, so memory stays bounded either way.
+    """
+    names = read_header(path)
+    usecols = names if columns is None else resolve_columns(names, columns)
+    rows_done = 0
+    coerce = False
+    while True:
+        reader = pd.read_csv(
+            path, header=0, names=names, usecols=usecols, chunksize=chunksize,
+            dtype=None if coerce else {c: dtype for c in usecols},
+            na_values=NA_VALUES, skiprows=range(1, rows_done + 1) if rows_done else None,
+            low_memory=True)
+        try:
+            for chunk in reader:
+                if coerce:
+                    chunk = chunk.apply(pd.to_numeric, errors='coerce').astype(dtype)
+                rows_done += len(chunk)
+                yield chunk[usecols]
+            return
+        except ValueError:
+            if coerce:
+                raise
+            coerce = True
+        finally:
+            reader.close()
+
+def load_columns(path, columns=None, chunksize=500_000, dtype=np.float32):
+    """Typed, projected frame assembled from iter_chunks()."""
+    chunks = list(iter_chunks(path, columns, chunksize, dtype))
+    return pd.concat(chunks, ignore_index=True)
+
+# ==========================================
+# 3. Running statistics
+# ==========================================
+class RunningStats:
+    """
+    Per-column count, mean and variance merged chunk by chunk (Chan et al.
+    parallel update), accumulated in float64.  NaNs are skipped.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.M2 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+
+    def update(self, X):
+        X = np.asarray(X, dtype=np.float64).reshape(-1, len(self.columns))
+        valid = ~np.isnan(X)
+        n_b = valid.sum(axis=0)
+        if not n_b.any():
+            return self
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(n_b > 0, np.nansum(X, axis=0) / n_b, 0.0)
+            M2_b = np.nansum((X - mean_b) ** 2, axis=0)
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        safe_n = np.where(n > 0, n, 1)
+        self.mean = self.mean + delta * n_b / safe_n
+        self.M2 = self.M2 + M2_b + delta ** 2 * self.n * n_b / safe_n
+        self.n = n
+        self.min = np.fmin(self.min, np.nanmin(np.where(valid, X, np.inf), axis=0))
+        self.max = np.fmax(self.max, np.nanmax(np.where(valid, X, -np.inf), axis=0))
+        return self
+
+    def var(self, ddof=1):
+        return self.M2 / np.maximum(self.n - ddof, 1)
+
+    def summary(self):
+        return pd.DataFrame({'count': self.n, 'mean': self.mean, 'var': self.var(),
+                             'std': np.sqrt(self.var()), 'min': self.min, 'max': self.max},
+                            index=self.columns)
+
+class RegressionStats:
+    """
+    Sufficient statistics X^T X, X^T y, y^T y of a linear least-squares fit,
+    accumulated chunk by chunk.  With fit_intercept a column of ones is
+    prepended, so coef()[0] is the intercept.
+    """
+
+    def __init__(self, n_features, fit_intercept=True):
+        self.fit_intercept = fit_intercept
+        k = n_features + int(fit_intercept)
+        self.XtX = np.zeros((k, k))
+        self.Xty = np.zeros(k)
+        self.yty = 0.0
+        self.sum_y = 0.0
+        self.n = 0
+
+    def _design(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        X = X.reshape(len(X), -1)
+        if self.fit_intercept:
+            X = np.column_stack([np.ones(len(X)), X])
+        return X
+
+    def update(self, X, y):
+        X = self._design(X)
+        y = np.asarray(y, dtype=np.float64).ravel()
+        keep = ~(np.isnan(X).any(axis=1) | np.isnan(y))
+        X, y = X[keep], y[keep]
+        self.XtX += X.T @ X
+        self.Xty += X.T @ y
+        self.yty += y @ y
+        self.sum_y += y.sum()
+        self.n += len(y)
+        return self
+
+    def coef(self):
+        return np.linalg.lstsq(self.XtX, self.Xty, rcond=None)[0]
+
+    def r2(self, coef=None):
+        b = self.coef() if coef is None else coef
+        sse = self.yty - 2 * b @ self.Xty + b @ self.XtX @ b
+        sst = self.yty - self.sum_y ** 2 / self.n
+        return 1.0 - sse / sst
+
+    def predict(self, X, coef=None):
+        b = self.coef() if coef is None else coef
+        return self._design(X) @ b
+
+def stream_stats(path, columns, chunksize=500_000, scale=1.0):
+    """Mean/variance/min/max of `columns` (times `scale`) in one pass."""
+    stats = RunningStats(columns)
+    for chunk in iter_chunks(path, columns, chunksize):
+        stats.update(chunk.to_numpy() * scale)
+    return stats.summary()
+
+def stream_regression(path, x_cols, y_col, chunksize=500_000, transform=None,
+                      fit_intercept=True):
+    """
+    Least squares of y_col on x_cols in one pass.  `transform(X, y)` may
+    return a (X, y) pair, e.g. feature expansion, unit conversion or a row
+    mask, applied per chunk.  Returns the RegressionStats.
+    """
+    reg = None
+    for chunk in iter_chunks(path, list(x_cols) + [y_col], chunksize):
+        names = resolve_columns(list(chunk.columns), list(x_cols) + [y_col])
+        X = chunk[names[:-1]].to_numpy(dtype=np.float64)
+        y = chunk[names[-1]].to_numpy(dtype=np.float64)
+        if transform is not None:
+            X, y = transform(X, y)
+        if reg is None:
+            reg = RegressionStats(np.shape(X)[1], fit_intercept)
+        reg.update(X, y)
+    return reg
+
+# ==========================================
+# 4. Columnar cache (.npy memmaps per column)
+# ==========================================
+def file_digest(path, index_path=None, block=1 << 22):
+    """
+    BLAKE2b digest of the file contents.  When `index_path` is given the
+    digest is remembered per (path, size, mtime) so unchanged files are not
+    re-hashed on every run.
+    """
+    st = os.stat(path)
+    key = os.path.abspath(path)
+    index = {}
+    if index_path and os.path.exists(index_path):
+        with open(index_path) as f:
+            index = json.load(f)
+        hit = index.get(key)
+        if hit and hit['size'] == st.st_size and hit['mtime_ns'] == st.st_mtime_ns:
+            return hit['digest']
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for buf in iter(lambda: f.read(block), b''):
+            h.update(buf)
+    digest = h.hexdigest()
+
+    if index_path:
+        index[key] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'digest': digest}
+        with open(index_path, 'w') as f:
+            json.dump(index, f, indent=1)
+    return digest
+
+def count_rows(path, block=1 << 22):
+    """Data rows of a CSV (newline count minus the header)."""
+    n = 0
+    last = b'\n'
+    with open(path, 'rb') as f:
+        for buf in iter(lambda: f.read(block), b''):
+            n += buf.count(b'\n')
+            last = buf[-1:]
+    return n - 1 + (last != b'\n')
+
+class ColumnStore:
+    """
+    One-time conversion of a telemetry CSV into typed per-column .npy files
+    under `cache_dir`/<name>-<digest>/, opened later as read-only memmaps.
+
+    The cache is keyed on the source file's content hash, so edited logs get
+    a fresh store.  Only requested columns are mapped; nothing is parsed.
+    """
+
+    def __init__(self, path, cache_dir=None, dtype=np.float32, chunksize=500_000):
+        self.path = path
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), '.telemetry_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        digest = file_digest(path, os.path.join(cache_dir, 'index.json'))
+        stem = os.path.splitext(os.path.basename(path))[0]
+        self.dir = os.path.join(cache_dir, f"{stem}-{digest}")
+        self.dtype = np.dtype(dtype)
+
+        meta = self._meta()
+        if meta is None or meta['columns'] != read_header(path):
+            self._build(chunksize) # new log, or a store written with older column names
+            meta = self._meta()
+        self.n_rows = meta['n_rows']
+        self.columns = meta['columns']
+        self._files = dict(zip(self.columns, meta['files']))
+        self._maps = {}
+
+    def _meta(self):
+        meta_path = os.path.join(self.dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _build(self, chunksize):
+        names = read_header(self.path)
+        n_alloc = count_rows(self.path)
+        tmp = self.dir + '.tmp'
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        files = [f"c{k:03d}.npy" for k in range(len(names))]
+        out = [np.lib.format.open_memmap(os.path.join(tmp, fn), mode='w+',
+                                         dtype=self.dtype, shape=(n_alloc,))
+               for fn in files]
+        row = 0
+        for chunk in iter_chunks(self.path, None, chunksize, self.dtype):
+            block = chunk.to_numpy(dtype=self.dtype)
+            for k, arr in enumerate(out):
+                arr[row:row + len(block)] = block[:, k]
+            row += len(block)
+        for arr in out:
+            arr.flush()
+        del out
+
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump({'source': os.path.abspath(self.path), 'n_rows': row,
+                       'dtype': self.dtype.str, 'columns': names, 'files': files},
+                      f, indent=1, ensure_ascii=False)
+        shutil.rmtree(self.dir, ignore_errors=True)
+        os.replace(tmp, self.dir)
+
+    def __getitem__(self, column):
+        """Read-only memmap of one column (pandas '.1' aliases accepted)."""
+        column = resolve_columns(self.columns, [column])[0]
+        if column not in self._maps:
+            arr = np.load(os.path.join(self.dir, self._files[column]), mmap_mode='r')
+            self._maps[column] = arr[:self.n_rows]
+        return self._maps[column]
+
+    def frame(self, columns):
+        """DataFrame view over the requested columns, named as requested."""
+        return pd.DataFrame({c: self[c] for c in columns}, copy=False)
+
+    def watts(self, column):
+        """A *_UW / *_UWS rail converted from microwatts to W (float64)."""
+        return self[column] * UW_TO_W
+
+def open_columns(path, columns, **kwargs):
+    """Memory-mapped frame of `columns`, building the columnar cache on first use."""
+    return ColumnStore(path, **kwargs).frame(columns)
@@ -0,0 +1,273 @@
+import bisect
+import hashlib
+import itertools
+import json
+import math
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from battery import BatterySim, get_ocv_corrected, temperature_factors
+from fleet import BatteryFleet
+
+# ==========================================
+# 1. Grid definition
+# ==========================================
+# Table axes: power (W), initial SoC, effective R0 (ohm) and effective
+# capacity (mAh).  Temperature only acts through the R0/capacity factors of
+# the temperature hook, so it is folded into those two axes at query time.
+AXES = {
+    'power_w':      np.geomspace(0.05, 16.0, 25),
+    'init_soc':     np.linspace(0.05, 1.0, 20),
+    'R0':           np.geomspace(0.02, 1.0, 14),
+    'capacity_mah': np.linspace(1500.0, 7000.0, 6),
+}
+# Axes interpolated in log coordinates (TTE ~ 1/P, R0 spans 50x)
+LOG_AXES = ('power_w', 'R0')
+
+def model_key(axes, Rp, Cp, cutoff_voltage, dt, ocv=get_ocv_corrected):
+    """
+    Hash of everything the table depends on.  The OCV curve is fingerprinted
+    by its values on a probe grid, so editing it invalidates the table.
+    """
+    fingerprint = {
+        'axes': {k: np.asarray(v).round(12).tolist() for k, v in axes.items()},
+        'Rp': Rp, 'Cp': Cp, 'cutoff_voltage': cutoff_voltage, 'dt': dt,
+        'ocv': np.round(ocv(np.linspace(0, 1, 101)), 12).tolist(),
+    }
+    return hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+
+# ==========================================
+# 2. Precomputed TTE table with multilinear interpolation
+# ==========================================
+class TTETable:
+    """
+    TTE and terminal voltage at cutoff on the AXES grid, stored in an .npz
+    file and rebuilt whenever model_key() changes.
+
+    The table holds delivered energy E = TTE * P rather than TTE itself: E
+    varies slowly with P, so multilinear interpolation stays accurate on a
+    coarse power axis.  Queries outside the grid (on any axis, after the
+    temperature factors) are not extrapolated: they are simulated with the
+    kernel that builds the table, see direct().
+    """
+
+    def __init__(self, path='tte_table.npz', axes=AXES, Rp=0.03, Cp=2000,
+                 cutoff_voltage=3.0, dt=30.0, ocv=get_ocv_corrected,
+                 temp_model=temperature_factors, cache_size=4096, verbose=True):
+        self.path = path
+        self.axes = {k: np.asarray(v, dtype=np.float64) for k, v in axes.items()}
+        self.Rp = Rp
+        self.Cp = Cp
+        self.cutoff_voltage = cutoff_voltage
+        self.dt = dt
+        self.ocv = ocv
+        self.temp_model = temp_model
+        self.verbose = verbose
+        self.key = model_key(self.axes, Rp, Cp, cutoff_voltage, dt, ocv)
+
+        if not self._load():
+            self.build()
+            self.save()
+
+        # Interpolation coordinates, flat tables and corner offsets
+        self._coords = [np.log(a) if k in LOG_AXES else a for k, a in self.axes.items()]
+        self._coords_list = [c.tolist() for c in self._coords]
+        self._log = [k in LOG_AXES for k in self.axes]
+        self._strides = [s // 8 for s in self.energy_wh.strides]
+        offsets = np.zeros(1, dtype=np.int64)
+        for s in self._strides:
+            offsets = (offsets[:, None] + np.array([0, s])[None, :]).ravel()
+        self._offsets = offsets
+        self._energy_flat = self.energy_wh.ravel()
+        self._v_end_flat = self.v_end.ravel()
+        self._energy_list = self._energy_flat.tolist()
+
+        self.tte = lru_cache(maxsize=cache_size)(self._tte_scalar)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as data:
+            if str(data['key']) != self.key:
+                if self.verbose:
+                    print(f"{self.path}: model parameters changed, rebuilding")
+                return False
+            self.energy_wh = data['energy_wh']
+            self.v_end = data['v_end']
+        return True
+
+    def save(self):
+        np.savez_compressed(self.path, key=self.key, energy_wh=self.energy_wh,
+                            v_end=self.v_end, **self.axes)
+
+    def build(self):
+        """Simulate every grid point, one BatteryFleet per power level."""
+        t0 = time.perf_counter()
+        shape = tuple(len(a) for a in self.axes.values())
+        self.energy_wh = np.empty(shape)
+        self.v_end = np.empty(shape)
+
+        soc, R0, cap = np.array(list(itertools.product(*list(self.axes.values())[1:]))).T
+        for i, p in enumerate(self.axes['power_w']):
+            fleet = BatteryFleet(capacity_mah=cap, R0=R0, Rp=self.Rp, Cp=self.Cp,
+                                 cutoff_voltage=self.cutoff_voltage, soc=soc, ocv=self.ocv)
+            tte_s = fleet.time_to_empty(p, dt=self.dt, t_max=math.inf)
+            self.energy_wh[i] = (tte_s * p / 3600.0).reshape(shape[1:])
+            self.v_end[i] = fleet.death_voltage.reshape(shape[1:])
+        if self.verbose:
+            print(f"Built TTE table {shape} in {time.perf_counter() - t0:.1f}s")
+
+    def _effective(self, R0, temp_c, capacity_mah):
+        r0_factor, cap_factor = self.temp_model(temp_c)
+        return R0 * r0_factor, capacity_mah * cap_factor
+
+    def _inside(self, x, k):
+        a = self.axes[k]
+        return (x >= a[0]) & (x <= a[-1])
+
+    def direct(self, power_w, init_soc, R0_eff, cap_eff):
+        """
+        Points simulated directly, all in one BatteryFleet (as in build())
+        with effective, i.e. temperature-scaled, R0 and capacity; arguments
+        are 1-D arrays of equal length.  Returns (TTE hours, terminal voltage
+        at cutoff, -inf on collapse); a non-positive power never reaches
+        cutoff (inf, NaN) and non-finite inputs give NaN.
+        """
+        args = [np.asarray(x, dtype=np.float64) for x in (power_w, init_soc, R0_eff, cap_eff)]
+        tte_h = np.where(args[0] <= 0, np.inf, np.nan)
+        v_end = np.full(len(tte_h), np.nan)
+        run = np.logical_and.reduce([np.isfinite(x) for x in args]) & (args[0] > 0)
+        if run.any():
+            p, soc, R0, cap = (x[run] for x in args)
+            fleet = BatteryFleet(capacity_mah=cap, R0=R0, Rp=self.Rp, Cp=self.Cp,
+                                 cutoff_voltage=self.cutoff_voltage, soc=soc, ocv=self.ocv)
+            tte_h[run] = fleet.time_to_empty(p, dt=self.dt, t_max=math.inf) / 3600.0
+            v_end[run] = fleet.death_voltage
+        return tte_h, v_end
+
+    def query(self, power_w, init_soc=1.0, R0=0.05, temp_c=25.0, capacity_mah=4575):
+        """
+        Vectorized lookup, arguments broadcast against each other.
+        R0 and capacity_mah are 25 C values; temp_c is applied through the
+        temperature hook.  Points outside the grid go through one direct().
+        Returns (TTE hours, terminal voltage at cutoff).
+        """
+        R0_eff, cap_eff = self._effective(np.asarray(R0, dtype=np.float64),
+                                          np.asarray(temp_c, dtype=np.float64),
+                                          np.asarray(capacity_mah, dtype=np.float64))
+        q = np.broadcast_arrays(*[np.asarray(x, dtype=np.float64)
+                                  for x in (power_w, init_soc, R0_eff, cap_eff)])
+        out_shape = q[0].shape
+        q = [x.ravel() for x in q]
+        m = len(q[0])
+
+        # Flat index of the lower corner and the 2^d corner weights
+        base = np.zeros(m, dtype=np.int64)
+        W = np.ones((m, 1))
+        for x, c, is_log, stride in zip(q, self._coords, self._log, self._strides):
+            if is_log:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    x = np.log(x)
+            x = np.clip(x, c[0], c[-1])
+            i = np.clip(np.searchsorted(c, x, side='right') - 1, 0, len(c) - 2)
+            f = (x - c[i]) / (c[i + 1] - c[i])
+            base += i * stride
+            W = (W[:, :, None] * np.stack([1.0 - f, f], axis=1)[:, None, :]).reshape(m, -1)
+
+        pos = base[:, None] + self._offsets[None, :]
+        energy = (W * self._energy_flat[pos]).sum(axis=1)
+        v_end = (W * self._v_end_flat[pos]).sum(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tte_h = energy / q[0]
+        outside = ~np.logical_and.reduce([self._inside(x, k) for x, k in zip(q, self.axes)])
+        if outside.any():
+            tte_h[outside], v_end[outside] = self.direct(*(x[outside] for x in q))
+        return tte_h.reshape(out_shape), v_end.reshape(out_shape)
+
+    def _tte_scalar(self, power_w, init_soc=1.0, R0=0.05, temp_c=25.0, capacity_mah=4575):
+        """Pure-Python scalar TTE (hours), wrapped in an LRU cache as self.tte."""
+        R0_eff, cap_eff = self._effective(R0, temp_c, capacity_mah)
+        base = 0
+        axes_w = []
+        for x, c, is_log, stride in zip((power_w, init_soc, R0_eff, cap_eff),
+                                        self._coords_list, self._log, self._strides):
+            x = (math.log(x) if x > 0 else -math.inf) if is_log else x
+            if not c[0] <= x <= c[-1]:
+                tte_h, _ = self.direct([power_w], [init_soc], [R0_eff], [cap_eff])
+                return float(tte_h[0])
+            i = min(max(bisect.bisect_right(c, x) - 1, 0), len(c) - 2)
+            f = (x - c[i]) / (c[i + 1] - c[i])
+            base += i * stride
+            axes_w.append((stride, f))
+
+        energy = 0.0
+        for corner in itertools.product((0, 1), repeat=len(axes_w)):
+            w = 1.0
+            pos = base
+            for bit, (stride, f) in zip(corner, axes_w):
+                if bit:
+                    w *= f
+                    pos += stride
+                else:
+                    w *= 1.0 - f
+            energy += w * self._energy_list[pos]
+        return energy / power_w
+
+    def accuracy(self, n=300, seed=0, temp_range=(-10.0, 50.0), R0_range=(0.03, 0.3),
+                 capacity_range=(3000.0, 6000.0)):
+        """
+        Interpolated vs direct (adaptive integrator) TTE on n random queries.
+        Relative errors only count points with a direct TTE above 6 minutes.
+        Returns a one-row summary DataFrame.
+        """
+        rng = np.random.default_rng(seed)
+        p_ax = self.axes['power_w']
+        power = np.exp(rng.uniform(np.log(p_ax[0]), np.log(p_ax[-1]), n))
+        soc = rng.uniform(self.axes['init_soc'][0], 1.0, n)
+        R0 = rng.uniform(*R0_range, n)
+        temp = rng.uniform(*temp_range, n)
+        cap = rng.uniform(*capacity_range, n)
+
+        table_h, _ = self.query(power, soc, R0, temp, cap)
+        direct_h = np.array([
+            BatterySim(capacity_mah=c, R0=r, Rp=self.Rp, Cp=self.Cp,
+                       cutoff_voltage=self.cutoff_voltage, soc=s, temp_c=T,
+                       ocv=self.ocv, temp_model=self.temp_model).time_to_empty(p) / 3600.0
+            for p, s, r, T, c in zip(power, soc, R0, temp, cap)])
+        err = np.abs(table_h - direct_h)
+        long = direct_h > 0.1
+        rel = err[long] / direct_h[long]
+        return pd.DataFrame({
+            'points': [n],
+            'mean_abs_err_min': [err.mean() * 60],
+            'max_abs_err_min': [err.max() * 60],
+            'mean_rel_err_%': [rel.mean() * 100],
+            'p95_rel_err_%': [np.percentile(rel, 95) * 100],
+            'max_rel_err_%': [rel.max() * 100],
+        })
+
+if __name__ == "__main__":
+    table = TTETable()
+    print(table.accuracy().round(3).to_string(index=False))
+
+    args = (3.87, 1.0, 0.05, 25.0, 4575)
+    t0 = time.perf_counter()
+    for k in range(1000):
+        table.query(*args)
+    t_query = (time.perf_counter() - t0) / 1000
+    t0 = time.perf_counter()
+    for k in range(1000):
+        table._tte_scalar(*args)
+    t_scalar = (time.perf_counter() - t0) / 1000
+    table.tte(*args)
+    t0 = time.perf_counter()
+    for k in range(100000):
+        table.tte(*args)
+    t_cached = (time.perf_counter() - t0) / 100000
+    print(f"TTE(3.87 W) = {table.tte(*args):.3f} h; vectorized query {t_query * 1e6:.0f} us, "
+          f"scalar {t_scalar * 1e6:.0f} us, cached {t_cached * 1e6:.2f} us")
@@ -1,9 +1,9 @@
-import pandas as pd
 import numpy as np
 from sklearn.linear_model import LinearRegression
 import matplotlib.pyplot as plt
+from telemetry import open_columns
 
-df = pd.read_csv('aggregated.csv')
+df = open_columns('aggregated.csv', ['TOTAL_DATA_WIFI_BYTES', 'WLANBT_ENERGY_AVG_UWS']).astype(np.float64)
 
 # 1. 数据预处理
 # 检查 'TOTAL_DATA_WIFI_BYTES' 是否为累计值